@@ -0,0 +1,195 @@
+import os
+
+import joblib
+import numpy as np
+
+from state_store import SharedState
+
+# Numeric inputs scored by the streaming detector
+ANOMALY_FEATURES = [
+    "transaction_amount",
+    "transaction_frequency",
+    "time_since_last_txn_hrs",
+    "is_foreign",
+]
+
+# Share of a run's transactions highlighted on the Pattern Detection tab. Scores have no
+# fixed scale across data sets (on synthetic uploads the 99th percentile ranges from
+# 0.59 to 0.60 and a fixed 0.55 flagged over 3%), so the cut is a quantile of the run
+ANOMALY_QUANTILE = 0.99
+# A score at or below this is never an anomaly, however quiet the run
+ANOMALY_MIN_SCORE = 0.5
+
+
+class HalfSpaceTrees:
+    """Streaming half-space trees (Tan, Ting & Liu 2011) over a tumbling window.
+
+    Each tree is a complete binary tree stored in heap order. A row is routed
+    through every tree level by level, so scoring and updating cost
+    O(n_trees * height) per row regardless of how much history has been seen.
+    """
+
+    def __init__(self, features=ANOMALY_FEATURES, n_trees=25, height=10, window_size=2000,
+                 size_limit=None, seed=42):
+        self.features = list(features)
+        self.n_trees = n_trees
+        self.height = height
+        self.window_size = window_size
+        self.size_limit = size_limit if size_limit is not None else max(1, int(0.1 * window_size))
+        self.seed = seed
+
+        n_nodes = 2 ** (height + 1) - 1
+        self.ref_mass = np.zeros((n_trees, n_nodes), dtype=np.int64)
+        self.latest_mass = np.zeros((n_trees, n_nodes), dtype=np.int64)
+        self.window_fill = 0
+        self.windows_seen = 0
+        self.rows_seen = 0
+
+        # Trees are built lazily once the first batch fixes the feature ranges
+        self.lower = None
+        self.upper = None
+        self.split_dim = None
+        self.split_val = None
+
+    @property
+    def is_warm(self):
+        return self.windows_seen > 0
+
+    def _transform(self, df):
+        """Extract features as a float matrix, log-compressing heavy tails"""
+        X = np.zeros((len(df), len(self.features)), dtype=np.float64)
+        for j, col in enumerate(self.features):
+            if col in df.columns:
+                values = np.asarray(df[col], dtype=np.float64)
+                X[:, j] = np.log1p(np.clip(values, 0, None))
+        return np.nan_to_num(X, nan=0.0)
+
+    def _build_trees(self, X):
+        """Draw random splits inside a perturbed work space around the first batch"""
+        rng = np.random.default_rng(self.seed)
+        lo, hi = X.min(axis=0), X.max(axis=0)
+        span = np.where(hi > lo, hi - lo, 1.0)
+        self.lower, self.upper = lo - span, hi + span
+
+        n_internal = 2 ** self.height - 1
+        self.split_dim = rng.integers(0, X.shape[1], size=(self.n_trees, n_internal))
+        self.split_val = np.empty((self.n_trees, n_internal))
+
+        for t in range(self.n_trees):
+            # Random work space per tree: s in [lo, hi], range = s +/- 2 * max(s - lo, hi - s)
+            s = rng.uniform(lo, np.where(hi > lo, hi, lo + 1.0))
+            radius = 2 * np.maximum(s - lo, np.where(hi > lo, hi, lo + 1.0) - s)
+            node_lo = np.empty((n_internal, X.shape[1]))
+            node_hi = np.empty((n_internal, X.shape[1]))
+            node_lo[0], node_hi[0] = s - radius, s + radius
+            for node in range(n_internal):
+                q = self.split_dim[t, node]
+                mid = (node_lo[node, q] + node_hi[node, q]) / 2
+                self.split_val[t, node] = mid
+                for child, is_left in ((2 * node + 1, True), (2 * node + 2, False)):
+                    if child < n_internal:
+                        node_lo[child], node_hi[child] = node_lo[node], node_hi[node]
+                        if is_left:
+                            node_hi[child, q] = mid
+                        else:
+                            node_lo[child, q] = mid
+
+    def _paths(self, X):
+        """Node index visited at every level for every tree: shape (trees, height + 1, rows)"""
+        n = len(X)
+        paths = np.zeros((self.n_trees, self.height + 1, n), dtype=np.int64)
+        rows = np.arange(n)
+        for t in range(self.n_trees):
+            node = np.zeros(n, dtype=np.int64)
+            for level in range(self.height):
+                go_right = X[rows, self.split_dim[t, node]] >= self.split_val[t, node]
+                node = 2 * node + 1 + go_right
+                paths[t, level + 1] = node
+        return paths
+
+    def _score_paths(self, paths, mass):
+        """Half-space mass score, normalised so 1.0 is most anomalous"""
+        n = paths.shape[2]
+        anomaly = np.zeros(n)
+        for t in range(self.n_trees):
+            score = np.zeros(n)
+            done = np.zeros(n, dtype=bool)
+            for level in range(self.height + 1):
+                node_mass = mass[t, paths[t, level]]
+                # Stop descending once a node's mass falls below the size limit
+                stop = ~done & ((node_mass < self.size_limit) | (level == self.height))
+                score[stop] = node_mass[stop] * (2.0 ** level)
+                done |= stop
+            # Mass grows geometrically with depth, so compare on a log scale against
+            # the best case of the whole window reaching the deepest level
+            max_score = max(mass[t, 0], 1) * (2.0 ** self.height)
+            anomaly += 1.0 - np.log1p(score) / np.log1p(max_score)
+        return np.clip(anomaly / self.n_trees, 0.0, 1.0)
+
+    def score_and_update(self, df):
+        """Score a batch against the reference window, then learn from it"""
+        X = self._transform(df)
+        if len(X) == 0:
+            return np.zeros(0, dtype=np.float32)
+        if self.split_dim is None:
+            self._build_trees(X)
+        X = np.clip(X, self.lower, self.upper)
+
+        scores = np.empty(len(X), dtype=np.float32)
+        start = 0
+        while start < len(X):
+            # Never let a slice cross a window boundary
+            stop = min(len(X), start + self.window_size - self.window_fill)
+            paths = self._paths(X[start:stop])
+
+            for t in range(self.n_trees):
+                np.add.at(self.latest_mass[t], paths[t].ravel(), 1)
+            self.window_fill += stop - start
+
+            # Until one full window has been seen, score against what has been learned so far
+            reference = self.ref_mass if self.is_warm else self.latest_mass
+            scores[start:stop] = self._score_paths(paths, reference)
+
+            if self.window_fill >= self.window_size:
+                self.ref_mass = self.latest_mass
+                self.latest_mass = np.zeros_like(self.ref_mass)
+                self.window_fill = 0
+                self.windows_seen += 1
+            start = stop
+
+        self.rows_seen += len(X)
+        return scores
+
+
+def anomaly_threshold(scores):
+    """Score above which a run's transactions count as anomalies"""
+    scores = np.asarray(scores, dtype=np.float64)
+    scores = scores[~np.isnan(scores)]
+    if len(scores) == 0:
+        return ANOMALY_MIN_SCORE
+    return max(ANOMALY_MIN_SCORE, float(np.quantile(scores, ANOMALY_QUANTILE)))
+
+
+def load_detector(path):
+    """Load the persisted detector, or start a fresh one"""
+    if os.path.exists(path):
+        try:
+            return joblib.load(path)
+        except Exception as e:
+            print(f"[ANOMALY] Could not load detector from {path}: {str(e)}")
+    return HalfSpaceTrees()
+
+
+def shared_detector(path):
+    """The detector persisted at `path`, shared by every worker process"""
+    return SharedState(path, load_detector, joblib.dump)
+
+
+def score_batch(shared, df):
+    """Score a batch against the latest committed detector, without learning from it"""
+    return shared.snapshot().score_and_update(df)
+
+
+def learn_batch(shared, df):
+    """Fold a saved batch into the detector on disk"""
+    shared.commit(lambda detector: detector.score_and_update(df))
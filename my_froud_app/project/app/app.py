@@ -1,7 +1,7 @@
 from flask import Flask, render_template, request, redirect, send_from_directory, url_for, flash
-import subprocess
 import os
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import io
 import base64
@@ -9,9 +9,19 @@ from datetime import datetime
 import tensorflow as tf
 import joblib
 import shutil
-import time
+import uuid
 from werkzeug.utils import secure_filename
 from dashboard import create_dashboard
+from anomaly_detector import shared_detector, score_batch, learn_batch
+from user_state import shared_user_state, update_velocity, learn_velocity
+from covariance_store import record_run
+from rollup_store import build_rollups, save_rollups
+from risk_scoring import shared_risk_scorer, score_risk, learn_risk
+from run_store import save_run, update_manifest
+from data_digest import build_digest, save_digest
+from explanations import FraudExplainer, save_explanations
+from telemetry import init_telemetry, StageTimer
+from sidecar import StreamlitSidecar
 import csv
 
 # Get the base directory of the app
@@ -20,18 +30,27 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', os.urandom(24))
 
-# Configuration with absolute paths
+# Configuration with absolute paths. The data folders can be moved with environment
+# variables, which the benchmark and load test use to keep their uploads out of real state
 app.config.update({
-    "UPLOAD_FOLDER": os.path.join(BASE_DIR, "uploads"),
-    "PROCESSED_FOLDER": os.path.join(BASE_DIR, "processed_data"),
+    "UPLOAD_FOLDER": os.getenv("UPLOAD_FOLDER", os.path.join(BASE_DIR, "uploads")),
+    "PROCESSED_FOLDER": os.getenv("PROCESSED_FOLDER", os.path.join(BASE_DIR, "processed_data")),
+    "SHARED_DATASET_FOLDER": os.getenv("SHARED_DATASET_FOLDER", "/dev/shm/fraud_datasets"),
+    "STATE_FOLDER": os.getenv("STATE_FOLDER", os.path.join(BASE_DIR, "state")),
+    "EXPORT_FOLDER": os.getenv("EXPORT_FOLDER", os.path.join(BASE_DIR, "exports")),
+    # Processed CSVs offered for download; the static folder unless moved
+    "RESULTS_FOLDER": os.getenv("RESULTS_FOLDER", os.path.join(BASE_DIR, "static")),
     "ALLOWED_EXTENSIONS": {'csv'},
-    "MAX_CONTENT_LENGTH": 100 * 1024 * 1024  # 100MB limit
+    "MAX_CONTENT_LENGTH": int(os.getenv("MAX_UPLOAD_MB", 100)) * 1024 * 1024  # 100MB limit
 })
 
 # Ensure directories exist with absolute paths
-for folder in [app.config["UPLOAD_FOLDER"], app.config["PROCESSED_FOLDER"], os.path.join(BASE_DIR, 'static')]:
+for folder in [app.config["UPLOAD_FOLDER"], app.config["PROCESSED_FOLDER"], app.config["STATE_FOLDER"], app.config["EXPORT_FOLDER"], app.config["RESULTS_FOLDER"]]:
     os.makedirs(folder, exist_ok=True)
 
+# Per-route and per-callback timings, served at /metrics
+init_telemetry(app, os.path.join(app.config["STATE_FOLDER"], "slow_requests.log"))
+
 # Initialize dashboard
 create_dashboard(app)
 
@@ -106,6 +125,30 @@ except RuntimeError as e:
     print(f"Critical error: {str(e)}")
     exit(1)
 
+# Per-feature contributions behind every flagged row, computed from the models themselves
+explainer = FraudExplainer({"TF": tf_model, "XGB": xgb_model, "Meta": meta_model}, column_transformer)
+
+# Streaming anomaly detector, updated with every saved batch
+ANOMALY_MODEL_PATH = os.path.join(app.config["STATE_FOLDER"], "anomaly_model.joblib")
+anomaly_detector = shared_detector(ANOMALY_MODEL_PATH)
+
+# Per-user behaviour state for cross-batch velocity analysis
+USER_STATE_PATH = os.path.join(app.config["STATE_FOLDER"], "user_state.pkl")
+user_state = shared_user_state(USER_STATE_PATH)
+
+# Running co-moments per run and over all history for the correlation heatmap
+COVARIANCE_PATH = os.path.join(app.config["STATE_FOLDER"], "covariance.json")
+
+# Minute/hour/day buckets per prediction class for the temporal charts
+ROLLUP_FOLDER = os.path.join(app.config["STATE_FOLDER"], "rollups")
+
+# Quantile sketches and merchant fraud counts behind the stored risk score
+RISK_SCORER_PATH = os.path.join(app.config["STATE_FOLDER"], "risk_scorer.joblib")
+risk_scorer = shared_risk_scorer(RISK_SCORER_PATH)
+
+# JSON lines with per-stage /predict timings, one set per request id
+PREDICT_TIMINGS_LOG = os.path.join(app.config["STATE_FOLDER"], "predict_timings.log")
+
 # --- Routes ---
 @app.route("/")
 def index():
@@ -119,16 +162,22 @@ def predict():
     if "csvfile" in request.files:
         csv_file = request.files["csvfile"]
         if csv_file.filename.endswith(".csv"):
+            timer = StageTimer("predict", request.headers.get("X-Request-ID"), PREDICT_TIMINGS_LOG)
+            processed_data = None
+            upload_bytes = 0
             try:
-                # Create timestamp-based directory
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                # Create timestamp-based directory; the random suffix keeps two uploads
+                # landing in the same second from sharing a folder and run id
+                timestamp = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
                 upload_dir = os.path.join(app.config["UPLOAD_FOLDER"], timestamp)
                 os.makedirs(upload_dir, exist_ok=True)
 
                 # Save uploaded file
                 filename = secure_filename(csv_file.filename)
                 filepath = os.path.join(upload_dir, filename)
-                csv_file.save(filepath)
+                with timer.stage("upload_save"):
+                    csv_file.save(filepath)
+                upload_bytes = os.path.getsize(filepath)
 
                                 # ====== CORRECTED PARSING CONFIGURATION ======
                 csv_parse_params = {
@@ -148,28 +197,32 @@ def predict():
                     "transaction_frequency", "time_since_last_txn_hrs"
                 ]  # 12 columns matching your header
 
-                # Read header
-                df_header = pd.read_csv(filepath, nrows=0, **csv_parse_params)
-                
-                # Convert to lowercase and strip whitespace
-                df_header.columns = [col.strip().lower() for col in df_header.columns]
-                
-                # Column count validation
-                if len(df_header.columns) != len(expected_columns):
-                    raise ValueError(
-                        f"Expected {len(expected_columns)} columns, got {len(df_header.columns)}"
-                    )
+                with timer.stage("header_validation"):
+                    # Read header
+                    df_header = pd.read_csv(filepath, nrows=0, **csv_parse_params)
 
-                # Column name validation
-                missing_columns = set(expected_columns) - set(df_header.columns)
-                if missing_columns:
-                    raise ValueError(f"Missing columns: {', '.join(missing_columns)}")
+                    # Convert to lowercase and strip whitespace
+                    df_header.columns = [col.strip().lower() for col in df_header.columns]
+
+                    # Column count validation
+                    if len(df_header.columns) != len(expected_columns):
+                        raise ValueError(
+                            f"Expected {len(expected_columns)} columns, got {len(df_header.columns)}"
+                        )
+
+                    # Column name validation
+                    missing_columns = set(expected_columns) - set(df_header.columns)
+                    if missing_columns:
+                        raise ValueError(f"Missing columns: {', '.join(missing_columns)}")
 
                 # Process data in chunks
                 chunk_size = 1000
                 processed_chunks = []
+                explanation_frames = []
+                rows_seen = 0
 
-                for chunk in pd.read_csv(filepath, chunksize=chunk_size, **csv_parse_params):
+                # Parse time is charged per chunk as the reader produces it
+                for chunk in timer.iterate("parse", pd.read_csv(filepath, chunksize=chunk_size, **csv_parse_params)):
                     # Enforce column names from header
                     chunk.columns = df_header.columns.tolist()
                     
@@ -179,33 +232,88 @@ def predict():
                         raise ValueError(f"Missing columns: {', '.join(missing)}")
 
                     # Transform and predict
-                    transformed_data = column_transformer.transform(chunk)
-                    tf_pred = (tf_model.predict(transformed_data) > 0.5).astype(int).flatten()
-                    xgb_pred = xgb_model.predict(transformed_data)
-                    meta_pred = meta_model.predict(transformed_data)
+                    with timer.stage("transform"):
+                        transformed_data = column_transformer.transform(chunk)
+                    with timer.stage("predict_tf"):
+                        tf_pred = (tf_model.predict(transformed_data) > 0.5).astype(int).flatten()
+                    with timer.stage("predict_xgb"):
+                        xgb_pred = xgb_model.predict(transformed_data)
+                    with timer.stage("predict_meta"):
+                        meta_pred = meta_model.predict(transformed_data)
 
                     # Add predictions
-                    chunk["TF_Prediction"] = ["Fraudulent" if p else "Non-Fraudulent" for p in tf_pred]
-                    chunk["XGB_Prediction"] = ["Fraudulent" if p else "Non-Fraudulent" for p in xgb_pred]
-                    chunk["Meta_Prediction"] = ["Fraudulent" if p else "Non-Fraudulent" for p in meta_pred]
-
+                    with timer.stage("label"):
+                        chunk["TF_Prediction"] = ["Fraudulent" if p else "Non-Fraudulent" for p in tf_pred]
+                        chunk["XGB_Prediction"] = ["Fraudulent" if p else "Non-Fraudulent" for p in xgb_pred]
+                        chunk["Meta_Prediction"] = ["Fraudulent" if p else "Non-Fraudulent" for p in meta_pred]
+
+                    # Explain every row any model flagged, on the matrix the models just scored
+                    with timer.stage("explain"):
+                        flagged = (tf_pred == 1) | (np.asarray(xgb_pred) == 1) | (np.asarray(meta_pred) == 1)
+                        explanation, reasons = explainer.explain(transformed_data, flagged, offset=rows_seen)
+                        explanation_frames.append(explanation)
+                        chunk["fraud_reasons"] = reasons
+
+                    rows_seen += len(chunk)
                     processed_chunks.append(chunk)
 
                 # Combine and save results
-                processed_data = pd.concat(processed_chunks, ignore_index=True)
+                with timer.stage("concat"):
+                    processed_data = pd.concat(processed_chunks, ignore_index=True)
+
+                # Score against past behaviour; the batch is learned once the run is saved
+                with timer.stage("anomaly_score"):
+                    processed_data["anomaly_score"] = score_batch(anomaly_detector, processed_data)
+
+                # Velocity flags and amount z-scores against each user's full history
+                with timer.stage("velocity"):
+                    velocity = update_velocity(user_state, processed_data)
+                    processed_data = processed_data.join(velocity)
+
+                # Risk score against the percentiles of every batch seen so far
+                with timer.stage("risk_score"):
+                    processed_data["risk_score"] = score_risk(risk_scorer, processed_data)
+
+                # Pre-bucket the run so temporal queries never touch the rows again
+                with timer.stage("rollups"):
+                    rollups = build_rollups(processed_data)
+                    save_rollups(rollups, timestamp, ROLLUP_FOLDER)
                 output_filename = f"{timestamp}_processed_data.csv"
                 processed_path = os.path.join(app.config["PROCESSED_FOLDER"], output_filename)
-                processed_data.to_csv(processed_path, index=False)
+                with timer.stage("csv_write"):
+                    processed_data.to_csv(processed_path, index=False)
+
+                # Memory-mappable copy and manifest for the dashboard's run browser
+                with timer.stage("arrow_write"):
+                    save_run(processed_data, timestamp, app.config["PROCESSED_FOLDER"], source_file=filename)
+
+                # Per-feature contributions for the flagged rows, keyed by row number
+                with timer.stage("explanations_write"):
+                    save_explanations(explanation_frames, timestamp, app.config["PROCESSED_FOLDER"])
+
+                # A few kilobytes of summary statistics the assistant reads instead of the raw CSV
+                with timer.stage("digest"):
+                    save_digest(build_digest(processed_data, timestamp, rollups), timestamp, app.config["PROCESSED_FOLDER"])
+
+                # Learn from the batch only now that the run is saved, so an upload that
+                # fails or is retried is never counted twice. Every store is re-read
+                # under a file lock, so workers never overwrite each other's updates.
+                with timer.stage("state_commit"):
+                    learn_batch(anomaly_detector, processed_data)
+                    learn_velocity(user_state, processed_data)
+                    learn_risk(risk_scorer, processed_data)
+                    record_run(processed_data, timestamp, COVARIANCE_PATH)
 
                 # Move to static folder
-                static_path = os.path.join(BASE_DIR, 'static', output_filename)   # Use app.static_folder
+                static_path = os.path.join(app.config["RESULTS_FOLDER"], output_filename)
 
                 try:
                     # Ensure destination directory exists
                     os.makedirs(os.path.dirname(static_path), exist_ok=True)
                     
                     # First try copy, then verify
-                    shutil.copy2(processed_path, static_path)
+                    with timer.stage("static_copy"):
+                        shutil.copy2(processed_path, static_path)
                     
                     # Verify copy succeeded
                     if not os.path.exists(static_path):
@@ -220,7 +328,7 @@ def predict():
                     print(f"[CRITICAL] File copy failed: {str(copy_error)}")
                     # Try alternative method if copy fails
                     try:
-                        with open(processed_path, 'rb') as src, open(static_path, 'wb') as dst:
+                        with timer.stage("static_copy"), open(processed_path, 'rb') as src, open(static_path, 'wb') as dst:
                             dst.write(src.read())
                         print(f"[FALLBACK] Used alternative copy method")
                     except Exception as fallback_error:
@@ -229,13 +337,27 @@ def predict():
                 # Generate visualization
                 fraud_count = (processed_data["Meta_Prediction"] == "Fraudulent").sum()
                 non_fraud_count = (processed_data["Meta_Prediction"] == "Non-Fraudulent").sum()
-                pie_chart = generate_pie_chart(fraud_count, non_fraud_count)
+                with timer.stage("pie_chart"):
+                    pie_chart = generate_pie_chart(fraud_count, non_fraud_count)
+
+                # Timing summary next to the run so regressions show up in the run browser
+                timings = timer.finish(rows=len(processed_data), bytes_in=upload_bytes)
+                update_manifest(timestamp, app.config["PROCESSED_FOLDER"], timings=timings)
+
+                # Highest-risk flagged rows with their reasons for the results page
+                flagged_rows = processed_data[processed_data["fraud_reasons"] != ""]
+                if "risk_score" in flagged_rows.columns:
+                    flagged_rows = flagged_rows.nlargest(20, "risk_score")
+                reason_columns = [col for col in ("transaction_id", "user_name", "transaction_amount", "risk_score",
+                                                  "Meta_Prediction", "fraud_reasons") if col in flagged_rows.columns]
+                flagged_reasons = flagged_rows[reason_columns].head(20).round(3).to_dict("records")
 
                 return render_template(
                     "results.html",
                     column_names=processed_data.columns.tolist(),
                     data=processed_data.head(50).values.tolist(),
                     pie_chart=pie_chart,
+                    flagged_reasons=flagged_reasons,
                     processed_data_filename=output_filename,
                     processed_data_filepath=static_path,
                     current_year=datetime.now().year  # Add this line
@@ -243,8 +365,10 @@ def predict():
                             # With this verified version:
 
             except ValueError as e:
+                timer.finish(rows=0 if processed_data is None else len(processed_data), bytes_in=upload_bytes, error=str(e))
                 flash(f"Error: {str(e)}", "error")
             except Exception as e:
+                timer.finish(rows=0 if processed_data is None else len(processed_data), bytes_in=upload_bytes, error=str(e))
                 flash(f"Processing error: {str(e)}", "error")
             return redirect(url_for("index"))
         else:
@@ -265,8 +389,8 @@ def download_results(filename):
             
         print(f"[DOWNLOAD] Request for: {safe_filename}")
         
-        # Get absolute static path
-        static_dir = os.path.abspath(app.static_folder)
+        # Get absolute results path
+        static_dir = os.path.abspath(app.config["RESULTS_FOLDER"])
         full_path = os.path.join(static_dir, safe_filename)
         
         # Enhanced file verification
@@ -298,87 +422,33 @@ def download_results(filename):
 
 @app.route("/launch_dashboard")
 def launch_dashboard():
-    try:
-        # Get absolute path to processed directory
-        processed_dir = os.path.abspath(app.config["PROCESSED_FOLDER"])
-        print(f"\n[DEBUG] Checking for processed files in directory: {processed_dir}")
-        
-        # Verify directory exists
-        if not os.path.exists(processed_dir):
-            print(f"[ERROR] Directory does not exist: {processed_dir}")
-            raise FileNotFoundError(f"Directory not found: {processed_dir}")
-        
-        # List all files in directory
-        all_files = os.listdir(processed_dir)
-        print(f"[DEBUG] All files in directory: {all_files}")
-        
-        # Filter and sort processed files
-        processed_files = sorted(
-            [f for f in all_files if f.endswith('_processed_data.csv')],
-            key=lambda x: datetime.strptime(x.split('_')[0], "%Y%m%d"),
-            reverse=True
-        )
-        
-        print(f"[DEBUG] Found processed files: {processed_files}")
-        
-        if not processed_files:
-            print("[ERROR] No processed files found matching pattern '*_processed_data.csv'")
-            raise FileNotFoundError("No processed files available")
-            
-        latest_file = processed_files[0]
-        latest_file_path = os.path.join(processed_dir, latest_file)
-        
-        # Verify the file exists
-        if not os.path.exists(latest_file_path):
-            print(f"[ERROR] File not found at path: {latest_file_path}")
-            raise FileNotFoundError(f"File not found: {latest_file_path}")
-        
-        print(f"[DEBUG] Latest processed file: {latest_file_path}")
-        print(f"[DEBUG] File exists: {os.path.exists(latest_file_path)}")
-        print(f"[DEBUG] File size: {os.path.getsize(latest_file_path)} bytes")
-        
-        # Write the path to the file
-        with open("latest_file_path.txt", "w") as f:
-            f.write(latest_file_path)
-            print(f"[DEBUG] Wrote path to latest_file_path.txt: {latest_file_path}")
-            
-        return redirect("/dashboard/")
-        
-    except Exception as e:
-        print(f"[ERROR] Exception in launch_dashboard: {str(e)}")
-        flash(str(e), "error")
-        return redirect(url_for("index"))
-
-# Streamlit integration
-streamlit_process = None
+    # The dashboard's run selector opens the newest stored run itself
+    return redirect("/dashboard/")
+
+# Streamlit assistant, supervised as one long-lived sidecar shared by every user
+STREAMLIT_PORT = int(os.environ.get("STREAMLIT_PORT", 8502))
+streamlit_sidecar = StreamlitSidecar(
+    os.path.join(BASE_DIR, "assistance_API", "main.py"),
+    port=STREAMLIT_PORT,
+    log_path=os.path.join(app.config["STATE_FOLDER"], "streamlit.log"),
+    lock_path=os.path.join(app.config["STATE_FOLDER"], "streamlit.lock"),
+)
+if os.environ.get("ASSISTANT_SIDECAR", "1") != "0":
+    streamlit_sidecar.start()
 
 @app.route('/ai-fraud-detection')
 def launch_streamlit():
-    global streamlit_process
-
-    # Clean up any existing process
-    if streamlit_process and streamlit_process.poll() is None:
-        streamlit_process.terminate()
-        time.sleep(2)
-
-    try:
-        streamlit_script = os.path.join(
-            os.path.dirname(__file__), 
-            "assistance_API/main.py"
-        )
-        
-        streamlit_process = subprocess.Popen(
-            ['streamlit', 'run', streamlit_script, '--server.port', '8502'],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            env={**os.environ, 'PYTHONPATH': os.getcwd()}
-        )
-        time.sleep(5)  # Allow time for initialization
-        return redirect("http://localhost:8502")
-        
-    except Exception as e:
-        flash(f"Failed to launch analytics: {str(e)}", "error")
-        return redirect(url_for("index"))
+    streamlit_sidecar.start()
+    public_url = os.environ.get("STREAMLIT_PUBLIC_URL") or f"{request.scheme}://{request.host.split(':')[0]}:{STREAMLIT_PORT}"
+    if streamlit_sidecar.ready:
+        return redirect(public_url)
+    # Still booting or restarting: the page polls the health endpoint instead of holding this worker
+    return render_template("assistant_starting.html", assistant_url=public_url)
+
+@app.route('/ai-fraud-detection/health')
+def streamlit_health():
+    status = streamlit_sidecar.status()
+    return status, 200 if status["ready"] else 503
 
 if __name__ == '__main__':
-    app.run(debug=os.environ.get('FLASK_DEBUG', 'False').lower() == 'true')
\ No newline at end of file
+    app.run(port=int(os.environ.get('PORT', 5000)), debug=os.environ.get('FLASK_DEBUG', 'False').lower() == 'true')
\ No newline at end of file
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Answers older than this are asked again; the data they describe may still be the same,
+# but the assistant and its tools change underneath
+ANSWER_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL", 7 * 24 * 3600))
+# Least recently used answers beyond this are dropped
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", 1000))
+
+
+def normalise_question(question):
+    """Lower-case, collapse whitespace and drop trailing punctuation so trivial rewordings share an answer"""
+    return re.sub(r"\s+", " ", question).strip().lower().rstrip("?!. ")
+
+
+def fingerprint(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def dataset_fingerprint(content_hashes):
+    """One hash for everything the assistant was given, independent of upload order"""
+    return fingerprint(*sorted(content_hashes))
+
+
+def answer_key(dataset_hash, question, instructions, model, assistant_id=None):
+    return fingerprint(dataset_hash, normalise_question(question), instructions or "", model or "", assistant_id or "")
+
+
+class AnswerCache:
+    """Assistant answers on disk, keyed by dataset, question and instructions/model.
+
+    Entries expire after `ttl_seconds`, and the least recently used are
+    evicted once there are more than `max_entries`. Hit and miss counts are
+    stored with the answers so they survive restarts.
+    """
+
+    def __init__(self, path, ttl_seconds=ANSWER_TTL_SECONDS, max_entries=ANSWER_CACHE_SIZE):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, answer TEXT NOT NULL, "
+                "meta TEXT, created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _count(self, name):
+        self._db.execute(
+            "INSERT INTO counters VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,)
+        )
+
+    def get(self, key):
+        """The cached answer and its metadata, or None if missing or expired"""
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute("SELECT answer, meta, created FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[2] > self.ttl_seconds:
+                self._db.execute("DELETE FROM answers WHERE key = ?", (key,))
+                self._count("expired")
+                row = None
+            if row is None:
+                self._count("misses")
+                return None
+            self._db.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+            self._count("hits")
+        return {"answer": row[0], "created": row[2], **json.loads(row[1] or "{}")}
+
+    def put(self, key, answer, **meta):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?)", (key, answer, json.dumps(meta), now, now)
+            )
+            self._db.execute(
+                "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM answers")
+            self._db.execute("DELETE FROM counters")
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._db.execute("SELECT name, value FROM counters").fetchall())
+            size = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "size": size,
+            "hits": hits,
+            "misses": misses,
+            "expired": counters.get("expired", 0),
+            "hit_rate": round(hits / (hits + misses) * 100, 1) if hits + misses else None,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def open_cache(path, **kwargs):
+    """One cache per file for the life of the process, shared across Streamlit reruns"""
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = AnswerCache(path, **kwargs)
+        return _caches[path]
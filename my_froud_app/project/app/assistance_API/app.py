@@ -1,8 +1,8 @@
 import os
 from dotenv import load_dotenv
 import openai
-import time
 import logging
+from assistant_runs import RUN_TIMEOUT_SECONDS, run_messages, wait_for_run
 
 
 load_dotenv()
@@ -123,36 +123,26 @@ except Exception as e:
     raise ValueError(f"Failed to start run: {e}")
 
 
-def wait_for_run_completion(client, thread_id, run_id, sleep_interval=5):
-    """ Waits for a run to complete and prints the elapsed time. """
-    while True:
-        try:
-            run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
-            if run.completed_at:
-                elapsed_time = run.completed_at - run.created_at
-                formatted_elapsed_time = time.strftime("%H:%M:%S", time.gmtime(elapsed_time))
-                print(f"Run completed in {formatted_elapsed_time}")
-                logging.info(f"Run completed in {formatted_elapsed_time}")
-                
-                # Get messages here once Run is completed!
-                messages = client.beta.threads.messages.list(thread_id=thread_id)
-                last_message = messages.data[0]
-                
-                # Check the content type before accessing it
-                if hasattr(last_message.content[0], 'text'):
-                    response = last_message.content[0].text.value
-                    print(f"Assistant Response: {response}")
-                elif hasattr(last_message.content[0], 'image'):
-                    image_url = last_message.content[0].image.url
-                    print(f"Assistant Response (Image): {image_url}")
-                else:
-                    print(f"Unknown response type: {last_message.content[0]}")
-                break
-        except Exception as e:
-            logging.error(f"An error occurred while retrieving the run: {e}")
-            break
-        logging.info("Waiting for run to complete...")
-        time.sleep(sleep_interval)
+def wait_for_run_completion(client, thread_id, run_id, timeout=RUN_TIMEOUT_SECONDS):
+    """ Waits for a run to finish, backing off between polls, and prints the elapsed time. """
+    outcome = wait_for_run(client, thread_id, run_id, timeout=timeout)
+    print(f"Run {outcome.status} in {outcome.elapsed_seconds:.1f}s after {outcome.api_calls} API calls")
+    logging.info(f"Run {outcome.status} in {outcome.elapsed_seconds:.1f}s after {outcome.api_calls} API calls")
+    if not outcome.completed:
+        print(f"Run did not complete: {outcome.error}")
+        return outcome
+
+    # Get this run's messages once it is completed
+    for message in run_messages(client, thread_id, run_id):
+        for content in message.content:
+            # Check the content type before accessing it
+            if hasattr(content, 'text'):
+                print(f"Assistant Response: {content.text.value}")
+            elif hasattr(content, 'image_file'):
+                print(f"Assistant Response (Image): {content.image_file.file_id}")
+            else:
+                print(f"Unknown response type: {content}")
+    return outcome
 
 
 # # # == Run it
@@ -0,0 +1,199 @@
+import logging
+import random
+import time
+
+import openai
+
+# Run states after which nothing more will happen
+TERMINAL_STATES = {"completed", "failed", "cancelled", "expired", "incomplete"}
+# The run is paused waiting for tool outputs we never submit, so treat it as finished
+ACTION_STATE = "requires_action"
+
+RUN_TIMEOUT_SECONDS = 180
+POLL_INITIAL_SECONDS = 0.5
+POLL_MAX_SECONDS = 8.0
+POLL_FACTOR = 2.0
+
+# Failures worth retrying without the stream; anything else (bad request, an active
+# run already on the thread, auth, not found) would fail the same way again
+TRANSIENT_ERRORS = (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
+
+
+class RunOutcome:
+    """Final state of an assistant run and the text it produced"""
+
+    def __init__(self, run_id=None, status=None, text="", error=None, api_calls=0, streamed=False):
+        self.run_id = run_id
+        self.status = status
+        self.text = text
+        self.error = error
+        self.api_calls = api_calls
+        self.streamed = streamed
+        self.started = time.monotonic()
+        self.first_token_seconds = None
+        self.elapsed_seconds = None
+
+    @property
+    def completed(self):
+        return self.status == "completed"
+
+    def __repr__(self):
+        return (f"RunOutcome(run_id={self.run_id!r}, status={self.status!r}, api_calls={self.api_calls}, "
+                f"streamed={self.streamed}, elapsed={self.elapsed_seconds})")
+
+
+def backoff_intervals(initial=POLL_INITIAL_SECONDS, factor=POLL_FACTOR, maximum=POLL_MAX_SECONDS):
+    """Exponentially growing poll intervals with full jitter"""
+    interval = initial
+    while True:
+        yield random.uniform(interval / 2, interval)
+        interval = min(interval * factor, maximum)
+
+
+def _error_text(run):
+    error = getattr(run, "last_error", None)
+    if error is not None:
+        return f"{getattr(error, 'code', 'error')}: {getattr(error, 'message', '')}"
+    details = getattr(run, "incomplete_details", None)
+    if details is not None:
+        return f"incomplete: {getattr(details, 'reason', '')}"
+    return None
+
+
+def _fail(outcome, error):
+    outcome.status = "failed"
+    outcome.error = str(error)
+    outcome.elapsed_seconds = round(time.monotonic() - outcome.started, 3)
+    return outcome
+
+
+def cancel_run(client, thread_id, run_id):
+    try:
+        client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+    except openai.APIError as e:
+        logging.warning(f"Could not cancel run {run_id}: {e}")
+
+
+def wait_for_run(client, thread_id, run_id, timeout=RUN_TIMEOUT_SECONDS, outcome=None):
+    """Poll a run with exponential backoff until it reaches a terminal state or times out.
+
+    Timed-out runs are cancelled so they stop consuming tokens.
+    """
+    outcome = outcome or RunOutcome(run_id=run_id)
+    outcome.run_id = run_id
+    deadline = time.monotonic() + timeout
+    for interval in backoff_intervals():
+        try:
+            run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
+        except TRANSIENT_ERRORS:
+            raise
+        except openai.APIStatusError as e:
+            return _fail(outcome, e)
+        outcome.api_calls += 1
+        if run.status in TERMINAL_STATES or run.status == ACTION_STATE:
+            outcome.status = run.status
+            outcome.error = _error_text(run)
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            cancel_run(client, thread_id, run_id)
+            outcome.api_calls += 1
+            outcome.status = "timed_out"
+            outcome.error = f"Run did not finish within {timeout}s"
+            break
+        logging.info(f"Run {run_id} is {run.status}, checking again in {interval:.1f}s")
+        time.sleep(min(interval, remaining))
+    outcome.elapsed_seconds = round(time.monotonic() - outcome.started, 3)
+    return outcome
+
+
+def run_messages(client, thread_id, run_id):
+    """Assistant messages written by one run, oldest first"""
+    messages = client.beta.threads.messages.list(thread_id=thread_id, run_id=run_id, order="asc")
+    return [message for message in messages if message.role == "assistant"]
+
+
+def message_text(message):
+    return "".join(part.text.value for part in message.content if part.type == "text")
+
+
+def stream_run(client, thread_id, assistant_id, instructions=None, on_text=None, timeout=RUN_TIMEOUT_SECONDS):
+    """Start a run and stream its events, calling on_text(text_so_far) as tokens arrive.
+
+    If the stream cannot be opened because of a connection problem or a
+    server error, the run is created without streaming, and if it drops
+    part way the run it started is polled with backoff instead. Either way
+    the run ends in a terminal state, or is cancelled at the timeout, and
+    the outcome records how many API calls it took. Client errors (4xx)
+    are not retried and come back as a failed outcome.
+    """
+    outcome = RunOutcome()
+    deadline = time.monotonic() + timeout
+    try:
+        stream = client.beta.threads.runs.create(
+            thread_id=thread_id, assistant_id=assistant_id, instructions=instructions, stream=True,
+            # Bounds the wait between events, so a silent stream cannot hang past the deadline
+            timeout=timeout,
+        )
+        outcome.api_calls += 1
+        outcome.streamed = True
+        with stream:
+            for event in stream:
+                data = event.data
+                if event.event == "thread.run.created":
+                    outcome.run_id = data.id
+                elif event.event == "thread.message.delta":
+                    for part in data.delta.content or []:
+                        if part.type == "text" and part.text and part.text.value:
+                            if outcome.first_token_seconds is None:
+                                outcome.first_token_seconds = round(time.monotonic() - outcome.started, 3)
+                            outcome.text += part.text.value
+                            if on_text:
+                                on_text(outcome.text)
+                elif event.event.startswith("thread.run.") and getattr(data, "status", None) in (
+                    TERMINAL_STATES | {ACTION_STATE}
+                ):
+                    outcome.status = data.status
+                    outcome.error = _error_text(data)
+                elif event.event == "error":
+                    outcome.status = "failed"
+                    outcome.error = getattr(data, "message", str(data))
+                if outcome.status is None and time.monotonic() > deadline:
+                    # Leave the loop; the run is cancelled below
+                    break
+    except TRANSIENT_ERRORS as e:
+        logging.warning(f"Run stream failed, falling back to polling: {e}")
+        if outcome.run_id is None:
+            if outcome.streamed:
+                # The stream opened but we never learned the run id
+                return _fail(outcome, e)
+            try:
+                run = client.beta.threads.runs.create(
+                    thread_id=thread_id, assistant_id=assistant_id, instructions=instructions
+                )
+            except TRANSIENT_ERRORS:
+                raise
+            except openai.APIStatusError as e:
+                return _fail(outcome, e)
+            outcome.api_calls += 1
+            outcome.run_id = run.id
+    except openai.APIStatusError as e:
+        logging.warning(f"Run was rejected: {e}")
+        if outcome.run_id is None:
+            return _fail(outcome, e)
+
+    if outcome.status is None and outcome.run_id is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            cancel_run(client, thread_id, outcome.run_id)
+            outcome.api_calls += 1
+            outcome.status = "timed_out"
+            outcome.error = f"Run did not finish within {timeout}s"
+        else:
+            wait_for_run(client, thread_id, outcome.run_id, timeout=remaining, outcome=outcome)
+    elif outcome.status is None:
+        outcome.status = "failed"
+        outcome.error = "Stream ended before the run was created"
+
+    outcome.elapsed_seconds = round(time.monotonic() - outcome.started, 3)
+    return outcome
@@ -0,0 +1,202 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import openai
+
+# Seconds between background probes of the assistant backend, and how long one may take
+PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL", 15))
+PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT", 3))
+# Consecutive failures that open the circuit, and how long it stays open before a trial call
+FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURES", 3))
+RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", 30))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Errors that say the backend is unreachable or unwell, rather than that the request was wrong
+BACKEND_ERRORS = (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError,
+                  openai.RateLimitError)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend the breaker considers down"""
+
+
+class CircuitBreaker:
+    """Fails fast while a backend keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls are refused without waiting. Once `reset_seconds` have passed it
+    goes half-open and lets a single trial call through: success closes the
+    circuit, failure opens it for another period. A caller that got a trial
+    from `allow()` must end it with `record_success`, `record_failure` or
+    `release` (for calls that failed for reasons of their own), or no other
+    call is let through until the next probe; `guard()` does this itself.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_seconds=RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self._trial_owner = None
+        self._lock = threading.Lock()
+
+    @property
+    def _trial_running(self):
+        return self._trial_owner is not None
+
+    def allow(self):
+        """Whether a call may go ahead now; in half-open state only one trial at a time"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_owner = threading.get_ident()
+                return True
+            return False
+
+    def available(self):
+        """Whether `allow()` would let a call through now, without taking the half-open trial"""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_seconds
+            return self.state == CLOSED or not self._trial_running
+
+    def release(self):
+        """End this thread's trial call without a verdict; a no-op when it holds none"""
+        with self._lock:
+            if self._trial_owner == threading.get_ident():
+                self._trial_owner = None
+
+    def retry_in(self):
+        """Seconds until the next trial call, 0 when calls are allowed"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logging.info("Assistant backend recovered, closing circuit")
+            self.state = CLOSED
+            self.failures = 0
+            self.last_error = None
+            self._trial_owner = None
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error) if error is not None else self.last_error
+            self._trial_owner = None
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logging.warning(f"Assistant backend failing ({self.last_error}), opening circuit")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    @contextmanager
+    def guard(self):
+        """Run a block through the breaker; backend errors count as failures and are re-raised"""
+        if not self.allow():
+            raise CircuitOpenError(f"Assistant backend unavailable, retrying in {self.retry_in():.0f}s")
+        try:
+            yield
+        except BACKEND_ERRORS as e:
+            self.record_failure(e)
+            raise
+        except openai.APIError:
+            # The backend answered; the request itself was at fault
+            self.record_success()
+            raise
+        except BaseException:
+            # Our own bug or an interrupted script says nothing about the backend
+            self.release()
+            raise
+        else:
+            self.record_success()
+
+
+class HealthMonitor:
+    """Probes the assistant backend on a background thread and caches the result.
+
+    Readers get the last probe instantly instead of opening a connection of
+    their own. Probe results feed the circuit breaker, so an outage opens it
+    before any user action has to time out, and a recovery closes it again.
+    """
+
+    def __init__(self, client, breaker=None, interval=PROBE_INTERVAL_SECONDS, timeout=PROBE_TIMEOUT_SECONDS):
+        self.client = client.with_options(timeout=timeout, max_retries=0)
+        self.breaker = breaker or CircuitBreaker()
+        self.interval = interval
+        self.healthy = None
+        self.latency_ms = None
+        self.checked_at = None
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def probe(self):
+        started = time.monotonic()
+        try:
+            self.client.models.list()
+            error = None
+        except openai.APIStatusError as e:
+            # Any answer below 500 (even 401/404) means the backend is up and responding
+            error = None if e.status_code < 500 else e
+        except Exception as e:
+            error = e
+        self.latency_ms = round((time.monotonic() - started) * 1000, 1)
+        self.checked_at = time.time()
+        self.healthy = error is None
+        self.error = None if error is None else str(error)
+        if self.healthy:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure(error)
+        return self.healthy
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="assistant-health", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        return {
+            "healthy": self.healthy,
+            "latency_ms": self.latency_ms,
+            "checked_at": self.checked_at,
+            "error": self.error,
+            "breaker": self.breaker.state,
+            "retry_in": round(self.breaker.retry_in(), 1),
+        }
+
+
+_monitors = {}
+_monitors_lock = threading.Lock()
+
+
+def get_monitor(client, **kwargs):
+    """One running monitor per backend URL for the life of the process, shared across Streamlit reruns"""
+    key = str(client.base_url)
+    with _monitors_lock:
+        if key not in _monitors:
+            _monitors[key] = HealthMonitor(client, **kwargs).start()
+        return _monitors[key]
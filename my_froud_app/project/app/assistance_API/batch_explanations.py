@@ -0,0 +1,349 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+import openai
+import pandas as pd
+
+# The scoring app's modules and its stored runs live one directory up
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+from run_store import load_columns
+
+PROCESSED_FOLDER = os.path.join(APP_DIR, "processed_data")
+EXPLANATIONS_SUFFIX = "_llm_explanations.jsonl"
+
+MODEL = os.getenv("EXPLAIN_MODEL", "gpt-4o-mini")
+CONCURRENCY = int(os.getenv("EXPLAIN_CONCURRENCY", 16))
+REQUESTS_PER_MINUTE = int(os.getenv("EXPLAIN_RPM", 500))
+TOKENS_PER_MINUTE = int(os.getenv("EXPLAIN_TPM", 200_000))
+MAX_COMPLETION_TOKENS = 160
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+# Seconds of the per-minute budget that may be spent in one burst
+BURST_SECONDS = 10
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError,
+                    openai.InternalServerError)
+
+SYSTEM_PROMPT = (
+    "You are a fraud analyst. Given one card transaction flagged by fraud models and the features "
+    "that contributed most to the flag, explain in two or three plain sentences why it looks "
+    "suspicious and what an investigator should check first."
+)
+# Transaction fields included in each prompt
+PROMPT_COLUMNS = [
+    "transaction_id", "user_name", "transaction_amount", "merchant_category", "datetime", "bank",
+    "location", "is_foreign", "transaction_type", "credit_card_type", "transaction_frequency",
+    "time_since_last_txn_hrs", "anomaly_score", "risk_score", "rapid_succession", "unusual_amount",
+    "TF_Prediction", "XGB_Prediction", "Meta_Prediction", "fraud_reasons",
+]
+
+
+def output_path(run_id, folder=PROCESSED_FOLDER):
+    return os.path.join(folder, f"{run_id}{EXPLANATIONS_SUFFIX}")
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token, plus the completion budget
+    return len(text) // 4 + MAX_COMPLETION_TOKENS
+
+
+class RateLimiter:
+    """Token buckets for requests and tokens per minute, shared by all workers.
+
+    Waiters are served in arrival order. Each request reserves its estimated
+    tokens up front and `settle` corrects the bucket with the real usage.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+        self.request_rate = requests_per_minute / 60
+        self.token_rate = tokens_per_minute / 60
+        self.request_capacity = max(1.0, self.request_rate * BURST_SECONDS)
+        self.token_capacity = max(float(MAX_COMPLETION_TOKENS), self.token_rate * BURST_SECONDS)
+        self.requests = self.request_capacity
+        self.tokens = self.token_capacity
+        self.updated = time.monotonic()
+        self.waited_seconds = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed, self.updated = now - self.updated, now
+        self.requests = min(self.request_capacity, self.requests + elapsed * self.request_rate)
+        self.tokens = min(self.token_capacity, self.tokens + elapsed * self.token_rate)
+
+    async def acquire(self, tokens):
+        tokens = min(tokens, self.token_capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.requests >= 1 and self.tokens >= tokens:
+                    self.requests -= 1
+                    self.tokens -= tokens
+                    return
+                wait = max((1 - self.requests) / self.request_rate, (tokens - self.tokens) / self.token_rate)
+                self.waited_seconds += wait
+                await asyncio.sleep(wait)
+
+    def settle(self, reserved, used):
+        self.tokens += reserved - used
+
+    def pause(self, seconds):
+        """Empty the request bucket so nobody starts a request for `seconds` (after a 429)"""
+        self.requests = min(self.requests, -seconds * self.request_rate)
+
+
+def transaction_prompt(row):
+    fields = "\n".join(f"- {key}: {value}" for key, value in row.items() if key != "row" and value not in ("", None))
+    return f"Flagged transaction:\n{fields}"
+
+
+def retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def flagged_rows(run_id, folder=PROCESSED_FOLDER, limit=None):
+    """Rows of a stored run that a model flagged, as prompt-ready dicts keyed by row number"""
+    df = load_columns(run_id, folder, PROMPT_COLUMNS)
+    if df.empty:
+        return []
+    if "fraud_reasons" in df.columns:
+        mask = df["fraud_reasons"].fillna("") != ""
+    else:
+        mask = df["Meta_Prediction"] == "Fraudulent"
+    flagged = df[mask]
+    if "risk_score" in flagged.columns:
+        flagged = flagged.sort_values("risk_score", ascending=False)
+    if limit:
+        flagged = flagged.head(limit)
+    numeric = flagged.select_dtypes("number").columns
+    flagged = flagged.assign(**{col: flagged[col].round(3) for col in numeric})
+    # Missing fields are left out of the prompt rather than sent as "nan"
+    return [
+        {"row": int(index), **{key: str(value) for key, value in row.items() if not pd.isna(value)}}
+        for index, row in zip(flagged.index, flagged.to_dict("records"))
+    ]
+
+
+def read_records(path):
+    """Records written so far to an explanations file"""
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # a line cut short when the job was killed
+
+
+def ends_with_newline(path):
+    """True for an empty file or one whose last line is complete"""
+    with open(path, "rb") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def done_rows(path):
+    """Rows already explained in an earlier, possibly interrupted, job"""
+    return {record["row"] for record in read_records(path) if record.get("explanation")}
+
+
+def compact(path):
+    """Rewrite `path` with one line per row: its explanation, or else its latest failure"""
+    latest = {}
+    for record in read_records(path):
+        previous = latest.get(record["row"])
+        if previous is None or record.get("explanation") or not previous.get("explanation"):
+            latest[record["row"]] = record
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as out:
+        for record in latest.values():
+            out.write(json.dumps(record) + "\n")
+    os.replace(tmp_path, path)
+
+
+class BatchStats:
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.retries = 0
+        self.tokens = 0
+        self.started = time.monotonic()
+
+    def summary(self, limiter):
+        elapsed = time.monotonic() - self.started
+        return {
+            "total": self.total, "done": self.done, "failed": self.failed, "retries": self.retries,
+            "tokens": self.tokens, "elapsed_seconds": round(elapsed, 2),
+            "per_minute": round(self.done / elapsed * 60, 1) if elapsed else None,
+            "rate_limit_wait_seconds": round(limiter.waited_seconds, 2),
+        }
+
+
+async def explain_one(client, limiter, row, model, stats):
+    prompt = transaction_prompt(row)
+    reserved = estimate_tokens(SYSTEM_PROMPT + prompt)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        await limiter.acquire(reserved)
+        try:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
+                max_tokens=MAX_COMPLETION_TOKENS,
+            )
+        except RETRYABLE_ERRORS as e:
+            limiter.settle(reserved, 0)
+            if attempt == MAX_ATTEMPTS:
+                return {"row": row["row"], "explanation": None, "error": str(e), "attempts": attempt}
+            # Full jitter, but never sooner than the server asked for
+            delay = random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+            if isinstance(e, openai.RateLimitError):
+                delay = max(delay, retry_after(e) or 0)
+                limiter.pause(delay)
+            stats.retries += 1
+            await asyncio.sleep(delay)
+            continue
+        except openai.APIError as e:
+            # Bad request and the like: retrying will not help
+            limiter.settle(reserved, 0)
+            return {"row": row["row"], "explanation": None, "error": str(e), "attempts": attempt}
+        used = response.usage.total_tokens if response.usage else reserved
+        limiter.settle(reserved, used)
+        stats.tokens += used
+        return {"row": row["row"], "transaction_id": row.get("transaction_id"),
+                "explanation": response.choices[0].message.content, "tokens": used, "attempts": attempt}
+
+
+async def explain_rows(client, rows, path, model=MODEL, concurrency=CONCURRENCY, limiter=None, on_progress=None):
+    """Explain rows on `concurrency` workers, appending each result to `path` as it arrives.
+
+    Rows already explained in `path` are skipped, so an interrupted job
+    resumes where it stopped; retried rows replace their earlier failures
+    once the job is done. `on_progress(stats)` is called after every result.
+    """
+    limiter = limiter or RateLimiter()
+    finished = done_rows(path)
+    rows = [row for row in rows if row["row"] not in finished]
+    stats = BatchStats(len(rows))
+    queue = asyncio.Queue()
+    for row in rows:
+        queue.put_nowait(row)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as out:
+        if not ends_with_newline(path):
+            out.write("\n")  # a killed job's last line was cut short; start clear of it
+
+        async def worker():
+            while True:
+                try:
+                    row = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                result = await explain_one(client, limiter, row, model, stats)
+                if result["explanation"] is None:
+                    stats.failed += 1
+                else:
+                    stats.done += 1
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                if on_progress:
+                    on_progress(stats)
+
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, len(rows)) or 1)))
+    compact(path)
+    return stats.summary(limiter)
+
+
+def explain_run(run_id, folder=PROCESSED_FOLDER, limit=None, model=MODEL, concurrency=CONCURRENCY,
+                requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE, on_progress=None):
+    """Narrative explanations for a stored run's flagged rows, written to {run_id}_llm_explanations.jsonl"""
+    rows = flagged_rows(run_id, folder, limit)
+    path = output_path(run_id, folder)
+
+    async def main():
+        # Retries are handled here, with the rate limiter, rather than inside the SDK
+        async with openai.AsyncOpenAI(max_retries=0) as client:
+            return await explain_rows(client, rows, path, model, concurrency,
+                                      RateLimiter(requests_per_minute, tokens_per_minute), on_progress)
+
+    summary = asyncio.run(main())
+    summary["output"] = path
+    return summary
+
+
+class ExplainJob(threading.Thread):
+    """`explain_run` on a background thread, so the page that started it stays responsive.
+
+    `stats` follows the job's progress; `summary` or `error` is set when it
+    ends. With a `breaker` the job takes its call permission on its own
+    thread and reports the outcome to it.
+    """
+
+    def __init__(self, run_id, folder=PROCESSED_FOLDER, breaker=None, **options):
+        super().__init__(name=f"explain-{run_id}", daemon=True)
+        self.run_id = run_id
+        self.folder = folder
+        self.breaker = breaker
+        self.options = options
+        self.stats = None
+        self.summary = None
+        self.error = None
+
+    def _progress(self, stats):
+        self.stats = stats
+
+    def run(self):
+        if self.breaker and not self.breaker.allow():
+            self.error = "The assistant service is unavailable"
+            return
+        try:
+            self.summary = explain_run(self.run_id, self.folder, on_progress=self._progress, **self.options)
+            if self.breaker:
+                if self.summary["total"] and self.summary["failed"] == self.summary["total"]:
+                    self.breaker.record_failure("every explanation request failed")
+                else:
+                    self.breaker.record_success()
+        except Exception as e:
+            logging.exception(f"Explaining run {self.run_id} failed")
+            self.error = str(e)
+        finally:
+            if self.breaker:
+                self.breaker.release()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Explain a run's flagged transactions with the LLM")
+    parser.add_argument("run_id")
+    parser.add_argument("--folder", default=PROCESSED_FOLDER)
+    parser.add_argument("--limit", type=int, help="Only the N riskiest flagged rows")
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rpm", type=int, default=REQUESTS_PER_MINUTE, help="Requests per minute")
+    parser.add_argument("--tpm", type=int, default=TOKENS_PER_MINUTE, help="Tokens per minute")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    def progress(stats):
+        finished = stats.done + stats.failed
+        if finished % 100 == 0 or finished == stats.total:
+            print(f"[EXPLAIN] {finished}/{stats.total} ({stats.failed} failed, {stats.retries} retries)", flush=True)
+
+    print(json.dumps(explain_run(args.run_id, args.folder, args.limit, args.model, args.concurrency,
+                                 args.rpm, args.tpm, progress), indent=2))
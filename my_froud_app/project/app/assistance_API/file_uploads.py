@@ -0,0 +1,121 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Files uploaded at once; uploads are network bound, so a few threads are enough
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", 4))
+HASH_CHUNK_BYTES = 1 << 20
+
+
+def content_hash(file):
+    """SHA-256 of a file path or binary file object, read in chunks; file objects are rewound"""
+    digest = hashlib.sha256()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                digest.update(chunk)
+    else:
+        file.seek(0)
+        for chunk in iter(lambda: file.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+        file.seek(0)
+    return digest.hexdigest()
+
+
+class FileIndex:
+    """Content hash -> uploaded file id, kept in a JSON file so re-clicks and restarts reuse uploads"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable upload index {path}: {e}")
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def put(self, key, **entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._save()
+
+    def forget(self, file_id):
+        """Drop a file id that no longer exists on the server"""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry["file_id"] == file_id]
+            for key in keys:
+                del self._entries[key]
+            if keys:
+                self._save()
+        return bool(keys)
+
+
+def _upload_one(client, name, file, purpose):
+    started = time.monotonic()
+    if isinstance(file, (str, os.PathLike)):
+        # The SDK streams an open file in chunks instead of loading it whole
+        with open(file, "rb") as f:
+            response = client.files.create(file=(name, f), purpose=purpose)
+    else:
+        file.seek(0)
+        response = client.files.create(file=(name, file), purpose=purpose)
+    return response.id, round(time.monotonic() - started, 3)
+
+
+def upload_files(client, files, index, purpose="assistants", workers=UPLOAD_WORKERS):
+    """Upload (name, path or file object) pairs concurrently, skipping content already uploaded.
+
+    Yields (name, result) as each file finishes, so the caller can show
+    progress from its own thread. A result has status "uploaded", "reused"
+    or "failed", plus file_id, content_hash, seconds and error. Identical
+    files in one batch are uploaded once.
+    """
+    files = list(files)
+    if not files:
+        return
+    with ThreadPoolExecutor(max_workers=min(workers, len(files))) as pool:
+        hashes = list(pool.map(lambda item: content_hash(item[1]), files))
+
+        pending, waiting = {}, {}
+        for (name, file), key in zip(files, hashes):
+            known = index.get(key)
+            if known:
+                yield name, {"status": "reused", "file_id": known["file_id"], "content_hash": key,
+                             "seconds": 0.0, "error": None}
+            elif key in waiting:
+                waiting[key].append(name)
+            else:
+                waiting[key] = []
+                pending[pool.submit(_upload_one, client, name, file, purpose)] = (name, key)
+
+        for future in as_completed(pending):
+            name, key = pending[future]
+            try:
+                file_id, seconds = future.result()
+            except Exception as e:
+                logging.warning(f"Upload of {name} failed: {e}")
+                result = {"status": "failed", "file_id": None, "content_hash": key, "seconds": None, "error": str(e)}
+            else:
+                index.put(key, file_id=file_id, filename=name, uploaded=time.time())
+                result = {"status": "uploaded", "file_id": file_id, "content_hash": key, "seconds": seconds,
+                          "error": None}
+            yield name, result
+            for duplicate in waiting[key]:
+                yield duplicate, dict(result, status="reused" if result["file_id"] else "failed", seconds=0.0)
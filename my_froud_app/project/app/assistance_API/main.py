@@ -1,14 +1,31 @@
 import os
+import sys
 from dotenv import load_dotenv
 import openai
 import requests
 import json
 from openai import OpenAI
-import socket  # For checking internet connection
-import time
 import logging
 from datetime import datetime
+import pandas as pd
 import streamlit as st
+from assistant_runs import stream_run
+from message_store import ThreadMessages
+from answer_cache import answer_key, dataset_fingerprint, fingerprint, open_cache
+from file_uploads import FileIndex, upload_files
+from backend_health import BACKEND_ERRORS, CircuitOpenError, get_monitor
+from batch_explanations import ExplainJob
+
+# The scoring app's modules and its stored runs live one directory up
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+from data_digest import build_digest, digest_markdown, digest_paths, save_digest
+from run_store import list_runs, load_columns
+
+PROCESSED_FOLDER = os.path.join(APP_DIR, "processed_data")
+ANSWER_CACHE_PATH = os.path.join(APP_DIR, "state", "assistant_answers.sqlite3")
+# Content hash -> file id of everything already uploaded to the assistant
+UPLOAD_INDEX_PATH = os.path.join(APP_DIR, "state", "assistant_files.json")
 
 st.set_page_config(page_title="AI-based Fraud Detector", page_icon=":detective:")
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -79,15 +96,44 @@ model = "gpt-4o-mini"#gpt-4-1106-preview"
 thread_id = "thread_K9iIgkd8J8w55bSOLo3n1h9U"
 assis_id = "asst_TZrMZTdIN7ji0DiyBu2okNEI"
 
+# Additional run instructions; part of the answer cache key, so editing them retires old answers
+ANALYST_INSTRUCTIONS = """Thoroughness and Attention to Detail: Carefully examine all available evidence, including financial records,
+                            communication logs, and witness statements. Pay close attention to inconsistencies, anomalies, and suspicious patterns.Ability or expertise to utilize machine learning to it's full pottential.
+                            Data Analysis Skills: Develop strong analytical skills to identify trends, correlations, and outliers in large datasets. Utilize data visualization tools to effectively present findings.
+                            Communication and Reporting: Clearly and concisely document findings, investigative steps, and conclusions in reports for legal and regulatory purposes. Effectively communicate findings to stakeholders, including law enforcement, legal counsel, and management.
+                            Ethical Conduct: Maintain the highest ethical standards throughout the investigation process. Respect the privacy and rights of all individuals involved."""
+
+answer_cache = open_cache(ANSWER_CACHE_PATH)
+
 if "file_id_list" not in st.session_state:
     st.session_state.file_id_list = []
 
+# Digest Markdown per dataset, sent as the thread's first message
+if "digests" not in st.session_state:
+    st.session_state.digests = {}
+
+# Content hash per dataset given to the assistant; together they key the answer cache
+if "content_hashes" not in st.session_state:
+    st.session_state.content_hashes = {}
+
 if "start_chat" not in st.session_state:
     st.session_state.start_chat = False
 
 if "thread_id" not in st.session_state:
     st.session_state.thread_id = None
 
+# Fingerprint of the digests and files the current thread was created with; keys its answers
+if "thread_context" not in st.session_state:
+    st.session_state.thread_context = None
+
+# Cached question/answer messages not yet posted to the thread, oldest first
+if "pending_turns" not in st.session_state:
+    st.session_state.pending_turns = []
+
+# Background job explaining a run's flagged rows, started from the sidebar
+if "explain_job" not in st.session_state:
+    st.session_state.explain_job = None
+
 if "openai_model" not in st.session_state:
     st.session_state.openai_model = "gpt-4o-mini"
 
@@ -98,31 +144,80 @@ if "messages" not in st.session_state:
 
 
 
-def check_internet_connection():
-    """Checks if the device is connected to the internet."""
-    try:
-        # Attempt to resolve a public DNS name
-        socket.create_connection(("8.8.8.8", 53), timeout=2)
-        return True
-    except OSError:
-        return False
+# Background probe of the assistant backend; calls go through its circuit breaker and fail fast while it is down
+health = get_monitor(client)
 
 
-# ==== Function definitions etc =====
-def upload_to_openai(filepath):
-    """Uploads a file to OpenAI API."""
-    try:
-        with open(filepath, "rb") as file:
-            response = client.files.create(file=file.read(), purpose="assistants")
-        return response.id
-    except openai.error.APIConnectionError:
-        st.error("Unable to connect to OpenAI API. Please check your internet connection.")
-        return None
-    except Exception as e:
-        st.error(f"An unexpected error occurred: {e}")
-        return None
+def backend_unavailable_message():
+    status = health.status()
+    return (f"The assistant service is unavailable ({status['error'] or 'recent calls failed'}). "
+            f"Retrying automatically in {status['retry_in']:.0f}s.")
 
 
+# ==== Function definitions etc =====
+def run_digest(run_id):
+    """Digest Markdown of a run scored by the main app, built now for runs scored before digests existed."""
+    path = digest_paths(PROCESSED_FOLDER, run_id)["markdown"]
+    if not os.path.exists(path):
+        save_digest(build_digest(load_columns(run_id, PROCESSED_FOLDER), run_id), run_id, PROCESSED_FOLDER)
+    with open(path) as f:
+        return f.read()
+
+
+def context_messages():
+    """First thread message carrying the dataset digests and any uploaded files."""
+    if not st.session_state.digests and not st.session_state.file_id_list:
+        return []
+    content = "Answer my questions using the following dataset digests and attached files."
+    if st.session_state.digests:
+        content += "\n\n" + "\n\n".join(st.session_state.digests.values())
+    return [{
+        "role": "user",
+        "content": content,
+        "attachments": [
+            {"file_id": file_id, "tools": [{"type": "code_interpreter"}]}
+            for file_id in st.session_state.file_id_list
+        ],
+    }]
+
+
+
+def post_pending_turns():
+    """Post cached turns to the thread so later runs see the whole conversation"""
+    while st.session_state.pending_turns:
+        role, content = st.session_state.pending_turns[0]
+        client.beta.threads.messages.create(thread_id=st.session_state.thread_id, role=role, content=content)
+        st.session_state.pending_turns.pop(0)
+
+
+def show_explain_job(job):
+    """Progress of an explanation job, refreshed on its own while the job runs"""
+    running = job.is_alive()
+
+    @st.fragment(run_every=2 if running else None)
+    def status():
+        if job.is_alive():
+            stats = job.stats
+            if stats and stats.total:
+                finished = stats.done + stats.failed
+                st.progress(finished / stats.total,
+                            text=f"{finished}/{stats.total} explained ({stats.failed} failed)")
+            else:
+                st.caption(f"Explaining flagged transactions of run {job.run_id}...")
+        elif running:
+            # Finished since the page was drawn: redraw it without the refresh timer
+            st.rerun()
+        elif job.error:
+            st.error(f"Could not explain run {job.run_id}: {job.error}")
+        else:
+            summary = job.summary
+            st.write(f"Explained {summary['done']} transactions in {summary['elapsed_seconds']:.0f}s "
+                     f"({summary['failed']} failed)")
+            with open(summary["output"], "rb") as f:
+                st.download_button("Download explanations", f, file_name=os.path.basename(summary["output"]))
+
+    status()
+
 
 # === Sidebar: Multiple File Upload ===
 with st.sidebar:
@@ -136,18 +231,99 @@ with st.sidebar:
 # Upload button
 with st.sidebar:
     if st.button("transfer the Files to Open AI"):
-        if not check_internet_connection():
-            st.warning("No internet connection. Please check your connection and try again.")
-        elif uploaded_files:
+        if uploaded_files:
+            to_upload = []
             for file_uploaded in uploaded_files:
-                with open(file_uploaded.name, "wb") as f:
-                    f.write(file_uploaded.getbuffer())
-                file_id = upload_to_openai(file_uploaded.name)
-                if file_id:
-                    st.session_state.file_id_list.append(file_id)
-                    st.write(f"Uploaded: {file_uploaded.name} (ID: {file_id})")
-                else:
-                    st.error(f"Failed to upload {file_uploaded.name}")
+                if not file_uploaded.name.lower().endswith(".csv"):
+                    to_upload.append(file_uploaded)
+                    continue
+                # Only the digest goes to the assistant, never the raw rows
+                try:
+                    digest = build_digest(pd.read_csv(file_uploaded), os.path.splitext(file_uploaded.name)[0])
+                except Exception as e:
+                    st.error(f"Could not summarise {file_uploaded.name}: {e}")
+                    continue
+                markdown = digest_markdown(digest)
+                st.session_state.digests[file_uploaded.name] = markdown
+                st.session_state.content_hashes[file_uploaded.name] = fingerprint(markdown)
+                st.write(f"Summarised: {file_uploaded.name} ({len(markdown) / 1024:.1f} KB digest)")
+
+            # Everything else goes up concurrently; files uploaded before are reused by content hash
+            if to_upload and not health.breaker.allow():
+                st.warning(backend_unavailable_message())
+            elif to_upload:
+                try:
+                    progress = st.progress(0.0, text=f"Uploading {len(to_upload)} files...")
+                    rows = {f.name: st.empty() for f in to_upload}
+                    for row in rows.values():
+                        row.write("⏳ waiting")
+                    done, failures = 0, []
+                    results = upload_files(client, [(f.name, f) for f in to_upload], FileIndex(UPLOAD_INDEX_PATH))
+                    for name, result in results:
+                        done += 1
+                        progress.progress(done / len(to_upload), text=f"{done}/{len(to_upload)} files")
+                        if result["file_id"]:
+                            if result["file_id"] not in st.session_state.file_id_list:
+                                st.session_state.file_id_list.append(result["file_id"])
+                            st.session_state.content_hashes[name] = result["content_hash"]
+                            label = "Uploaded" if result["status"] == "uploaded" else "Already uploaded"
+                            rows[name].write(f"✅ {label}: {name} (ID: {result['file_id']})")
+                        else:
+                            rows[name].error(f"Failed to upload {name}: {result['error']}")
+                            failures.append(result["error"])
+                    # Only a batch where nothing got through counts against the backend
+                    if len(failures) == len(to_upload):
+                        health.breaker.record_failure(failures[-1])
+                    else:
+                        health.breaker.record_success()
+                finally:
+                    # A half-open trial must end on every path, or the breaker stays shut until the next probe
+                    health.breaker.release()
+
+# Runs already scored by the main app come with a digest
+with st.sidebar:
+    stored_runs = [run["run_id"] for run in list_runs(PROCESSED_FOLDER)]
+    if stored_runs:
+        selected_run = st.selectbox("Or analyse a scored run", stored_runs)
+        if st.button("Use this run"):
+            try:
+                st.session_state.digests[selected_run] = run_digest(selected_run)
+                st.session_state.content_hashes[selected_run] = fingerprint(st.session_state.digests[selected_run])
+                st.write(f"Added digest for run {selected_run}")
+            except Exception as e:
+                st.error(f"Could not load run {selected_run}: {e}")
+
+        # Narrative explanations for every flagged row, many requests at once within the rate limits.
+        # The job runs on its own thread, so the page stays usable while it works
+        if st.button("Explain flagged transactions"):
+            job = st.session_state.explain_job
+            if job and job.is_alive():
+                st.info(f"Already explaining run {job.run_id}")
+            elif not health.breaker.available():
+                st.warning(backend_unavailable_message())
+            else:
+                st.session_state.explain_job = ExplainJob(selected_run, PROCESSED_FOLDER, breaker=health.breaker)
+                st.session_state.explain_job.start()
+        if st.session_state.explain_job:
+            show_explain_job(st.session_state.explain_job)
+
+# Repeated questions about the same data are answered from the cache
+with st.sidebar:
+    bypass_cache = st.checkbox("Ask again (bypass answer cache)", value=False)
+    cache_stats = answer_cache.stats()
+    st.caption(
+        f"Answer cache: {cache_stats['size']} answers, {cache_stats['hits']} hits, {cache_stats['misses']} misses"
+        + (f" ({cache_stats['hit_rate']}% hit rate)" if cache_stats["hit_rate"] is not None else "")
+    )
+    if st.button("Clear answer cache"):
+        answer_cache.clear()
+    backend = health.status()
+    if backend["healthy"] is None:
+        st.caption("Assistant service: checking...")
+    elif backend["breaker"] == "closed":
+        st.caption(f"🟢 Assistant service OK ({backend['latency_ms']} ms)")
+    else:
+        st.caption(f"🔴 Assistant service unavailable, retrying in {backend['retry_in']:.0f}s")
 
 # # Display those file ids
 # if st.session_state.file_id_list:
@@ -161,65 +337,31 @@ with st.sidebar:
 
 # Button to initiate the chat session
 if st.sidebar.button("Start Chatting..."):
-    if st.session_state.file_id_list:
+    if st.session_state.file_id_list or st.session_state.digests:
         st.session_state.start_chat = True
 
-        # Create a new thread for this chat session
-        chat_thread = client.beta.threads.create()
-        st.session_state.thread_id = chat_thread.id
-        st.write("Thread ID:", chat_thread.id)
+        # Create a new thread for this chat session, opening with the data context
+        try:
+            with health.breaker.guard():
+                chat_thread = client.beta.threads.create(messages=context_messages())
+        except CircuitOpenError:
+            st.session_state.start_chat = False
+            st.sidebar.warning(backend_unavailable_message())
+        except BACKEND_ERRORS as e:
+            st.session_state.start_chat = False
+            st.sidebar.error(f"Could not start the chat: {e}")
+        else:
+            st.session_state.thread_id = chat_thread.id
+            st.session_state.thread_context = dataset_fingerprint(st.session_state.content_hashes.values())
+            st.session_state.pending_turns = []
+            # Local copy of the thread: each turn fetches only the messages it added
+            st.session_state.thread_messages = ThreadMessages(client, chat_thread.id)
+            st.write("Thread ID:", chat_thread.id)
     else:
         st.sidebar.warning(
             "No files found. Please upload at least one file to get started."
         )
 
-# Define the function to process messages with citations
-def process_message_with_citations(message):
-    """Extract content and annotations from the message and format citations as footnotes."""
-    # Check if message has content and it's not empty
-    if not message.content:
-        return "No content available in the message"
-    
-    # Get the first content item (text or image)
-    first_content = message.content[0]
-    
-    # Check if it's a text content type
-    if first_content.type != "text":
-        return "Message contains non-text content that cannot be processed"
-    
-    message_content = first_content.text
-    annotations = message_content.annotations if hasattr(message_content, "annotations") else []
-    citations = []
-
-    # Iterate over the annotations and add footnotes
-    for index, annotation in enumerate(annotations):
-        # Replace the text with a footnote
-        message_content.value = message_content.value.replace(
-            annotation.text, f" [{index + 1}]"
-        )
-
-        # Gather citations based on annotation attributes
-        if file_citation := getattr(annotation, "file_citation", None):
-            # Retrieve the cited file details (dummy response here since we can't call OpenAI)
-            cited_file = {
-                "filename": "card_transdata (original).csv"
-            }  # This should be replaced with actual file retrieval
-            citations.append(
-                f'[{index + 1}] {file_citation.quote} from {cited_file["filename"]}'
-            )
-        elif file_path := getattr(annotation, "file_path", None):
-            # Placeholder for file download citation
-            cited_file = {
-                "filename": "card_transdata (original).csv"
-            }  # TODO: This should be replaced with actual file retrieval
-            citations.append(
-                f'[{index + 1}] Click [here](#) to download {cited_file["filename"]}'
-            )  # The download link should be replaced with the actual download path
-
-    # Add footnotes to the end of the message content
-    full_response = message_content.value + "\n\n" + "\n".join(citations)
-    return full_response
-
 # the main interface ...
 # App header
 st.markdown("<h1 class='main-title'>Advanced Fraud Analytics</h1>", unsafe_allow_html=True)
@@ -244,47 +386,84 @@ if st.session_state.start_chat:
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # add the user's message to the existing thread
-        client.beta.threads.messages.create(
-            thread_id=st.session_state.thread_id, role="user", content=prompt
+        # Same data, question and instructions as an earlier run: answer from the cache.
+        # Data added after the thread was created never reached it, so it is not in the key
+        cache_key = answer_key(
+            st.session_state.thread_context, prompt,
+            ANALYST_INSTRUCTIONS, st.session_state.openai_model, assis_id,
         )
-
-        # Create a run with additioal instructions
-        run = client.beta.threads.runs.create(
-            thread_id=st.session_state.thread_id,
-            assistant_id=assis_id,
-            instructions="""Thoroughness and Attention to Detail: Carefully examine all available evidence, including financial records,
-                            communication logs, and witness statements. Pay close attention to inconsistencies, anomalies, and suspicious patterns.Ability or expertise to utilize machine learning to it's full pottential.
-                            Data Analysis Skills: Develop strong analytical skills to identify trends, correlations, and outliers in large datasets. Utilize data visualization tools to effectively present findings.
-                            Communication and Reporting: Clearly and concisely document findings, investigative steps, and conclusions in reports for legal and regulatory purposes. Effectively communicate findings to stakeholders, including law enforcement, legal counsel, and management.
-                            Ethical Conduct: Maintain the highest ethical standards throughout the investigation process. Respect the privacy and rights of all individuals involved.""",
-        )
-
-        # Show a spinner while the assistant is thinking...
-        with st.spinner("Wait... Generating response..."):
-            while run.status != "completed":
-                time.sleep(1)
-                run = client.beta.threads.runs.retrieve(
-                    thread_id=st.session_state.thread_id, run_id=run.id
-                )
-            # Retrieve messages added by the assistant
-            messages = client.beta.threads.messages.list(
-                thread_id=st.session_state.thread_id
-            )
-            # Process and display assis messages
-            assistant_messages_for_run = [
-                message
-                for message in messages
-                if message.run_id == run.id and message.role == "assistant"
-            ]
-
-            for message in assistant_messages_for_run:
-                full_response = process_message_with_citations(message=message)
-                st.session_state.messages.append(
-                    {"role": "assistant", "content": full_response}
+        cached = None if bypass_cache else answer_cache.get(cache_key)
+        if cached:
+            with st.chat_message("assistant"):
+                st.markdown(cached["answer"], unsafe_allow_html=True)
+                st.caption(f"Cached answer from {datetime.fromtimestamp(cached['created']):%Y-%m-%d %H:%M}")
+            st.session_state.messages.append({"role": "assistant", "content": cached["answer"]})
+            logging.info(f"Answered from cache: {cache_key[:12]}")
+            # The thread still needs the turn, or follow-up questions lose their context;
+            # if it cannot be posted now it goes out before the next run
+            st.session_state.pending_turns += [("user", prompt), ("assistant", cached["answer"])]
+            if health.breaker.allow():
+                try:
+                    post_pending_turns()
+                    health.breaker.record_success()
+                except BACKEND_ERRORS as e:
+                    health.breaker.record_failure(e)
+                    logging.warning(f"Cached turn not posted yet: {e}")
+                except openai.APIError as e:
+                    health.breaker.record_success()
+                    logging.warning(f"Cached turn not posted yet: {e}")
+                finally:
+                    health.breaker.release()
+        elif not health.breaker.allow():
+            with st.chat_message("assistant"):
+                st.warning(backend_unavailable_message())
+        else:
+            try:
+                # Turns answered from the cache first, then the user's message
+                post_pending_turns()
+                client.beta.threads.messages.create(
+                    thread_id=st.session_state.thread_id, role="user", content=prompt
                 )
+
+                # Create a run with additioal instructions and stream its reply as it is written
                 with st.chat_message("assistant"):
-                    st.markdown(full_response, unsafe_allow_html=True)
+                    placeholder = st.empty()
+                    placeholder.markdown("Wait... Generating response...")
+                    outcome = stream_run(
+                        client,
+                        st.session_state.thread_id,
+                        assis_id,
+                        on_text=lambda text: placeholder.markdown(text + "▌"),
+                        instructions=ANALYST_INSTRUCTIONS,
+                    )
+
+                    if outcome.completed:
+                        # The final messages carry the citation annotations the stream does not
+                        full_response = "\n\n".join(
+                            message["content"] for message in st.session_state.thread_messages.run_messages(outcome.run_id)
+                        ) or outcome.text
+                        placeholder.markdown(full_response, unsafe_allow_html=True)
+                        st.session_state.messages.append({"role": "assistant", "content": full_response})
+                        answer_cache.put(cache_key, full_response, run_id=outcome.run_id, elapsed_seconds=outcome.elapsed_seconds)
+                    else:
+                        placeholder.empty()
+                        st.error(f"The assistant run ended as '{outcome.status}'. {outcome.error or ''} Please try again.")
+                    logging.info(f"Assistant run finished: {outcome}")
+            except BACKEND_ERRORS as e:
+                health.breaker.record_failure(e)
+                st.error(f"Could not reach the assistant: {e}")
+            except openai.APIError as e:
+                # The backend answered; the request itself was refused
+                health.breaker.record_success()
+                st.error(f"The assistant refused the request: {e}")
+            else:
+                # A run that never finished points at the backend; any other ending is the run's own
+                if outcome.status == "timed_out":
+                    health.breaker.record_failure(outcome.error)
+                else:
+                    health.breaker.record_success()
+            finally:
+                health.breaker.release()
 
     else:
         # Promopt users to start chat
@@ -0,0 +1,109 @@
+import logging
+import threading
+
+# Messages fetched per page when catching up on a thread
+PAGE_SIZE = 100
+
+
+def rewrite_citations(text, annotations, filename_for):
+    """Replace each cited span with a [n] marker in one pass and build the matching footnotes.
+
+    Spans are cut by their start/end offsets, so the text is copied once
+    however many annotations there are. Annotations without offsets fall
+    back to replacing their text.
+    """
+    located = sorted(
+        (a for a in annotations if getattr(a, "start_index", None) is not None and getattr(a, "end_index", None) is not None),
+        key=lambda a: a.start_index,
+    )
+    located_ids = {id(a) for a in located}
+    unlocated = [a for a in annotations if id(a) not in located_ids]
+    parts, footnotes, position = [], [], 0
+    for annotation in located:
+        if annotation.start_index < position:
+            continue  # overlaps the previous span
+        footnotes.append(annotation)
+        parts += [text[position:annotation.start_index], f" [{len(footnotes)}]"]
+        position = annotation.end_index
+    parts.append(text[position:])
+    text = "".join(parts)
+    for annotation in unlocated:
+        if annotation.text and annotation.text in text:
+            footnotes.append(annotation)
+            text = text.replace(annotation.text, f" [{len(footnotes)}]")
+
+    citations = []
+    for number, annotation in enumerate(footnotes, 1):
+        if file_citation := getattr(annotation, "file_citation", None):
+            quote = getattr(file_citation, "quote", None)
+            source = filename_for(file_citation.file_id)
+            citations.append(f"[{number}] {quote} from {source}" if quote else f"[{number}] From {source}")
+        elif file_path := getattr(annotation, "file_path", None):
+            citations.append(f"[{number}] Generated file {filename_for(file_path.file_id)} ({file_path.file_id})")
+    return text + ("\n\n" + "\n".join(citations) if citations else "")
+
+
+class ThreadMessages:
+    """Local copy of one thread's messages, fetched incrementally and rendered once.
+
+    `sync` asks only for messages after the last one already stored, so a
+    turn costs the same however long the conversation is. Messages still
+    being written are not stored and are fetched again on the next sync.
+    Cited file names are looked up once per file.
+    """
+
+    def __init__(self, client, thread_id):
+        self.client = client
+        self.thread_id = thread_id
+        self.cursor = None
+        self.messages = []
+        self.by_run = {}
+        self.api_calls = 0
+        self._filenames = {}
+        self._lock = threading.Lock()
+
+    def filename_for(self, file_id):
+        if file_id not in self._filenames:
+            try:
+                self._filenames[file_id] = self.client.files.retrieve(file_id).filename
+                self.api_calls += 1
+            except Exception as e:
+                logging.warning(f"Could not look up cited file {file_id}: {e}")
+                self._filenames[file_id] = file_id
+        return self._filenames[file_id]
+
+    def render(self, message):
+        texts = [part.text for part in message.content if part.type == "text"]
+        if not texts:
+            return "Message contains non-text content that cannot be processed"
+        return "\n\n".join(rewrite_citations(text.value, text.annotations or [], self.filename_for) for text in texts)
+
+    def sync(self):
+        """Fetch and render messages added since the last sync; returns the new ones"""
+        added = []
+        with self._lock:
+            page = self.client.beta.threads.messages.list(
+                thread_id=self.thread_id, order="asc", limit=PAGE_SIZE,
+                **({"after": self.cursor} if self.cursor else {}),
+            )
+            self.api_calls += 1
+            while True:
+                for message in page.data:
+                    if getattr(message, "status", None) == "in_progress":
+                        return added
+                    entry = {"id": message.id, "role": message.role, "run_id": message.run_id,
+                             "content": self.render(message)}
+                    self.messages.append(entry)
+                    if message.role == "assistant" and message.run_id:
+                        self.by_run.setdefault(message.run_id, []).append(entry)
+                    added.append(entry)
+                    self.cursor = message.id
+                if not page.has_next_page():
+                    return added
+                page = page.get_next_page()
+                self.api_calls += 1
+
+    def run_messages(self, run_id):
+        """Rendered assistant messages written by one run"""
+        self.sync()
+        return self.by_run.get(run_id, [])
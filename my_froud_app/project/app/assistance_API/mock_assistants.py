@@ -0,0 +1,250 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+from flask import Flask, Response, jsonify, request
+
+# Seconds a non-streamed run stays in progress, and the delay between streamed tokens
+MOCK_RUN_SECONDS = float(os.getenv("MOCK_RUN_SECONDS", 1.0))
+MOCK_TOKEN_SECONDS = float(os.getenv("MOCK_TOKEN_SECONDS", 0.02))
+# Latency of a chat completion, and requests per minute accepted before answering 429 (0 = no limit)
+MOCK_COMPLETION_SECONDS = float(os.getenv("MOCK_COMPLETION_SECONDS", 0.5))
+MOCK_RPM = int(os.getenv("MOCK_RPM", 0))
+# Length of the window MOCK_RPM counts over; tests shorten it
+MOCK_RPM_WINDOW_SECONDS = float(os.getenv("MOCK_RPM_WINDOW_SECONDS", 60))
+
+# Put one of these in a question to get that run outcome
+OUTCOME_MARKERS = {"[fail]": "failed", "[expire]": "expired", "[hang]": "hang", "[incomplete]": "incomplete"}
+
+
+def _id(prefix):
+    return f"{prefix}_{uuid.uuid4().hex[:24]}"
+
+
+def create_mock_app():
+    """Local stand-in for the OpenAI assistants endpoints used by the fraud assistant.
+
+    Point the SDK at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 and
+    any API key. Threads, messages, runs (polled or streamed as server-sent
+    events) and file uploads are kept in memory; chat completions answer
+    after MOCK_COMPLETION_SECONDS and return 429 beyond MOCK_RPM; /mock/stats counts calls
+    per endpoint so tests can check how many requests a question cost.
+    """
+    app = Flask(__name__)
+    lock = threading.RLock()
+    threads, messages, runs, files = {}, {}, {}, {}
+    calls = Counter()
+    completion_times = deque()
+
+    @app.before_request
+    def count_call():
+        if not request.path.startswith("/mock/"):
+            calls[f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"] += 1
+
+    def message_object(thread_id, role, text, run_id=None, assistant_id=None):
+        message = {
+            "id": _id("msg"), "object": "thread.message", "created_at": int(time.time()),
+            "thread_id": thread_id, "role": role, "run_id": run_id, "assistant_id": assistant_id,
+            "status": "completed", "attachments": [], "metadata": {},
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+        }
+        with lock:
+            messages.setdefault(thread_id, []).append(message)
+        return message
+
+    def answer(question):
+        return (f"Mock analysis for: {question.strip()}\n\n"
+                "Fraudulent transactions cluster in late-night online payments and high-value foreign "
+                "card use. Review the flagged users with rapid successive transactions first.")
+
+    def finish(run):
+        """Move a run to its final state once its time is up"""
+        if run["status"] not in ("queued", "in_progress") or run["_outcome"] == "hang":
+            return run
+        if time.time() - run["_started"] < MOCK_RUN_SECONDS:
+            run["status"] = "in_progress"
+            return run
+        outcome = run["_outcome"]
+        now = int(time.time())
+        if outcome == "failed":
+            run.update(status="failed", failed_at=now, last_error={"code": "server_error", "message": "Mock failure"})
+        elif outcome == "expired":
+            run.update(status="expired")
+        elif outcome == "incomplete":
+            run.update(status="incomplete", incomplete_details={"reason": "max_completion_tokens"})
+        else:
+            message_object(run["thread_id"], "assistant", run["_answer"], run["id"], run["assistant_id"])
+            run.update(status="completed", completed_at=now)
+        return run
+
+    def public(run):
+        return {k: v for k, v in run.items() if not k.startswith("_")}
+
+    @app.route("/v1/threads", methods=["POST"])
+    def create_thread():
+        thread = {"id": _id("thread"), "object": "thread", "created_at": int(time.time()),
+                  "metadata": {}, "tool_resources": {}}
+        threads[thread["id"]] = thread
+        for message in (request.get_json(silent=True) or {}).get("messages", []):
+            message_object(thread["id"], message.get("role", "user"), message.get("content") or "")
+        return jsonify(thread)
+
+    @app.route("/v1/threads/<thread_id>/messages", methods=["POST"])
+    def create_message(thread_id):
+        body = request.get_json(force=True)
+        content = body.get("content")
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return jsonify(message_object(thread_id, body.get("role", "user"), content or ""))
+
+    @app.route("/v1/threads/<thread_id>/messages", methods=["GET"])
+    def list_messages(thread_id):
+        with lock:
+            for run in runs.values():
+                if run["thread_id"] == thread_id:
+                    finish(run)
+            data = list(messages.get(thread_id, []))
+        if request.args.get("run_id"):
+            data = [m for m in data if m["run_id"] == request.args["run_id"]]
+        if request.args.get("order", "desc") == "desc":
+            data.reverse()
+        # Cursor paging: only messages after (or before) the given id in the requested order
+        ids = [m["id"] for m in data]
+        if request.args.get("after") in ids:
+            data = data[ids.index(request.args["after"]) + 1:]
+        elif request.args.get("before") in ids:
+            data = data[:ids.index(request.args["before"])]
+        limit = int(request.args.get("limit", 20))
+        has_more = len(data) > limit
+        data = data[:limit]
+        return jsonify({"object": "list", "data": data, "has_more": has_more,
+                        "first_id": data[0]["id"] if data else None, "last_id": data[-1]["id"] if data else None})
+
+    @app.route("/v1/threads/<thread_id>/runs", methods=["POST"])
+    def create_run(thread_id):
+        body = request.get_json(force=True)
+        question = next((m["content"][0]["text"]["value"] for m in reversed(messages.get(thread_id, []))
+                         if m["role"] == "user"), "")
+        outcome = next((value for marker, value in OUTCOME_MARKERS.items() if marker in question), "completed")
+        run = {
+            "id": _id("run"), "object": "thread.run", "created_at": int(time.time()),
+            "thread_id": thread_id, "assistant_id": body.get("assistant_id"), "status": "queued",
+            "instructions": body.get("instructions") or "", "model": body.get("model") or "mock-model",
+            "tools": [], "metadata": {}, "parallel_tool_calls": True, "started_at": None,
+            "completed_at": None, "failed_at": None, "cancelled_at": None, "expires_at": None,
+            "last_error": None, "incomplete_details": None, "required_action": None, "usage": None,
+            "_started": time.time(), "_outcome": outcome, "_answer": answer(question),
+        }
+        with lock:
+            runs[run["id"]] = run
+        if not body.get("stream"):
+            return jsonify(public(run))
+        return Response(stream_events(run), mimetype="text/event-stream")
+
+    def stream_events(run):
+        def event(name, data):
+            return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+        yield event("thread.run.created", public(run))
+        run["status"] = "in_progress"
+        yield event("thread.run.in_progress", public(run))
+        if run["_outcome"] == "hang":
+            # Keep the connection open without sending anything until cancelled
+            while run["status"] != "cancelled":
+                time.sleep(0.1)
+            yield event("thread.run.cancelled", public(run))
+            yield "event: done\ndata: [DONE]\n\n"
+            return
+        if run["_outcome"] == "completed":
+            message_id = _id("msg")
+            for i, token in enumerate(run["_answer"].split(" ")):
+                time.sleep(MOCK_TOKEN_SECONDS)
+                yield event("thread.message.delta", {
+                    "id": message_id, "object": "thread.message.delta",
+                    "delta": {"content": [{"index": 0, "type": "text",
+                                           "text": {"value": token if i == 0 else " " + token, "annotations": []}}]},
+                })
+        run["_started"] = 0
+        with lock:
+            finish(run)
+        yield event(f"thread.run.{run['status']}", public(run))
+        yield "event: done\ndata: [DONE]\n\n"
+
+    @app.route("/v1/threads/<thread_id>/runs/<run_id>", methods=["GET"])
+    def retrieve_run(thread_id, run_id):
+        with lock:
+            run = runs.get(run_id)
+            if run is None:
+                return jsonify({"error": {"message": "No run found", "type": "invalid_request_error"}}), 404
+            return jsonify(public(finish(run)))
+
+    @app.route("/v1/threads/<thread_id>/runs/<run_id>/cancel", methods=["POST"])
+    def cancel_run(thread_id, run_id):
+        with lock:
+            run = runs.get(run_id)
+            if run is None:
+                return jsonify({"error": {"message": "No run found", "type": "invalid_request_error"}}), 404
+            if run["status"] in ("queued", "in_progress"):
+                run.update(status="cancelled", cancelled_at=int(time.time()))
+            return jsonify(public(run))
+
+    @app.route("/v1/files", methods=["POST"])
+    def upload_file():
+        upload = request.files.get("file")
+        data = upload.read() if upload else b""
+        file_object = {
+            "id": _id("file"), "object": "file", "bytes": len(data), "created_at": int(time.time()),
+            "filename": upload.filename if upload else "upload", "purpose": request.form.get("purpose", "assistants"),
+            "status": "processed",
+        }
+        files[file_object["id"]] = file_object
+        return jsonify(file_object)
+
+    @app.route("/v1/chat/completions", methods=["POST"])
+    def chat_completion():
+        body = request.get_json(force=True)
+        now = time.time()
+        if MOCK_RPM:
+            with lock:
+                while completion_times and now - completion_times[0] > MOCK_RPM_WINDOW_SECONDS:
+                    completion_times.popleft()
+                if len(completion_times) >= MOCK_RPM:
+                    calls["429 /v1/chat/completions"] += 1
+                    response = jsonify({"error": {"message": "Rate limit reached", "type": "requests",
+                                                  "code": "rate_limit_exceeded"}})
+                    response.status_code = 429
+                    response.headers["retry-after"] = f"{MOCK_RPM_WINDOW_SECONDS - (now - completion_times[0]):.1f}"
+                    return response
+                completion_times.append(now)
+        time.sleep(MOCK_COMPLETION_SECONDS)
+        prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+        text = answer(prompt.splitlines()[-1] if prompt else "")
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(text) // 4
+        return jsonify({
+            "id": _id("chatcmpl"), "object": "chat.completion", "created": int(now),
+            "model": body.get("model") or "mock-model",
+            "choices": [{"index": 0, "finish_reason": "stop", "logprobs": None,
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    @app.route("/mock/stats")
+    def stats():
+        return jsonify({"calls": dict(calls), "total": sum(calls.values())})
+
+    @app.route("/mock/reset", methods=["POST"])
+    def reset():
+        calls.clear()
+        return jsonify({"ok": True})
+
+    return app
+
+
+if __name__ == "__main__":
+    port = int(os.getenv("MOCK_ASSISTANTS_PORT", 8765))
+    print(f"[MOCK] Assistants API on http://127.0.0.1:{port}/v1")
+    create_mock_app().run(port=port, threaded=True)
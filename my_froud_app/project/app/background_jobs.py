@@ -0,0 +1,130 @@
+import functools
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from callback_cache import memoize
+
+try:
+    import diskcache
+    from dash import DiskcacheManager
+    # DiskcacheManager also needs these to spawn and kill job processes
+    import multiprocess  # noqa: F401
+    import psutil  # noqa: F401
+except ImportError:
+    diskcache = None
+
+# Clustering, network and velocity jobs allowed to run at once across all workers
+MAX_HEAVY_JOBS = int(os.getenv("MAX_HEAVY_JOBS", 2))
+SLOT_POLL_SECONDS = 0.5
+RESULT_EXPIRE_SECONDS = 3600
+SLOT_KEY = "heavy-job-slots"
+
+# Changes on every start so results cached by older code are never served
+_LAUNCH_ID = uuid.uuid4().hex
+
+
+def no_progress(value):
+    pass
+
+
+class HeavyJobs:
+    """Runs heavy dashboard callbacks as Dash background callbacks.
+
+    Jobs execute in their own processes through a DiskcacheManager, report
+    progress to the page, are cancelled when the user switches tab or changes
+    an input, and at most `max_jobs` of them hold a slot at any time.
+
+    diskcache, multiprocess and psutil are optional (see requirements.txt).
+    Without them the callbacks, exports included, run synchronously inside
+    the request under the same cap, with no progress bar or cancellation,
+    so a slow job holds a web worker for its whole duration.
+    """
+
+    def __init__(self, cache_dir, max_jobs=MAX_HEAVY_JOBS):
+        self.max_jobs = max_jobs
+        self.cache = None
+        self.manager = None
+        self._local_slots = threading.BoundedSemaphore(max_jobs)
+        if diskcache is None:
+            print("[BACKGROUND WARNING] diskcache, multiprocess or psutil not installed: clustering, network, "
+                  "velocity and export jobs will run synchronously inside web requests")
+            return
+        try:
+            self.cache = diskcache.Cache(cache_dir)
+            self.manager = DiskcacheManager(self.cache, cache_by=[lambda: _LAUNCH_ID], expire=RESULT_EXPIRE_SECONDS)
+        except Exception as e:
+            print(f"[BACKGROUND ERROR] Could not create job manager in {cache_dir}: {str(e)}")
+            self.cache = None
+            self.manager = None
+
+    @property
+    def enabled(self):
+        return self.manager is not None
+
+    def callback(self, dash_app, *args, progress, running=None, cancel=None, cache_args_to_ignore=None, **kwargs):
+        """Register fn(set_progress, *values) as a background callback.
+
+        cache_args_to_ignore lists the positions of large arguments (the
+        serialised dataset) that the dataset version already identifies.
+        The undecorated fn is returned so other jobs can call it directly.
+        """
+        def decorator(fn):
+            if not self.enabled:
+                cached = memoize(exclude=("set_progress", "data"))(fn)
+
+                @functools.wraps(fn)
+                def run(*values):
+                    return cached(no_progress, *values)
+
+                dash_app.callback(*args, **kwargs)(run)
+                return fn
+
+            dash_app.callback(
+                *args,
+                background=True,
+                manager=self.manager,
+                progress=progress,
+                running=running,
+                cancel=cancel,
+                cache_args_to_ignore=cache_args_to_ignore,
+                **kwargs
+            )(fn)
+            return fn
+
+        return decorator
+
+    @contextmanager
+    def slot(self, on_wait=None):
+        """Hold one of the heavy job slots for the duration of the block"""
+        if not self.enabled:
+            with self._local_slots:
+                yield
+            return
+
+        pid = os.getpid()
+        while not self._acquire(pid):
+            if on_wait:
+                on_wait()
+            time.sleep(SLOT_POLL_SECONDS)
+        try:
+            yield
+        finally:
+            self._release(pid)
+
+    def _acquire(self, pid):
+        # Slots are held by PID, so a job killed on cancel frees its slot for the next caller
+        with self.cache.transact():
+            holders = [p for p in self.cache.get(SLOT_KEY, []) if p != pid and self.manager.job_running(p)]
+            acquired = len(holders) < self.max_jobs
+            if acquired:
+                holders.append(pid)
+            self.cache.set(SLOT_KEY, holders)
+        return acquired
+
+    def _release(self, pid):
+        with self.cache.transact():
+            holders = [p for p in self.cache.get(SLOT_KEY, []) if p != pid]
+            self.cache.set(SLOT_KEY, holders)
@@ -0,0 +1,364 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import TransactionGenerator
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+SUITES = ["generate", "scoring", "dashboard", "predict"]
+DASHBOARD_REPEATS = 5
+
+# Control values for the dashboard callbacks, matching the layout defaults
+DASHBOARD_VALUES = {
+    "feature-dropdown.value": "transaction_amount",
+    "technical-feature.value": "transaction_frequency",
+    "boxplot-feature.value": "transaction_amount",
+    "correlation-scope.value": "run",
+    "anomaly-feature.value": "transaction_frequency",
+    "network-rank-by.value": "count",
+    "network-top-k.value": 500,
+    "cluster-feature-1.value": "transaction_amount",
+    "cluster-feature-2.value": "transaction_frequency",
+    "cluster-epsilon.value": 0.5,
+    "timeseries-feature.value": "transaction_amount",
+    "timeseries-agg.value": "sum",
+    "timeseries-granularity.value": "day",
+}
+
+
+def reset_peak_rss():
+    """Restart the kernel's peak RSS counter so each stage reports its own peak (Linux only)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # Lifetime peak in KB on Linux; not resettable
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def measure(suite, stage, rows, fn):
+    """Run fn once and return its result row for the report"""
+    reset_peak_rss()
+    start = time.perf_counter()
+    entry = {"suite": suite, "stage": stage, "rows": rows}
+    value = None
+    try:
+        value = fn()
+    except Exception as e:
+        entry["error"] = f"{type(e).__name__}: {str(e)}"
+    seconds = time.perf_counter() - start
+    entry.update({
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(rows / seconds, 1) if seconds and "error" not in entry else None,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+    print(f"[BENCHMARK] {suite}/{stage} {rows:,} rows: {seconds:.3f}s"
+          + (f" ERROR {entry['error']}" if "error" in entry else ""))
+    return entry, value
+
+
+def latency_summary(samples):
+    ms = np.array(samples) * 1000
+    return {
+        "cold_ms": round(float(ms[0]), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def with_predictions(df):
+    """Frame shaped like predict() output, using the injected labels as predictions"""
+    label = np.where(df["is_fraud"].to_numpy() == 1, "Fraudulent", "Non-Fraudulent")
+    return df.drop(columns=["is_fraud", "fraud_pattern"]).assign(
+        TF_Prediction=label, XGB_Prediction=label, Meta_Prediction=label
+    )
+
+
+def bench_generate(generator, rows):
+    entry, df = measure("generate", "generate", rows, lambda: generator.generate(rows, labels=True))
+    return [entry], df
+
+
+def bench_scoring(df, rows, workdir):
+    """The post-prediction stages of /predict, against fresh state"""
+    from anomaly_detector import learn_batch, score_batch, shared_detector
+    from covariance_store import record_run
+    from risk_scoring import learn_risk, score_risk, shared_risk_scorer
+    from rollup_store import build_rollups, save_rollups
+    from run_store import save_run
+    from user_state import learn_velocity, shared_user_state, update_velocity
+
+    state = os.path.join(workdir, f"state_{rows}")
+    os.makedirs(state, exist_ok=True)
+    data = with_predictions(df)
+    results = []
+
+    detector = shared_detector(os.path.join(state, "anomaly_model.joblib"))
+    entry, scores = measure("scoring", "anomaly_score", rows, lambda: score_batch(detector, data))
+    results.append(entry)
+    if scores is not None:
+        data["anomaly_score"] = scores
+
+    user_state = shared_user_state(os.path.join(state, "user_state.pkl"))
+    entry, velocity = measure("scoring", "velocity", rows, lambda: update_velocity(user_state, data))
+    results.append(entry)
+    if velocity is not None:
+        data = data.join(velocity)
+
+    scorer = shared_risk_scorer(os.path.join(state, "risk_scorer.joblib"))
+    entry, risk = measure("scoring", "risk_score", rows, lambda: score_risk(scorer, data))
+    results.append(entry)
+    if risk is not None:
+        data["risk_score"] = risk
+
+    run_id = f"bench_{rows}"
+    results.append(measure("scoring", "anomaly_learn", rows, lambda: learn_batch(detector, data))[0])
+    results.append(measure("scoring", "velocity_learn", rows, lambda: learn_velocity(user_state, data))[0])
+    results.append(measure("scoring", "risk_learn", rows, lambda: learn_risk(scorer, data))[0])
+    results.append(measure("scoring", "covariance", rows,
+                           lambda: record_run(data, run_id, os.path.join(state, "covariance.json")))[0])
+    results.append(measure("scoring", "rollups", rows,
+                           lambda: save_rollups(build_rollups(data), run_id, os.path.join(state, "rollups")))[0])
+    processed = os.path.join(workdir, "processed")
+    os.makedirs(processed, exist_ok=True)
+    results.append(measure("scoring", "csv_write", rows,
+                           lambda: data.to_csv(os.path.join(processed, f"{run_id}_processed_data.csv"), index=False))[0])
+    results.append(measure("scoring", "arrow_write", rows, lambda: save_run(data, run_id, processed))[0])
+    return results, data
+
+
+def _callback_body(key, spec, values):
+    outputs = []
+    for part in key.strip(".").split("..."):
+        component, prop = part.rsplit(".", 1)
+        outputs.append({"id": component, "property": prop})
+    return {
+        "output": key,
+        "outputs": outputs if key.startswith("..") else outputs[0],
+        "inputs": [dict(item, value=values.get(f"{item['id']}.{item['property']}")) for item in spec["inputs"]],
+        "state": [dict(item, value=values.get(f"{item['id']}.{item['property']}")) for item in spec["state"]],
+        "changedPropIds": [f"{item['id']}.{item['property']}" for item in spec["inputs"][:1]],
+    }
+
+
+def bench_dashboard(data, rows, workdir):
+    """Latency of every dataset-driven dashboard callback over the Dash HTTP endpoint"""
+    from flask import Flask
+    from dashboard import create_dashboard
+    from run_store import save_run
+
+    processed = os.path.join(workdir, f"dashboard_{rows}")
+    os.makedirs(processed, exist_ok=True)
+    run_id = f"bench_{rows}"
+    save_run(data, run_id, processed)
+    shm_root = "/dev/shm" if os.path.isdir("/dev/shm") else workdir
+
+    server = Flask(f"benchmark_{rows}")
+    server.config.update({
+        "PROCESSED_FOLDER": processed,
+        "STATE_FOLDER": os.path.join(processed, "state"),
+        "EXPORT_FOLDER": os.path.join(processed, "exports"),
+        "SHARED_DATASET_FOLDER": tempfile.mkdtemp(prefix="fraud_bench_", dir=shm_root),
+    })
+    dash_app = create_dashboard(server)
+    client = server.test_client()
+    endpoint = dash_app.config.requests_pathname_prefix + "_dash-update-component"
+    values = dict(DASHBOARD_VALUES, **{"run-selector.value": run_id})
+    results = []
+
+    def post(key):
+        response = client.post(endpoint, json=_callback_body(key, dash_app.callback_map[key], values))
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        return response.get_json()
+
+    load_key = next(key for key in dash_app.callback_map if "session-data.data" in key)
+    entry, loaded = measure("dashboard", "load_run", rows, lambda: post(load_key))
+    results.append(entry)
+    if loaded is None:
+        return results
+    for component, props in loaded["response"].items():
+        for prop, value in props.items():
+            values[f"{component}.{prop}"] = value
+
+    for key, spec in dash_app.callback_map.items():
+        inputs = [f"{item['id']}.{item['property']}" for item in spec["inputs"]]
+        if "dataset-version.data" not in inputs or "export" in key:
+            continue
+        samples = []
+        entry = {"suite": "dashboard", "stage": key.strip(".").split(".")[0], "callback": key, "rows": rows}
+        reset_peak_rss()
+        try:
+            for _ in range(DASHBOARD_REPEATS):
+                start = time.perf_counter()
+                payload = post(key)
+                samples.append(time.perf_counter() - start)
+            if "response" not in payload:
+                # Background job: the POST only dispatched it
+                entry["background"] = True
+            entry.update(latency_summary(samples))
+            entry["rows_per_second"] = round(rows / samples[0], 1)
+        except Exception as e:
+            entry["error"] = f"{type(e).__name__}: {str(e)}"
+        entry["peak_rss_mb"] = peak_rss_mb()
+        print(f"[BENCHMARK] dashboard/{entry['stage']} {rows:,} rows: "
+              + (f"cold {entry['cold_ms']}ms p50 {entry['p50_ms']}ms" if "cold_ms" in entry else entry["error"]))
+        results.append(entry)
+    shutil.rmtree(server.config["SHARED_DATASET_FOLDER"], ignore_errors=True)
+    return results
+
+
+def bench_predict(generator, rows, workdir):
+    """End-to-end /predict upload through the Flask test client.
+
+    Imports the real app, so it needs the models. Its upload, processed,
+    results, export and state folders are pointed at the benchmark's work
+    directory first, so benchmark uploads never reach the real anomaly,
+    user, risk or covariance state, and start from fresh state.
+    """
+    # The assistant sidecar has nothing to do with scoring
+    os.environ.setdefault("ASSISTANT_SIDECAR", "0")
+    scratch = os.path.join(workdir, "app")
+    for name in ("UPLOAD_FOLDER", "PROCESSED_FOLDER", "RESULTS_FOLDER", "EXPORT_FOLDER", "STATE_FOLDER"):
+        os.environ[name] = os.path.join(scratch, name.split("_")[0].lower())
+    try:
+        import app as fraud_app
+    except BaseException as e:  # app.py exits when the models cannot be loaded
+        print(f"[BENCHMARK] predict skipped: {type(e).__name__}: {str(e)}")
+        return [{"suite": "predict", "stage": "predict", "rows": rows,
+                 "skipped": f"app could not be imported: {type(e).__name__}: {str(e)}"}]
+    from run_store import list_runs
+
+    csv_path = os.path.join(workdir, f"upload_{rows}.csv")
+    generator.write_csv(csv_path, rows)
+    upload_bytes = os.path.getsize(csv_path)
+    # Generated uploads pass the 100 MB production limit from about 900k rows
+    config = fraud_app.app.config
+    config["MAX_CONTENT_LENGTH"] = max(config["MAX_CONTENT_LENGTH"] or 0, upload_bytes + 1024 ** 2)
+    client = fraud_app.app.test_client()
+
+    def upload():
+        with open(csv_path, "rb") as f:
+            response = client.post("/predict", data={"csvfile": (f, "benchmark.csv")},
+                                   content_type="multipart/form-data")
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+    entry, _ = measure("predict", "predict", rows, upload)
+    entry["bytes"] = upload_bytes
+    entry["bytes_per_second"] = round(upload_bytes / entry["seconds"], 1) if "error" not in entry else None
+    runs = list_runs(fraud_app.app.config["PROCESSED_FOLDER"])
+    if runs and "error" not in entry and runs[0].get("timings"):
+        entry["stages"] = runs[0]["timings"]["stages"]
+    os.remove(csv_path)
+    return [entry]
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "git_commit": commit,
+    }
+
+
+def compare(report, baseline_path):
+    """Print rows/sec and peak RSS against an earlier report"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["suite"], r["stage"], r["rows"]): r for r in baseline.get("results", [])}
+    print(f"\n[BENCHMARK] Compared with {baseline_path} ({baseline.get('created')})")
+    for result in report["results"]:
+        before = previous.get((result["suite"], result["stage"], result["rows"]))
+        if not before or not before.get("rows_per_second") or not result.get("rows_per_second"):
+            continue
+        ratio = result["rows_per_second"] / before["rows_per_second"]
+        print(f"  {result['suite']}/{result['stage']} {result['rows']:,}: {ratio:.2f}x throughput, "
+              f"peak RSS {before.get('peak_rss_mb')} -> {result.get('peak_rss_mb')} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput, latency and memory benchmarks on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=SUITES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Report path (default benchmarks/benchmark_<time>.json)")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(
+        BASE_DIR, "benchmarks", f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    generator = TransactionGenerator(seed=args.seed)
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "sizes": args.sizes,
+        "suites": args.suites,
+        "results": [],
+    }
+
+    workdir = tempfile.mkdtemp(prefix="fraud_benchmark_")
+    try:
+        for rows in args.sizes:
+            # Scoring feeds the dashboard, generation feeds both
+            df = data = None
+            if {"generate", "scoring", "dashboard"} & set(args.suites):
+                results, df = bench_generate(generator, rows)
+                if "generate" in args.suites:
+                    report["results"].extend(results)
+            if df is not None and {"scoring", "dashboard"} & set(args.suites):
+                results, data = bench_scoring(df, rows, workdir)
+                if "scoring" in args.suites:
+                    report["results"].extend(results)
+            if data is not None and "dashboard" in args.suites:
+                report["results"].extend(bench_dashboard(data, rows, workdir))
+            del df, data
+            if "predict" in args.suites:
+                report["results"].extend(bench_predict(generator, rows, workdir))
+            # Written after every size so a long run that is killed still leaves a report
+            with open(output, "w") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"[BENCHMARK] Report written to {output}")
+    if args.baseline:
+        compare(report, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import functools
+import inspect
+import os
+import threading
+from collections import OrderedDict
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+from telemetry import note_cache, note_rows
+
+FRAME_CACHE_SIZE = 8
+RESULT_CACHE_SIZE = 256
+# Figures hold their points, so the result cache is also bounded by approximate bytes;
+# a single result bigger than a quarter of the budget is not cached at all
+RESULT_CACHE_BYTES = int(os.getenv("RESULT_CACHE_BYTES", 256 * 1024 ** 2))
+# Elements measured before a long list's size is extrapolated
+SIZE_SAMPLE = 64
+
+
+def approximate_size(value):
+    """Rough memory footprint of a callback result in bytes, without serialising it"""
+    if hasattr(value, "to_plotly_json"):
+        # Figures and Dash components; arrays inside stay numpy
+        value = value.to_plotly_json()
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return int(value.memory_usage(index=False).sum()) if isinstance(value, pd.DataFrame) else value.nbytes
+    if isinstance(value, (str, bytes)):
+        return len(value) + 50
+    if isinstance(value, dict):
+        return 64 + sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        sample = value[:SIZE_SAMPLE]
+        measured = sum(approximate_size(v) for v in sample)
+        return 56 + (measured * len(value) // len(sample) if sample else 0)
+    return 32
+
+
+class LRUCache:
+    """Small thread-safe LRU with hit/miss counters.
+
+    Bounded by entry count and, when `max_bytes` is set, by the summed
+    `sizeof` of the entries.
+    """
+
+    def __init__(self, maxsize, max_bytes=None, sizeof=approximate_size):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def _drop(self, key):
+        self._data.pop(key)
+        self.bytes -= self._sizes.pop(key, 0)
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            if self.max_bytes is not None and size > self.max_bytes // 4:
+                self.skipped += 1
+                return
+            self._data[key] = value
+            self._sizes[key] = size
+            self.bytes += size
+            while len(self._data) > self.maxsize or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                self._drop(next(iter(self._data)))
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "bytes": self.bytes, "hits": self.hits, "misses": self.misses,
+                    "skipped": self.skipped}
+
+
+frame_cache = LRUCache(FRAME_CACHE_SIZE)
+result_cache = LRUCache(RESULT_CACHE_SIZE, max_bytes=RESULT_CACHE_BYTES)
+
+_MISSING = object()
+
+
+def cached_frame(key, load):
+    """Build a frame once per key.
+
+    Callers get a shallow copy, so adding or replacing columns never leaks
+    into the cached frame.
+    """
+    df = frame_cache.get(key, _MISSING) if key else _MISSING
+    note_cache(df is not _MISSING)
+    if df is _MISSING:
+        df = load()
+        if key:
+            frame_cache.put(key, df)
+    note_rows(len(df))
+    return df.copy(deep=False)
+
+
+def get_frame(version, data):
+    """Parse the session data once per dataset version"""
+    return cached_frame(version, lambda: pd.read_json(StringIO(data), orient='split'))
+
+
+def memoize(exclude=("data",), depends=None):
+    """Cache a callback's return value per (callback, arguments).
+
+    Arguments named in `exclude` (the serialised dataset) are left out of the
+    key; the dataset version argument identifies them instead. `depends`,
+    if given, is called on every request and its result added to the key,
+    for inputs that change outside the arguments (a file other uploads write).
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            key = (fn.__name__,) + tuple(
+                _hashable(value) for name, value in bound.arguments.items() if name not in exclude
+            )
+            if depends is not None:
+                key += (_hashable(depends()),)
+            cached = result_cache.get(key, _MISSING)
+            note_cache(cached is not _MISSING)
+            if cached is not _MISSING:
+                return cached
+            result = fn(*args, **kwargs)
+            result_cache.put(key, result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _hashable(value):
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    return value
+
+
+def summarize(df):
+    """Tiny summary object the metric cards are rendered from in the browser"""
+    if df.empty:
+        return {"total": 0, "fraud": 0, "amount": 0.0}
+    fraud = int(df['Meta_Prediction'].eq('Fraudulent').sum()) if 'Meta_Prediction' in df.columns else 0
+    amount = float(df['transaction_amount'].sum()) if 'transaction_amount' in df.columns else 0.0
+    return {"total": int(len(df)), "fraud": fraud, "amount": amount}
@@ -0,0 +1,107 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+from sklearn.neighbors import KDTree
+from sklearn.preprocessing import StandardScaler
+
+# Above this many rows DBSCAN runs on a stratified sample
+SAMPLE_THRESHOLD = 50000
+SAMPLE_SIZE = 20000
+MIN_SAMPLES = 5
+CACHE_SIZE = 32
+
+_cache = OrderedDict()
+_inflight = {}
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="dbscan")
+
+
+def dataset_fingerprint(data):
+    """Stable key for a serialised dataset"""
+    return hashlib.md5(data.encode('utf-8')).hexdigest()
+
+
+def _stratified_sample(strata, size, seed=42):
+    """Pick row positions so every stratum keeps its share of the sample"""
+    rng = np.random.default_rng(seed)
+    _, codes = np.unique(strata, return_inverse=True)
+    counts = np.bincount(codes)
+    frac = size / len(codes)
+    picks = []
+    for code, count in enumerate(counts):
+        rows = np.flatnonzero(codes == code)
+        take = min(count, max(1, int(round(count * frac))))
+        picks.append(rng.choice(rows, size=take, replace=False))
+    return np.sort(np.concatenate(picks))
+
+
+def _run_dbscan(X, strata, eps, min_samples):
+    """Label rows with DBSCAN, sampling large inputs and assigning the rest to the nearest core"""
+    labels = np.full(len(X), -1, dtype=np.int32)
+    valid = ~np.isnan(X).any(axis=1)
+    # Every row missing a feature: all noise (the scaler rejects an empty array)
+    if not valid.any():
+        return labels
+    X_valid = StandardScaler().fit_transform(X[valid])
+
+    if len(X_valid) <= SAMPLE_THRESHOLD:
+        clustering = DBSCAN(eps=eps, min_samples=min_samples, algorithm='kd_tree').fit(X_valid)
+        labels[valid] = clustering.labels_
+        return labels
+
+    # Density drops with the sampling rate, so scale min_samples to match
+    sample_idx = _stratified_sample(strata[valid], SAMPLE_SIZE)
+    sample_min_samples = max(2, int(np.ceil(min_samples * len(sample_idx) / len(X_valid))))
+    clustering = DBSCAN(eps=eps, min_samples=sample_min_samples, algorithm='kd_tree').fit(X_valid[sample_idx])
+
+    valid_labels = np.full(len(X_valid), -1, dtype=np.int32)
+    core_idx = clustering.core_sample_indices_
+    if len(core_idx):
+        # Every row joins the cluster of its nearest core point if it lies within eps
+        core_points = X_valid[sample_idx[core_idx]]
+        dist, nearest = KDTree(core_points).query(X_valid, k=1)
+        within = dist[:, 0] <= eps
+        valid_labels[within] = clustering.labels_[core_idx][nearest[within, 0]]
+    labels[valid] = valid_labels
+    return labels
+
+
+def cluster_labels(df, features, eps, dataset_key, min_samples=MIN_SAMPLES):
+    """Return DBSCAN labels for df[features], memoised per (dataset, features, eps)"""
+    key = (dataset_key, tuple(features), round(float(eps), 4), min_samples)
+
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+        # Identical concurrent requests share one run; the pool caps how many run at once
+        future = _inflight.get(key)
+        if future is None:
+            X = df[list(features)].to_numpy(dtype=float)
+            if 'Meta_Prediction' in df.columns:
+                strata = df['Meta_Prediction'].astype(str).to_numpy()
+            else:
+                strata = np.zeros(len(df), dtype=int)
+            future = _executor.submit(_run_dbscan, X, strata, float(eps), min_samples)
+            _inflight[key] = future
+
+    try:
+        labels = future.result()
+    except BaseException:
+        with _lock:
+            _inflight.pop(key, None)
+        raise
+
+    # Cached before the in-flight entry goes, so an identical request never starts a second run
+    with _lock:
+        _cache[key] = labels
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+        _inflight.pop(key, None)
+
+    return labels
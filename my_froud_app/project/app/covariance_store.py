@@ -0,0 +1,190 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from state_store import file_version, locked
+
+
+# Numeric columns that identify rows rather than measure anything
+ID_COLUMNS = {"transaction_id", "row"}
+
+
+def correlation_columns(df):
+    """Numeric columns worth correlating: everything numeric except identifiers"""
+    return [col for col in df.select_dtypes(include=np.number).columns
+            if col not in ID_COLUMNS and not str(col).endswith("_id")]
+
+
+class MomentSketch:
+    """Pairwise-complete counts, means and co-moments of a set of numeric columns.
+
+    For every pair of columns (i, j) the sketch keeps the number of rows
+    where both are present, each column's mean and sum of squared deviations
+    over those rows, and their co-moment. Missing values therefore only drop
+    the pairs they touch, as in DataFrame.corr(). Two sketches merge pair by
+    pair with the update of Chan, Golub & LeVeque, which stays numerically
+    stable where naive running sums of squares do not.
+    """
+
+    def __init__(self, columns, n=None, mean=None, m2=None, comoment=None):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = np.zeros((k, k)) if n is None else np.asarray(n, dtype=np.float64)
+        # mean[i, j] and m2[i, j] describe column i over the rows where i and j are both present
+        self.mean = np.zeros((k, k)) if mean is None else np.asarray(mean, dtype=np.float64)
+        self.m2 = np.zeros((k, k)) if m2 is None else np.asarray(m2, dtype=np.float64)
+        self.comoment = np.zeros((k, k)) if comoment is None else np.asarray(comoment, dtype=np.float64)
+
+    @property
+    def rows(self):
+        """Rows behind the best-covered pair"""
+        return int(self.n.max()) if self.n.size else 0
+
+    @classmethod
+    def from_frame(cls, df, columns=None):
+        """Build a sketch from df's numeric columns, skipping missing values pair by pair"""
+        if columns is None:
+            columns = correlation_columns(df)
+        X = df[columns].to_numpy(dtype=np.float64)
+        present = ~np.isnan(X)
+        if not present.any():
+            return cls(columns)
+        # Centre on each column's own mean first so the sums below stay small
+        M = present.astype(np.float64)
+        count = M.sum(axis=0)
+        centre = np.where(count > 0, np.where(present, X, 0.0).sum(axis=0) / np.maximum(count, 1), 0.0)
+        Y = np.where(present, X - centre, 0.0)
+        n = M.T @ M
+        sums = Y.T @ M                  # sums[i, j]: column i over rows where j is present too
+        squares = (Y * Y).T @ M
+        with np.errstate(invalid="ignore", divide="ignore"):
+            shift = np.where(n > 0, sums / n, 0.0)
+        mean = centre[:, None] + shift
+        m2 = squares - sums * shift
+        comoment = Y.T @ Y - sums * shift.T
+        return cls(columns, n, mean, m2, comoment)
+
+    def subset(self, columns):
+        idx = np.ix_(*[[self.columns.index(col) for col in columns]] * 2)
+        return MomentSketch(columns, self.n[idx], self.mean[idx], self.m2[idx], self.comoment[idx])
+
+    def merge(self, other):
+        """Combine two sketches over the columns they share"""
+        columns = [col for col in self.columns if col in other.columns]
+        a, b = self.subset(columns), other.subset(columns)
+        n = a.n + b.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(n > 0, a.n * b.n / n, 0.0)
+            delta = b.mean - a.mean
+            mean = np.where(n > 0, a.mean + delta * np.where(n > 0, b.n / n, 0.0), 0.0)
+        # A pair seen on one side only has no cross term; its means come from that side
+        delta = np.where(weight > 0, delta, 0.0)
+        m2 = a.m2 + b.m2 + delta ** 2 * weight
+        comoment = a.comoment + b.comoment + delta * delta.T * weight
+        return MomentSketch(columns, n, mean, m2, comoment)
+
+    def correlation(self):
+        """Pearson correlation matrix as a DataFrame, matching DataFrame.corr() (pairwise complete)"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self.comoment / np.sqrt(self.m2 * self.m2.T)
+        corr[self.n < 2] = np.nan
+        np.fill_diagonal(corr, np.where(np.diag(self.n) >= 2, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def to_dict(self):
+        return {
+            "columns": self.columns,
+            "n": self.n.tolist(),
+            "mean": self.mean.tolist(),
+            "m2": self.m2.tolist(),
+            "comoment": self.comoment.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["columns"], data["n"], data["mean"], data["m2"], data["comoment"])
+
+
+class CovarianceStore:
+    """Moment sketches per processed run plus one merged over all history"""
+
+    def __init__(self, runs=None, history=None):
+        self.runs = runs or {}
+        self.history = history
+
+    def add_run(self, run_id, sketch):
+        if run_id in self.runs:
+            self.runs[run_id] = self.runs[run_id].merge(sketch)
+        else:
+            self.runs[run_id] = sketch
+        self.history = sketch if self.history is None else self.history.merge(sketch)
+
+    def correlation(self, run_id=None):
+        """Correlation for one run, or for all history when run_id is None"""
+        sketch = self.history if run_id is None else self.runs.get(run_id)
+        if sketch is None or sketch.rows < 2:
+            return None
+        return sketch.correlation()
+
+    def to_dict(self):
+        return {
+            "runs": {run_id: sketch.to_dict() for run_id, sketch in self.runs.items()},
+            "history": self.history.to_dict() if self.history is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        runs = {run_id: MomentSketch.from_dict(s) for run_id, s in data.get("runs", {}).items()}
+        history = MomentSketch.from_dict(data["history"]) if data.get("history") else None
+        return cls(runs, history)
+
+
+_loaded = {}
+
+
+def _read_store(path):
+    if not os.path.exists(path):
+        return CovarianceStore()
+    with open(path) as f:
+        return CovarianceStore.from_dict(json.load(f))
+
+
+def store_version(path):
+    """Changes whenever a run is recorded; for keying anything derived from the store"""
+    return file_version(path)
+
+
+def load_covariance_store(path):
+    """Load the store for reading, re-parsing the file only when it has changed"""
+    version = store_version(path)
+    if version is None:
+        return CovarianceStore()
+    cached = _loaded.get(path)
+    if cached and cached[0] == version:
+        return cached[1]
+    try:
+        store = _read_store(path)
+    except Exception as e:
+        print(f"[COVARIANCE] Could not load store from {path}: {str(e)}")
+        return CovarianceStore()
+    _loaded[path] = (version, store)
+    return store
+
+
+def record_run(df, run_id, path):
+    """Fold a saved batch into its run's sketch and the all-history sketch.
+
+    The store is re-read under a file lock, so concurrent workers never drop
+    each other's runs.
+    """
+    sketch = MomentSketch.from_frame(df)
+    with locked(path):
+        store = _read_store(path)
+        store.add_run(run_id, sketch)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(store.to_dict(), f)
+        os.replace(tmp_path, path)
+    return sketch
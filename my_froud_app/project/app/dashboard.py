@@ -6,123 +6,146 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from io import StringIO
 import redis
 import json
 import os
 import datetime
-import time
 import traceback
-from sklearn.cluster import DBSCAN
-from sklearn.preprocessing import StandardScaler
 from dotenv import load_dotenv
+from flask import abort, send_from_directory
+from werkzeug.utils import secure_filename
+from clustering import cluster_labels, dataset_fingerprint
+from callback_cache import cached_frame, get_frame, memoize, summarize
+from anomaly_detector import anomaly_threshold
+from user_state import RAPID_SUCCESSION_MINUTES, UNUSUAL_AMOUNT_ZSCORE
+from covariance_store import correlation_columns, load_covariance_store, store_version
+from risk_scoring import RISK_WEIGHTS, RiskScorer
+from rollup_store import build_rollups, load_rollups, query as query_rollups, GRANULARITIES as ROLLUP_GRANULARITIES
+from network_graph import build_network_figure, RANK_OPTIONS as NETWORK_RANK_OPTIONS, DEFAULT_TOP_K as NETWORK_DEFAULT_TOP_K
+from background_jobs import HeavyJobs, no_progress
+from export_report import build_export
+from explanations import load_explanations, summarize_explanations
+from run_store import list_runs, load_columns, open_run, read_manifest, run_version, set_shared_store
+from shared_datasets import SharedDatasets, DEFAULT_FOLDER as DEFAULT_SHARED_FOLDER
+from telemetry import time_callbacks
 
 # Function to create and integrate the dashboard with a Flask app
 def create_dashboard(flask_app):
     load_dotenv()
 
-    # Configuration - Match the exact path from your Flask app
-    PROCESSED_FOLDER = "/home/armstrong/my_froud_app/venv/bin/project/app/processed_data"
-    
-    # Enhanced logging
-    print(f"\n[DASHBOARD INIT] Configured data directory: {PROCESSED_FOLDER}")
-    print(f"[DASHBOARD INIT] Directory exists: {os.path.exists(PROCESSED_FOLDER)}")
-    if os.path.exists(PROCESSED_FOLDER):
-        print(f"[DASHBOARD INIT] Files present: {os.listdir(PROCESSED_FOLDER)}")
-
-    # Function to load the latest processed data
-    def load_latest_data():
-        try:
-            print(f"\n[LOAD DATA] Checking: {PROCESSED_FOLDER}")
-            
-            if not os.path.exists(PROCESSED_FOLDER):
-                print("[LOAD DATA ERROR] Directory missing!")
-                return pd.DataFrame(), "Unknown"
-            
-            # Get all matching files with their full paths and creation times
-            files = [(f, os.path.getmtime(os.path.join(PROCESSED_FOLDER, f))) 
-                    for f in os.listdir(PROCESSED_FOLDER) 
-                    if f.endswith("_processed_data.csv")]
-            
-            print(f"[LOAD DATA] Found {len(files)} candidate files")
-            
-            if not files:
-                print("[LOAD DATA] No matching files found")
-                return pd.DataFrame(), "Unknown"
-                
-            # Sort by modification time (newest first)
-            files.sort(key=lambda x: x[1], reverse=True)
-            latest_file = files[0][0]
-            file_path = os.path.join(PROCESSED_FOLDER, latest_file)
-            
-            print(f"[LOAD DATA] Loading: {file_path}")
-            print(f"[LOAD DATA] File modified at: {time.ctime(files[0][1])}")
-            print(f"[LOAD DATA] File exists: {os.path.exists(file_path)}")
-            
-            # Load the CSV file with error handling
-            try:
-                df = pd.read_csv(file_path)
-                print(f"[LOAD DATA] Data loaded successfully with {len(df)} records")
-                print(f"[LOAD DATA] Columns: {df.columns.tolist()}")
-            except Exception as e:
-                print(f"[LOAD DATA ERROR] Failed to read CSV: {str(e)}")
-                return pd.DataFrame(), "Error reading file"
-            
-            # Check if 'Meta_Prediction' column exists, if not, try to find an alternative
-            if 'Meta_Prediction' not in df.columns:
-                print(f"[LOAD DATA] Warning: 'Meta_Prediction' column not found. Available columns: {df.columns.tolist()}")
-                # Look for columns that might contain prediction information
-                prediction_columns = [col for col in df.columns if 'predict' in col.lower() or 'fraud' in col.lower()]
-                if prediction_columns:
-                    print(f"[LOAD DATA] Using alternative prediction column: {prediction_columns[0]}")
-                    # Rename the column to Meta_Prediction
-                    df['Meta_Prediction'] = df[prediction_columns[0]]
-                else:
-                    # Create a dummy prediction column for demonstration
-                    print("[LOAD DATA] Creating dummy prediction column")
-                    df['Meta_Prediction'] = np.random.choice(['Fraudulent', 'Non-Fraudulent'], size=len(df), p=[0.2, 0.8])
-            
-            # Ensure transaction_amount column exists
-            if 'transaction_amount' not in df.columns:
-                print(f"[LOAD DATA] Warning: 'transaction_amount' column not found. Available columns: {df.columns.tolist()}")
-                # Look for columns that might contain amount information
-                amount_columns = [col for col in df.columns if 'amount' in col.lower() or 'value' in col.lower() or 'sum' in col.lower()]
-                if amount_columns:
-                    print(f"[LOAD DATA] Using alternative amount column: {amount_columns[0]}")
-                    # Rename the column to transaction_amount
-                    df['transaction_amount'] = df[amount_columns[0]]
-                else:
-                    # Create a dummy amount column for demonstration
-                    print("[LOAD DATA] Creating dummy amount column")
-                    df['transaction_amount'] = np.random.rand(len(df)) * 1000
-            
-            # Print sample of the data
-            print(f"[LOAD DATA] Data sample:\n{df.head()}")
-            print(f"[LOAD DATA] Success! Loaded {len(df)} records")
-            
-            return df, time.ctime(files[0][1])
-            
-        except Exception as e:
-            print(f"[LOAD DATA CRITICAL ERROR] {str(e)}")
-            traceback.print_exc()
-            # Always return a valid tuple even in case of errors
-            return pd.DataFrame(), "Error loading data"
+    # Configuration - shared with the Flask app
+    PROCESSED_FOLDER = flask_app.config.get(
+        "PROCESSED_FOLDER", os.path.join(os.path.dirname(os.path.abspath(__file__)), "processed_data")
+    )
+    STATE_FOLDER = flask_app.config.get(
+        "STATE_FOLDER", os.path.join(os.path.dirname(os.path.abspath(__file__)), "state")
+    )
+    COVARIANCE_PATH = os.path.join(STATE_FOLDER, "covariance.json")
+    ROLLUP_FOLDER = os.path.join(STATE_FOLDER, "rollups")
+    EXPORT_FOLDER = flask_app.config.get(
+        "EXPORT_FOLDER", os.path.join(os.path.dirname(os.path.abspath(__file__)), "exports")
+    )
+    os.makedirs(EXPORT_FOLDER, exist_ok=True)
+    heavy_jobs = HeavyJobs(os.path.join(STATE_FOLDER, "dash_jobs"))
+
+    # Worker processes map one shared copy of each run instead of loading their own
+    set_shared_store(SharedDatasets.create(flask_app.config.get("SHARED_DATASET_FOLDER", DEFAULT_SHARED_FOLDER)))
+
+    # Older processed files may name the prediction and amount columns differently
+    def normalise_columns(df):
+        # Check if 'Meta_Prediction' column exists, if not, try to find an alternative
+        if 'Meta_Prediction' not in df.columns:
+            print(f"[LOAD DATA] Warning: 'Meta_Prediction' column not found. Available columns: {df.columns.tolist()}")
+            # Look for columns that might contain prediction information
+            prediction_columns = [col for col in df.columns if 'predict' in col.lower() or 'fraud' in col.lower()]
+            if prediction_columns:
+                print(f"[LOAD DATA] Using alternative prediction column: {prediction_columns[0]}")
+                # Rename the column to Meta_Prediction
+                df['Meta_Prediction'] = df[prediction_columns[0]]
+            else:
+                # Create a dummy prediction column for demonstration
+                print("[LOAD DATA] Creating dummy prediction column")
+                df['Meta_Prediction'] = np.random.choice(['Fraudulent', 'Non-Fraudulent'], size=len(df), p=[0.2, 0.8])
+        
+        # Ensure transaction_amount column exists
+        if 'transaction_amount' not in df.columns:
+            print(f"[LOAD DATA] Warning: 'transaction_amount' column not found. Available columns: {df.columns.tolist()}")
+            # Look for columns that might contain amount information
+            amount_columns = [col for col in df.columns if 'amount' in col.lower() or 'value' in col.lower() or 'sum' in col.lower()]
+            if amount_columns:
+                print(f"[LOAD DATA] Using alternative amount column: {amount_columns[0]}")
+                # Rename the column to transaction_amount
+                df['transaction_amount'] = df[amount_columns[0]]
+            else:
+                # Create a dummy amount column for demonstration
+                print("[LOAD DATA] Creating dummy amount column")
+                df['transaction_amount'] = np.random.rand(len(df)) * 1000
+        return df
+
+    # Frame for the current dataset: stored runs are read column by column from
+    # their memory-mapped Arrow file, the sample dataset is parsed from session data
+    def load_frame(version, data, columns=None):
+        if isinstance(data, dict) and data.get('run_id'):
+            key = (version, tuple(columns) if columns is not None else None)
+            return cached_frame(key, lambda: load_columns(data['run_id'], PROCESSED_FOLDER, columns, normalise_columns))
+        return get_frame(version, data)
+
+    # Empty frame with the current dataset's columns and dtypes; stored runs take them
+    # from the mapped Arrow schema, so building dropdowns reads no rows
+    def frame_schema(version, data):
+        if isinstance(data, dict) and data.get('run_id'):
+            table = open_run(data['run_id'], PROCESSED_FOLDER, normalise_columns)
+            return table.schema.empty_table().to_pandas() if table is not None else pd.DataFrame()
+        return get_frame(version, data).iloc[:0]
+
+    def numeric_columns(version, data, exclude=()):
+        schema = frame_schema(version, data)
+        return [col for col in schema.columns
+                if col not in exclude and pd.api.types.is_numeric_dtype(schema[col])]
+
+    # Everything the page needs to show a stored run, without shipping its rows
+    def describe_run(run_id):
+        version = run_version(run_id, PROCESSED_FOLDER)
+        if version is None:
+            # CSV-only run: the first read converts it to Arrow
+            load_columns(run_id, PROCESSED_FOLDER, [], normalise_columns)
+            version = run_version(run_id, PROCESSED_FOLDER)
+        manifest = read_manifest(run_id, PROCESSED_FOLDER) or {}
+        summary = manifest.get('summary') or {"total": 0, "fraud": 0, "amount": 0.0}
+        return {
+            'df': {'run_id': run_id},
+            'timestamp': manifest.get('created', 'Unknown'),
+            'run_id': run_id,
+            'version': version,
+            'summary': summary
+        }
+
+    def run_options(runs):
+        return [
+            {'label': f"{run['created'].replace('T', ' ')}"
+                      + (f" ({run['rows']:,} rows)" if run.get('rows') is not None else ""),
+             'value': run['run_id']}
+            for run in runs
+        ]
+
+    def data_info(dataset):
+        return [
+            html.Span(f"Data loaded: {dataset['summary']['total']:,} records | "),
+            html.Span(f"Last updated: {dataset['timestamp']}")
+        ]
 
     # Try to load data at initialization
+    print(f"\n[DASHBOARD INIT] Runs stored in {PROCESSED_FOLDER}")
     try:
-        initial_df, initial_timestamp = load_latest_data()
-        if not initial_df.empty:
-            print(f"[DASHBOARD INIT] Successfully loaded initial data with {len(initial_df)} records")
-            # Store initial data for immediate access
-            initial_data = {
-                'df': initial_df.to_json(orient='split'),
-                'timestamp': initial_timestamp
-            }
-        else:
-            print("[DASHBOARD INIT] Failed to load initial data, will try again when dashboard loads")
-            initial_data = None
+        initial_runs = list_runs(PROCESSED_FOLDER)
+        print(f"[DASHBOARD INIT] Found {len(initial_runs)} runs")
+        initial_data = describe_run(initial_runs[0]['run_id']) if initial_runs else None
+        if initial_data is None:
+            print("[DASHBOARD INIT] No runs found, will try again when dashboard loads")
     except Exception as e:
         print(f"[DASHBOARD INIT] Error during initial data load: {str(e)}")
+        traceback.print_exc()
+        initial_runs = []
         initial_data = None
 
     # Redis Configuration
@@ -150,6 +173,8 @@ def create_dashboard(flask_app):
         ],
         suppress_callback_exceptions=True
     )
+    # Lets the request metrics separate serialising callback output from the callbacks themselves
+    time_callbacks(dash_app)
 
     # Custom CSS for enhanced styling
     dash_app.index_string = '''
@@ -268,6 +293,10 @@ def create_dashboard(flask_app):
         [
             dcc.Store(id='session-data', storage_type='session', data=initial_data['df'] if initial_data else None),
             dcc.Store(id='analysis-results', storage_type='session'),
+            dcc.Store(id='run-id', storage_type='session', data=initial_data['run_id'] if initial_data else None),
+            # Identifies the dataset in session-data; callbacks key their caches on it
+            dcc.Store(id='dataset-version', storage_type='session', data=initial_data['version'] if initial_data else None),
+            dcc.Store(id='summary', storage_type='session', data=initial_data['summary'] if initial_data else None),
             dcc.Interval(id='interval-component', interval=180*1000, n_intervals=0),  # 3-minute refresh (180 seconds)
             
             # Dashboard Header
@@ -295,10 +324,20 @@ def create_dashboard(flask_app):
                     width="auto"
                 ),
                 dbc.Col(
-                    html.Div(id="data-info", className="text-light pt-2", children=[
-                        html.Span(f"Data loaded: {len(initial_df)} records | ") if initial_data else "",
-                        html.Span(f"Last updated: {initial_timestamp}") if initial_data else ""
-                    ]),
+                    dcc.Dropdown(
+                        id="run-selector",
+                        options=run_options(initial_runs),
+                        value=initial_data['run_id'] if initial_data else None,
+                        placeholder="Select a run",
+                        clearable=False,
+                        className="dropdown-container",
+                        style={"minWidth": "280px"}
+                    ),
+                    width="auto"
+                ),
+                dbc.Col(
+                    html.Div(id="data-info", className="text-light pt-2",
+                             children=data_info(initial_data) if initial_data else ""),
                     width="auto"
                 ),
                 dbc.Col(
@@ -321,6 +360,7 @@ def create_dashboard(flask_app):
                     dbc.Tab(label="Technical Analysis", tab_id="tab-technical"),
                     dbc.Tab(label="Pattern Detection", tab_id="tab-patterns"),
                     dbc.Tab(label="Advanced Analytics", tab_id="tab-advanced"),
+                    dbc.Tab(label="Run Comparison", tab_id="tab-compare"),
                 ],
                 id="tabs",
                 active_tab="tab-overview",
@@ -333,7 +373,11 @@ def create_dashboard(flask_app):
             dbc.Modal(
                 [
                     dbc.ModalHeader("Export Analysis"),
-                    dbc.ModalBody("Analysis exported successfully!"),
+                    dbc.ModalBody([
+                        html.Div(id="export-status", children="Preparing export..."),
+                        dbc.Progress(id="export-progress", value=0, striped=True, animated=True,
+                                     className="mt-2", style={"display": "none"})
+                    ]),
                     dbc.ModalFooter(
                         dbc.Button("Close", id="close-modal", className="ms-auto", n_clicks=0)
                     ),
@@ -349,24 +393,29 @@ def create_dashboard(flask_app):
     # Tab content
     @dash_app.callback(
         Output("tab-content", "children"),
-        [Input("tabs", "active_tab"),
-         Input("session-data", "data"),
-         Input("analysis-results", "data")]
+        [Input("tabs", "active_tab")]
     )
-    def render_tab_content(active_tab, data, analysis_results):
+    def render_tab_content(active_tab):
         if active_tab == "tab-overview":
             return get_overview_tab()
         elif active_tab == "tab-details":
             return get_details_tab()
         elif active_tab == "tab-technical":
-            return get_technical_tab(data)
+            return get_technical_tab()
         elif active_tab == "tab-patterns":
             return get_patterns_tab()
         elif active_tab == "tab-advanced":
             return get_advanced_tab()
+        elif active_tab == "tab-compare":
+            return get_compare_tab()
         else:
             return "No content here yet."
 
+    # Progress bar shown under a graph while its background job runs
+    def job_progress(progress_id):
+        return dbc.Progress(id=progress_id, value=0, striped=True, animated=True,
+                            className="mt-2", style={"display": "none"})
+
     # Overview tab layout
     def get_overview_tab():
         return dbc.Container([
@@ -425,7 +474,8 @@ def create_dashboard(flask_app):
                             html.I(className="fas fa-bolt me-2"), 
                             "Transaction Velocity Analysis"
                         ], className="mb-3"),
-                        dcc.Graph(id="velocity-analysis")
+                        dcc.Graph(id="velocity-analysis"),
+                        job_progress("velocity-progress")
                     ], className="graph-container"),
                     md=12
                 )
@@ -483,21 +533,34 @@ def create_dashboard(flask_app):
                     ], className="graph-container"),
                     md=12
                 )
+            ]),
+
+            dbc.Row([
+                dbc.Col(
+                    html.Div([
+                        html.H4([
+                            html.I(className="fas fa-lightbulb me-2"),
+                            "Why Transactions Were Flagged"
+                        ], className="mb-3"),
+                        dcc.Graph(id="explanation-summary")
+                    ], className="graph-container"),
+                    md=6
+                ),
+                dbc.Col(
+                    html.Div([
+                        html.H4([
+                            html.I(className="fas fa-list me-2"),
+                            "Riskiest Flagged Transactions"
+                        ], className="mb-3"),
+                        html.Div(id="flagged-reasons")
+                    ], className="graph-container"),
+                    md=6
+                )
             ])
         ])
 
     # Technical analysis tab layout
-    def get_technical_tab(data):
-        if not data:
-            return html.Div("No data loaded for technical analysis.")
-        
-        try:
-            df = pd.read_json(StringIO(data), orient='split')
-            numeric_features = df.select_dtypes(include=np.number).columns.tolist()
-        except Exception as e:
-            print(f"Error in get_technical_tab: {str(e)}")
-            numeric_features = []
-        
+    def get_technical_tab():
         return dbc.Container([
             dbc.Row([
                 dbc.Col(
@@ -508,7 +571,6 @@ def create_dashboard(flask_app):
                         ], className="mb-3"),
                         dcc.Dropdown(
                             id="technical-feature",
-                            options=[{'label': col, 'value': col} for col in numeric_features],
                             placeholder="Select a feature",
                             className="mb-3 dropdown-container"
                         ),
@@ -524,7 +586,6 @@ def create_dashboard(flask_app):
                         ], className="mb-3"),
                         dcc.Dropdown(
                             id="boxplot-feature",
-                            options=[{'label': col, 'value': col} for col in numeric_features],
                             placeholder="Select a feature for box plot",
                             className="mb-3 dropdown-container"
                         ),
@@ -541,6 +602,16 @@ def create_dashboard(flask_app):
                             html.I(className="fas fa-th me-2"),
                             "Correlation Heatmap"
                         ], className="mb-3"),
+                        dcc.Dropdown(
+                            id="correlation-scope",
+                            options=[
+                                {"label": "Current run", "value": "run"},
+                                {"label": "All history", "value": "history"}
+                            ],
+                            value="run",
+                            clearable=False,
+                            className="mb-3 dropdown-container"
+                        ),
                         dcc.Graph(id="correlation-heatmap")
                     ], className="graph-container"),
                     md=12
@@ -588,7 +659,34 @@ def create_dashboard(flask_app):
                             html.I(className="fas fa-network-wired me-2"), 
                             "Transaction Network"
                         ], className="mb-3"),
-                        dcc.Graph(id="transaction-network")
+                        html.Div([
+                            dbc.Row([
+                                dbc.Col([
+                                    html.Label("Rank links by:"),
+                                    dcc.Dropdown(
+                                        id="network-rank-by",
+                                        options=[{'label': label, 'value': value} for value, label in NETWORK_RANK_OPTIONS.items()],
+                                        value="count",
+                                        clearable=False,
+                                        className="mb-2 dropdown-container"
+                                    )
+                                ], md=6),
+                                dbc.Col([
+                                    html.Label("Top links:"),
+                                    dcc.Slider(
+                                        id="network-top-k",
+                                        min=50,
+                                        max=2000,
+                                        step=50,
+                                        value=NETWORK_DEFAULT_TOP_K,
+                                        marks={i: str(i) for i in [50, 500, 1000, 2000]},
+                                        className="mb-2"
+                                    )
+                                ], md=6)
+                            ])
+                        ], style={"padding": "0 10px"}),
+                        dcc.Graph(id="transaction-network"),
+                        job_progress("network-progress")
                     ], className="graph-container"),
                     md=6
                 )
@@ -650,7 +748,8 @@ def create_dashboard(flask_app):
                                 ], md=4)
                             ])
                         ], style={"padding": "0 10px"}),
-                        dcc.Graph(id="cluster-plot")
+                        dcc.Graph(id="cluster-plot"),
+                        job_progress("cluster-progress")
                     ], className="graph-container"),
                     md=12
                 )
@@ -672,7 +771,7 @@ def create_dashboard(flask_app):
                                         placeholder="Select feature for time series analysis",
                                         className="mb-2 dropdown-container"
                                     )
-                                ], md=6),
+                                ], md=3),
                                 dbc.Col([
                                     html.Label("Aggregation:"),
                                     dcc.Dropdown(
@@ -681,12 +780,36 @@ def create_dashboard(flask_app):
                                             {"label": "Sum", "value": "sum"},
                                             {"label": "Mean", "value": "mean"},
                                             {"label": "Count", "value": "count"},
-                                            {"label": "Max", "value": "max"}
+                                            {"label": "Max", "value": "max"},
+                                            {"label": "Min", "value": "min"},
+                                            {"label": "Std Dev", "value": "std"}
                                         ],
                                         value="sum",
                                         className="mb-2 dropdown-container"
                                     )
-                                ], md=6)
+                                ], md=3),
+                                dbc.Col([
+                                    html.Label("Granularity:"),
+                                    dcc.Dropdown(
+                                        id="timeseries-granularity",
+                                        options=[
+                                            {"label": "Minute", "value": "minute"},
+                                            {"label": "Hour", "value": "hour"},
+                                            {"label": "Day", "value": "day"}
+                                        ],
+                                        value="day",
+                                        clearable=False,
+                                        className="mb-2 dropdown-container"
+                                    )
+                                ], md=2),
+                                dbc.Col([
+                                    html.Label("Date Range:"),
+                                    dcc.DatePickerRange(
+                                        id="timeseries-range",
+                                        clearable=True,
+                                        className="mb-2"
+                                    )
+                                ], md=4)
                             ])
                         ], style={"padding": "0 10px"}),
                         dcc.Graph(id="timeseries-plot")
@@ -709,13 +832,77 @@ def create_dashboard(flask_app):
             ])
         ])
 
+    # Run comparison tab layout
+    def get_compare_tab():
+        runs = run_options(list_runs(PROCESSED_FOLDER))
+        return dbc.Container([
+            dbc.Row([
+                dbc.Col([
+                    html.Label("Run A:"),
+                    dcc.Dropdown(
+                        id="compare-run-a",
+                        options=runs,
+                        value=runs[0]['value'] if runs else None,
+                        clearable=False,
+                        className="mb-2 dropdown-container"
+                    )
+                ], md=6),
+                dbc.Col([
+                    html.Label("Run B:"),
+                    dcc.Dropdown(
+                        id="compare-run-b",
+                        options=runs,
+                        value=runs[1]['value'] if len(runs) > 1 else None,
+                        clearable=False,
+                        className="mb-2 dropdown-container"
+                    )
+                ], md=6)
+            ], className="mb-3"),
+
+            dbc.Row([
+                dbc.Col(
+                    html.Div([
+                        html.H4([
+                            html.I(className="fas fa-balance-scale me-2"),
+                            "Key Metrics"
+                        ], className="mb-3"),
+                        html.Div(id="compare-metrics")
+                    ], className="graph-container"),
+                    md=12
+                )
+            ]),
+
+            dbc.Row([
+                dbc.Col(
+                    html.Div([
+                        html.H4([
+                            html.I(className="fas fa-store me-2"),
+                            "Fraud Rate by Merchant Category"
+                        ], className="mb-3"),
+                        dcc.Graph(id="compare-merchant")
+                    ], className="graph-container"),
+                    md=6
+                ),
+                dbc.Col(
+                    html.Div([
+                        html.H4([
+                            html.I(className="fas fa-dollar-sign me-2"),
+                            "Transaction Amount Distribution"
+                        ], className="mb-3"),
+                        dcc.Graph(id="compare-amount")
+                    ], className="graph-container"),
+                    md=6
+                )
+            ])
+        ])
+
     # Alert for data loading status
     @dash_app.callback(
         Output("alert-container", "children"),
-        [Input("session-data", "data")]
+        [Input("dataset-version", "data")]
     )
-    def update_alert(data):
-        if data is None:
+    def update_alert(version):
+        if version is None:
             return dbc.Alert(
                 [
                     html.I(className="fas fa-exclamation-triangle me-2"),
@@ -726,62 +913,69 @@ def create_dashboard(flask_app):
             )
         return None
 
-    # Metrics update callback
-    @dash_app.callback(
+    # Metric cards are formatted in the browser from the tiny summary object
+    dash_app.clientside_callback(
+        """
+        function(summary) {
+            if (!summary) {
+                return ["0", "0", "$0", "0"];
+            }
+            const fmt = (n, digits) => Number(n).toLocaleString("en-US", {
+                minimumFractionDigits: digits, maximumFractionDigits: digits
+            });
+            return [
+                fmt(summary.fraud, 0),
+                fmt(summary.total - summary.fraud, 0),
+                "$" + fmt(summary.amount, 2),
+                fmt(summary.total, 0)
+            ];
+        }
+        """,
         [Output("fraud-count", "children"),
          Output("non-fraud-count", "children"),
          Output("total-amount", "children"),
          Output("total-count", "children")],
-        [Input("session-data", "data")]
+        [Input("summary", "data")]
     )
-    def update_metrics(data):
-        if not data:
-            return "0", "0", "$0", "0"
-        
-        try:
-            df = pd.read_json(StringIO(data), orient='split')
-            
-            # Calculate metrics
-            total_count = len(df)
-            fraud_count = df['Meta_Prediction'].eq('Fraudulent').sum()
-            non_fraud_count = total_count - fraud_count
-            total_amount = df['transaction_amount'].sum()
-            
-            return f"{fraud_count:,}", f"{non_fraud_count:,}", f"${total_amount:,.2f}", f"{total_count:,}"
-        except Exception as e:
-            print(f"[METRICS ERROR] {str(e)}")
-            return "Error", "Error", "Error", "Error"
+
+    # Keep the run list fresh; "Load Latest Data" jumps to the newest run
+    @dash_app.callback(
+        [Output("run-selector", "options"),
+         Output("run-selector", "value")],
+        [Input("load-data-button", "n_clicks"),
+         Input("interval-component", "n_intervals")],
+        [State("run-selector", "value")],
+        prevent_initial_call=True
+    )
+    def refresh_runs(n_clicks, n_intervals, selected_run):
+        runs = list_runs(PROCESSED_FOLDER)
+        if not runs:
+            return [], dash.no_update
+        ctx = callback_context
+        latest_requested = ctx.triggered and ctx.triggered[0]['prop_id'].startswith("load-data-button")
+        if latest_requested or selected_run is None:
+            return run_options(runs), runs[0]['run_id']
+        return run_options(runs), dash.no_update
 
     # Load data callback
     @dash_app.callback(
         [Output("session-data", "data"),
         Output("data-info", "children"),
-        Output("analysis-results", "data")],
-        [Input("load-data-button", "n_clicks"),
-        Input("interval-component", "n_intervals")],
-        [State("session-data", "data")]
+        Output("analysis-results", "data"),
+        Output("run-id", "data"),
+        Output("dataset-version", "data"),
+        Output("summary", "data")],
+        [Input("run-selector", "value")],
+        [State("dataset-version", "data")]
     )
-    def load_data(n_clicks, n_intervals, existing_data):
-        ctx = callback_context
-        if not ctx.triggered:
-            # On initial load, use the preloaded data if available
-            if initial_data:
-                print("[LOAD DATA] Using preloaded data")
-                analysis_results = perform_fraud_analysis(pd.read_json(StringIO(initial_data['df']), orient='split'))
-                info_text = [
-                    html.Span(f"Data loaded: {len(initial_df)} records | "),
-                    html.Span(f"Last updated: {initial_timestamp}")
-                ]
-                return initial_data['df'], info_text, json.dumps(analysis_results)
-            return dash.no_update, dash.no_update, dash.no_update
-        
+    def load_data(run_id, existing_version):
         try:
-            print(f"[LOAD DATA CALLBACK] Triggered by: {ctx.triggered[0]['prop_id']}")
-            
-            df, last_updated = load_latest_data()
-            
-            if df.empty:
-                print("[LOAD DATA] No data loaded from files")
+            print(f"[LOAD DATA CALLBACK] Run: {run_id}")
+
+            if run_id:
+                dataset = describe_run(run_id)
+            else:
+                print("[LOAD DATA] No stored runs, using sample data")
                 # Fallback to sample data if no files found
                 df = pd.DataFrame({
                     'transaction_id': range(100),
@@ -796,21 +990,36 @@ def create_dashboard(flask_app):
                     'time_since_last_txn_hrs': np.random.rand(100) * 24,
                     'is_foreign': np.random.choice([0, 1], 100, p=[0.7, 0.3])
                 })
-                last_updated = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                data = df.to_json(orient='split')
+                dataset = {
+                    'df': data,
+                    'timestamp': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'run_id': None,
+                    'version': dataset_fingerprint(data),
+                    'summary': summarize(df)
+                }
+
+            info_text = data_info(dataset)
+            if existing_version and dataset['version'] == existing_version:
+                # Same dataset as before: keep every cached figure valid
+                return (dash.no_update, info_text, dash.no_update, dash.no_update,
+                        dash.no_update, dash.no_update)
+
+            analysis_results = analyse_dataset(dataset['version'], dataset['df'])
+            return (dataset['df'], info_text, analysis_results, dataset['run_id'],
+                    dataset['version'], dataset['summary'])
 
-            analysis_results = perform_fraud_analysis(df)
-            
-            info_text = [
-                html.Span(f"Data loaded: {len(df)} records | "),
-                html.Span(f"Last updated: {last_updated}")
-            ]
-            
-            return df.to_json(orient='split'), info_text, json.dumps(analysis_results)
-            
         except Exception as e:
             print(f"[LOAD DATA ERROR] {str(e)}")
             traceback.print_exc()
-            return dash.no_update, f"Error: {str(e)}", None
+            return dash.no_update, f"Error: {str(e)}", None, dash.no_update, dash.no_update, dash.no_update
+
+    # Alerts and high-risk users per dataset, kept for switching back to a run
+    @memoize()
+    def analyse_dataset(version, data):
+        columns = ['transaction_id', 'user_name', 'merchant_category', 'location',
+                   'credit_card_type', 'transaction_amount', 'Meta_Prediction']
+        return json.dumps(perform_fraud_analysis(load_frame(version, data, columns)))
 
     # Perform fraud analysis
     def perform_fraud_analysis(df):
@@ -820,7 +1029,8 @@ def create_dashboard(flask_app):
         try:
             # Calculate basic fraud metrics
             total_transactions = len(df)
-            fraudulent_transactions = df['Meta_Prediction'].eq('Fraudulent').sum()
+            is_fraud = df['Meta_Prediction'].eq('Fraudulent')
+            fraudulent_transactions = is_fraud.sum()
             fraud_percentage = (fraudulent_transactions / total_transactions) * 100 if total_transactions else 0
             
             results['total_transactions'] = int(total_transactions)
@@ -833,30 +1043,24 @@ def create_dashboard(flask_app):
             
             # Calculate fraud by location
             if 'location' in df.columns:
-                location_fraud = df.groupby('location')['Meta_Prediction'].apply(
-                    lambda x: (x == 'Fraudulent').sum() / len(x) * 100 if len(x) > 0 else 0
-                ).sort_values(ascending=False).head(5).to_dict()
+                location_fraud = (is_fraud.groupby(df['location']).mean() * 100).sort_values(ascending=False).head(5).to_dict()
                 results['location_fraud'] = location_fraud
             
             # Calculate fraud by credit card type
             if 'credit_card_type' in df.columns:
-                card_fraud = df.groupby('credit_card_type')['Meta_Prediction'].apply(
-                    lambda x: (x == 'Fraudulent').sum() / len(x) * 100 if len(x) > 0 else 0
-                ).sort_values(ascending=False).head(5).to_dict()
+                card_fraud = (is_fraud.groupby(df['credit_card_type']).mean() * 100).sort_values(ascending=False).head(5).to_dict()
                 results['card_fraud'] = card_fraud
             
             # Calculate fraud by merchant category
             if 'merchant_category' in df.columns:
-                merchant_fraud = df.groupby('merchant_category')['Meta_Prediction'].apply(
-                    lambda x: (x == 'Fraudulent').sum() / len(x) * 100 if len(x) > 0 else 0
-                ).sort_values(ascending=False).head(5).to_dict()
+                merchant_fraud = (is_fraud.groupby(df['merchant_category']).mean() * 100).sort_values(ascending=False).head(5).to_dict()
                 results['merchant_fraud'] = merchant_fraud
             
             # Identify high-risk users
             if 'user_name' in df.columns:
-                user_fraud = df.groupby('user_name').agg(
+                user_fraud = df.assign(is_fraud=is_fraud).groupby('user_name').agg(
                     total_txns=('transaction_id', 'count'),
-                    fraud_txns=('Meta_Prediction', lambda x: (x == 'Fraudulent').sum()),
+                    fraud_txns=('is_fraud', 'sum'),
                     total_amount=('transaction_amount', 'sum')
                 )
                 user_fraud['fraud_rate'] = user_fraud['fraud_txns'] / user_fraud['total_txns'] * 100
@@ -959,11 +1163,12 @@ def create_dashboard(flask_app):
     @dash_app.callback(
         [Output("transaction-type-pie", "figure"),
          Output("transaction-locations", "figure"),
-         Output("transaction-amount-histogram", "figure"),
-         Output("velocity-analysis", "figure")],
-        [Input("session-data", "data")]
+         Output("transaction-amount-histogram", "figure")],
+        [Input("dataset-version", "data")],
+        [State("session-data", "data")]
     )
-    def update_overview_visuals(data):
+    @memoize()
+    def update_overview_visuals(version, data):
         if not data:
             empty_fig = go.Figure().update_layout(
                 title="No data available",
@@ -971,10 +1176,10 @@ def create_dashboard(flask_app):
                 plot_bgcolor='rgba(0,0,0,0)',
                 paper_bgcolor='rgba(0,0,0,0)'
             )
-            return empty_fig, empty_fig, empty_fig, empty_fig
+            return empty_fig, empty_fig, empty_fig
 
         try:
-            df = pd.read_json(StringIO(data), orient='split')
+            df = load_frame(version, data, ['Meta_Prediction', 'location', 'transaction_id', 'transaction_amount'])
             # Ensure the DataFrame is not empty
             if df.empty:
                 raise ValueError("DataFrame is empty")
@@ -1091,38 +1296,70 @@ def create_dashboard(flask_app):
                 legend_title_text='Transaction Type'
             )
             
-            # Add transaction velocity analysis
-            if not df.empty and 'datetime' in df.columns:
+            return time_fig, loc_fig, amount_fig
+
+        except Exception as e:
+            print(f"Overview error: {str(e)}")
+            traceback.print_exc()
+            empty_fig = go.Figure().update_layout(
+                title="Error loading data",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+            return empty_fig, empty_fig, empty_fig
+
+    # Velocity analysis runs as a background job
+    VELOCITY_COLUMNS = ['user_name', 'datetime', 'transaction_amount', 'Meta_Prediction', 'credit_card_type',
+                        'merchant_category', 'location', 'time_diff_minutes', 'velocity_score']
+
+    @heavy_jobs.callback(
+        dash_app,
+        Output("velocity-analysis", "figure"),
+        [Input("dataset-version", "data")],
+        [State("session-data", "data")],
+        progress=[Output("velocity-progress", "value"), Output("velocity-progress", "label")],
+        running=[(Output("velocity-progress", "style"), {"display": "flex"}, {"display": "none"})],
+        cancel=[Input("tabs", "active_tab")],
+        cache_args_to_ignore=[1]
+    )
+    def update_velocity_analysis(set_progress, version, data):
+        if not data:
+            return go.Figure().update_layout(
+                title="No data available",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+        with heavy_jobs.slot(on_wait=lambda: set_progress((0, "Waiting for a free worker"))):
+            set_progress((10, "Loading data"))
+            df = load_frame(version, data, VELOCITY_COLUMNS)
+
+            # Velocity scores are computed at ingest against each user's full history;
+            # only files processed before that was added need the per-file fallback
+            if 'velocity_score' not in df.columns and 'datetime' in df.columns and 'user_name' in df.columns:
                 try:
-                    # Convert datetime to proper format
                     df['datetime'] = pd.to_datetime(df['datetime'], errors='coerce')
+                    df = df.sort_values(['user_name', 'datetime'])
+                    
+                    # Calculate time difference between consecutive transactions for the same user
+                    df['time_diff_minutes'] = df.groupby('user_name')['datetime'].diff().dt.total_seconds() / 60
+                    df['rapid_succession'] = df['time_diff_minutes'] < RAPID_SUCCESSION_MINUTES
+                    
+                    # Flag unusual transaction amounts (Z-score > 2)
+                    user_amounts = df.groupby('user_name')['transaction_amount']
+                    df['amount_zscore'] = ((df['transaction_amount'] - user_amounts.transform('mean'))
+                                           / user_amounts.transform('std')).fillna(0)
+                    df['unusual_amount'] = df['amount_zscore'].abs() > UNUSUAL_AMOUNT_ZSCORE
                     
-                    # Sort by user and datetime
-                    if 'user_name' in df.columns:
-                        df = df.sort_values(['user_name', 'datetime'])
-                        
-                        # Calculate time difference between consecutive transactions for the same user
-                        df['prev_datetime'] = df.groupby('user_name')['datetime'].shift(1)
-                        df['time_diff_minutes'] = (df['datetime'] - df['prev_datetime']).dt.total_seconds() / 60
-                        
-                        # Flag rapid succession transactions (within 5 minutes)
-                        df['rapid_succession'] = df['time_diff_minutes'] < 5
-                        
-                        # Flag unusual transaction amounts (Z-score > 2)
-                        df['amount_zscore'] = df.groupby('user_name')['transaction_amount'].transform(
-                            lambda x: (x - x.mean()) / x.std() if len(x) > 1 else 0
-                        )
-                        df['unusual_amount'] = abs(df['amount_zscore']) > 2
-                        
-                        # Calculate velocity score (higher is more suspicious)
-                        df['velocity_score'] = (df['rapid_succession'].astype(int) * 5) + (df['unusual_amount'].astype(int) * 3)
-                        
-                        # Add velocity score to the dataframe for use in visualizations
-                        print(f"[ANALYSIS] Added transaction velocity analysis. Found {df['rapid_succession'].sum()} rapid succession transactions.")
+                    # Calculate velocity score (higher is more suspicious)
+                    df['velocity_score'] = (df['rapid_succession'].astype(int) * 5) + (df['unusual_amount'].astype(int) * 3)
                 except Exception as e:
                     print(f"[ANALYSIS WARNING] Could not perform velocity analysis: {str(e)}")
             
             # Transaction Velocity Analysis
+            set_progress((70, "Plotting"))
             try:
                 if 'velocity_score' in df.columns:
                     # Create a scatter plot of transaction amount vs velocity score
@@ -1219,30 +1456,19 @@ def create_dashboard(flask_app):
                     paper_bgcolor='rgba(0,0,0,0)'
                 )
 
-            return time_fig, loc_fig, amount_fig, velocity_fig
-
-        except Exception as e:
-            print(f"Overview error: {str(e)}")
-            traceback.print_exc()
-            empty_fig = go.Figure().update_layout(
-                title="Error loading data",
-                template="plotly_dark",
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)'
-            )
-            return empty_fig, empty_fig, empty_fig, empty_fig
+            return velocity_fig
 
     # Detailed Analysis Tab Callbacks
     @dash_app.callback(
         [Output("feature-dropdown", "options"),
-         Output("feature-analysis", "figure"),
          Output("fraud-pie", "figure"),
          Output("card-type-analysis", "figure"),
          Output("key-metrics", "children")],
-        [Input("session-data", "data"),
-         Input("feature-dropdown", "value")]
+        [Input("dataset-version", "data")],
+        [State("session-data", "data")]
     )
-    def update_detailed_analysis(data, selected_feature):
+    @memoize()
+    def update_detailed_analysis(version, data):
         if not data:
             empty_fig = go.Figure().update_layout(
                 title="No data available",
@@ -1250,14 +1476,12 @@ def create_dashboard(flask_app):
                 plot_bgcolor='rgba(0,0,0,0)',
                 paper_bgcolor='rgba(0,0,0,0)'
             )
-            return [], empty_fig, empty_fig, empty_fig, "No data available"
+            return [], empty_fig, empty_fig, "No data available"
         
         try:
-            df = pd.read_json(StringIO(data), orient='split')
-            
-            # Create dropdown options
-            features = [{'label': col, 'value': col} for col in df.columns 
-                       if col not in ['Meta_Prediction'] and pd.api.types.is_numeric_dtype(df[col])]
+            features = [{'label': col, 'value': col}
+                        for col in numeric_columns(version, data, exclude=['Meta_Prediction'])]
+            df = load_frame(version, data, ['Meta_Prediction', 'credit_card_type', 'transaction_amount'])
             
             # Create fraud pie chart
             fraud_counts = df['Meta_Prediction'].value_counts()
@@ -1303,32 +1527,6 @@ def create_dashboard(flask_app):
                     paper_bgcolor='rgba(0,0,0,0)'
                 )
             
-            # Create feature analysis
-            if selected_feature:
-                feature_fig = px.histogram(
-                    df,
-                    x=selected_feature,
-                    color='Meta_Prediction',
-                    marginal="box",
-                    title=f"{selected_feature} Distribution by Fraud Status",
-                    color_discrete_map={'Fraudulent': '#e74c3c', 'Non-Fraudulent': '#2ecc71'}
-                )
-                
-                feature_fig.update_layout(
-                    template="plotly_dark",
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    xaxis_title=selected_feature,
-                    yaxis_title="Count"
-                )
-            else:
-                feature_fig = go.Figure().update_layout(
-                    title="Select a feature to analyze",
-                    template="plotly_dark",
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)'
-                )
-            
             # Create key metrics
             total_count = len(df)
             fraud_count = df['Meta_Prediction'].eq('Fraudulent').sum()
@@ -1350,7 +1548,7 @@ def create_dashboard(flask_app):
                 ])
             ]
             
-            return features, feature_fig, fraud_pie, card_fig, key_metrics
+            return features, fraud_pie, card_fig, key_metrics
             
         except Exception as e:
             print(f"Detailed analysis error: {str(e)}")
@@ -1361,131 +1559,299 @@ def create_dashboard(flask_app):
                 plot_bgcolor='rgba(0,0,0,0)',
                 paper_bgcolor='rgba(0,0,0,0)'
             )
-            return [], empty_fig, empty_fig, empty_fig, "Error loading data"
+            return [], empty_fig, empty_fig, "Error loading data"
 
-    # Technical Analysis Tab Callbacks
+    # Feature histogram only depends on the selected feature
     @dash_app.callback(
-        [Output("technical-feature", "options"),
-         Output("boxplot-feature", "options"),
-         Output("technical-visuals", "figure"),
-         Output("box-plot", "figure"),
-         Output("correlation-heatmap", "figure")],
-        [Input("session-data", "data"),
-         Input("technical-feature", "value"),
-         Input("boxplot-feature", "value")]
+        Output("feature-analysis", "figure"),
+        [Input("dataset-version", "data"),
+         Input("feature-dropdown", "value")],
+        [State("session-data", "data")]
     )
-    def update_technical_analysis(data, tech_feature, box_feature):
-        if not data:
-            empty_fig = go.Figure().update_layout(
-                title="No data available",
+    @memoize()
+    def update_feature_analysis(version, selected_feature, data):
+        if not data or not selected_feature:
+            return go.Figure().update_layout(
+                title="Select a feature to analyze" if data else "No data available",
                 template="plotly_dark",
                 plot_bgcolor='rgba(0,0,0,0)',
                 paper_bgcolor='rgba(0,0,0,0)'
             )
-            return [], [], empty_fig, empty_fig, empty_fig
         
         try:
-            df = pd.read_json(StringIO(data), orient='split')
-            
-            # Get numeric features for dropdowns
-            numeric_features = [{'label': col, 'value': col} for col in df.columns 
-                               if pd.api.types.is_numeric_dtype(df[col])]
-            
-            # Create correlation heatmap
-            numeric_cols = df.select_dtypes(include=np.number).columns
-            corr_matrix = df[numeric_cols].corr()
+            df = load_frame(version, data, [selected_feature, 'Meta_Prediction'])
+            feature_fig = px.histogram(
+                df,
+                x=selected_feature,
+                color='Meta_Prediction',
+                marginal="box",
+                title=f"{selected_feature} Distribution by Fraud Status",
+                color_discrete_map={'Fraudulent': '#e74c3c', 'Non-Fraudulent': '#2ecc71'}
+            )
             
-            heatmap = px.imshow(
-                corr_matrix,
-                title="Feature Correlation Heatmap",
-                color_continuous_scale="RdBu_r",
-                zmin=-1, zmax=1
+            feature_fig.update_layout(
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                xaxis_title=selected_feature,
+                yaxis_title="Count"
             )
+            return feature_fig
             
-            heatmap.update_layout(
+        except Exception as e:
+            print(f"Feature analysis error: {str(e)}")
+            traceback.print_exc()
+            return go.Figure().update_layout(
+                title="Error in analysis",
                 template="plotly_dark",
                 plot_bgcolor='rgba(0,0,0,0)',
                 paper_bgcolor='rgba(0,0,0,0)'
             )
-            
-            # Create technical visuals
-            if tech_feature:
-                tech_fig = px.scatter(
-                    df,
-                    x=tech_feature,
-                    y='transaction_amount',
-                    color='Meta_Prediction',
-                    title=f"{tech_feature} vs Transaction Amount",
-                    color_discrete_map={'Fraudulent': '#e74c3c', 'Non-Fraudulent': '#2ecc71'},
-                    opacity=0.7
-                )
-                
-                tech_fig.update_layout(
-                    template="plotly_dark",
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    xaxis_title=tech_feature,
-                    yaxis_title="Transaction Amount"
-                )
-            else:
-                tech_fig = go.Figure().update_layout(
-                    title="Select a feature for technical analysis",
-                    template="plotly_dark",
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)'
-                )
-            
-            # Create box plot
-            if box_feature:
-                box_fig = px.box(
-                    df,
-                    x='Meta_Prediction',
-                    y=box_feature,
-                    color='Meta_Prediction',
-                    title=f"{box_feature} Distribution by Fraud Status",
-                    color_discrete_map={'Fraudulent': '#e74c3c', 'Non-Fraudulent': '#2ecc71'},
-                    points="all"
-                )
-                
-                box_fig.update_layout(
-                    template="plotly_dark",
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    xaxis_title="Fraud Status",
-                    yaxis_title=box_feature
-                )
+
+    # Technical Analysis Tab Callbacks
+    # Feature contributions stored with the run when it was scored
+    @dash_app.callback(
+        [Output("explanation-summary", "figure"),
+         Output("flagged-reasons", "children")],
+        [Input("dataset-version", "data"),
+         Input("run-id", "data")],
+        [State("session-data", "data")]
+    )
+    @memoize()
+    def update_explanations(version, run_id, data):
+        empty = lambda title: go.Figure().update_layout(
+            title=title,
+            template="plotly_dark",
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)'
+        )
+        explanations = load_explanations(run_id, PROCESSED_FOLDER) if run_id else None
+        if explanations is None or explanations.empty:
+            return empty("No explanations stored for this dataset"), "Explanations are computed when a file is scored."
+
+        try:
+            summary = summarize_explanations(explanations)
+            summary_fig = px.bar(
+                summary.sort_values('contribution'),
+                x='contribution',
+                y='feature',
+                color='model',
+                barmode='group',
+                orientation='h',
+                title=f"Average push towards fraud ({explanations['row'].nunique():,} flagged rows)",
+                labels={'contribution': 'Mean positive contribution', 'feature': 'Feature', 'model': 'Model'}
+            )
+            summary_fig.update_layout(
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+            columns = ['transaction_id', 'user_name', 'transaction_amount', 'risk_score', 'Meta_Prediction', 'fraud_reasons']
+            df = load_frame(version, data, columns)
+            if 'fraud_reasons' not in df.columns:
+                return summary_fig, "This run has no per-transaction reasons."
+            flagged = df[df['fraud_reasons'].fillna('') != '']
+            if 'risk_score' in flagged.columns:
+                flagged = flagged.nlargest(15, 'risk_score')
             else:
-                box_fig = go.Figure().update_layout(
-                    title="Select a feature for box plot analysis",
-                    template="plotly_dark",
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)'
-                )
+                flagged = flagged.head(15)
+            shown = [col for col in columns if col in flagged.columns]
+            flagged = flagged.round(3)
+            table = dbc.Table(
+                [html.Thead(html.Tr([html.Th(col) for col in shown])),
+                 html.Tbody([html.Tr([html.Td(row[col]) for col in shown]) for _, row in flagged.iterrows()])],
+                bordered=True, color="dark", hover=True, size="sm", responsive=True
+            )
+            return summary_fig, table
+
+        except Exception as e:
+            print(f"Explanation error: {str(e)}")
+            traceback.print_exc()
+            return empty("Error loading explanations"), "Error loading explanations"
+
+    @dash_app.callback(
+        [Output("technical-feature", "options"),
+         Output("boxplot-feature", "options")],
+        [Input("dataset-version", "data")],
+        [State("session-data", "data")]
+    )
+    @memoize()
+    def update_technical_options(version, data):
+        if not data:
+            return [], []
+        
+        try:
+            # Get numeric features for dropdowns
+            numeric_features = [{'label': col, 'value': col} for col in numeric_columns(version, data)]
+            return numeric_features, numeric_features
+            
+        except Exception as e:
+            print(f"Technical analysis error: {str(e)}")
+            traceback.print_exc()
+            return [], []
+
+    @dash_app.callback(
+        Output("technical-visuals", "figure"),
+        [Input("dataset-version", "data"),
+         Input("technical-feature", "value")],
+        [State("session-data", "data")]
+    )
+    @memoize()
+    def update_technical_visuals(version, tech_feature, data):
+        if not data or not tech_feature:
+            return go.Figure().update_layout(
+                title="Select a feature for technical analysis" if data else "No data available",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+        
+        try:
+            df = load_frame(version, data, [tech_feature, 'transaction_amount', 'Meta_Prediction'])
+            tech_fig = px.scatter(
+                df,
+                x=tech_feature,
+                y='transaction_amount',
+                color='Meta_Prediction',
+                title=f"{tech_feature} vs Transaction Amount",
+                color_discrete_map={'Fraudulent': '#e74c3c', 'Non-Fraudulent': '#2ecc71'},
+                opacity=0.7
+            )
             
-            return numeric_features, numeric_features, tech_fig, box_fig, heatmap
+            tech_fig.update_layout(
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                xaxis_title=tech_feature,
+                yaxis_title="Transaction Amount"
+            )
+            return tech_fig
             
         except Exception as e:
             print(f"Technical analysis error: {str(e)}")
             traceback.print_exc()
-            empty_fig = go.Figure().update_layout(
+            return go.Figure().update_layout(
+                title="Error in analysis",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+    @dash_app.callback(
+        Output("box-plot", "figure"),
+        [Input("dataset-version", "data"),
+         Input("boxplot-feature", "value")],
+        [State("session-data", "data")]
+    )
+    @memoize()
+    def update_box_plot(version, box_feature, data):
+        if not data or not box_feature:
+            return go.Figure().update_layout(
+                title="Select a feature for box plot analysis" if data else "No data available",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+        
+        try:
+            df = load_frame(version, data, ['Meta_Prediction', box_feature])
+            box_fig = px.box(
+                df,
+                x='Meta_Prediction',
+                y=box_feature,
+                color='Meta_Prediction',
+                title=f"{box_feature} Distribution by Fraud Status",
+                color_discrete_map={'Fraudulent': '#e74c3c', 'Non-Fraudulent': '#2ecc71'},
+                points="all"
+            )
+            
+            box_fig.update_layout(
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                xaxis_title="Fraud Status",
+                yaxis_title=box_feature
+            )
+            return box_fig
+            
+        except Exception as e:
+            print(f"Technical analysis error: {str(e)}")
+            traceback.print_exc()
+            return go.Figure().update_layout(
                 title="Error in analysis",
                 template="plotly_dark",
                 plot_bgcolor='rgba(0,0,0,0)',
                 paper_bgcolor='rgba(0,0,0,0)'
             )
-            return [], [], empty_fig, empty_fig, empty_fig
+
+    # Correlation heatmap callback
+    @dash_app.callback(
+        Output("correlation-heatmap", "figure"),
+        [Input("dataset-version", "data"),
+         Input("run-id", "data"),
+         Input("correlation-scope", "value")],
+        [State("session-data", "data")]
+    )
+    # Other uploads change the all-history matrix without changing any argument
+    @memoize(depends=lambda: store_version(COVARIANCE_PATH))
+    def update_correlation_heatmap(version, run_id, scope, data):
+        if not data:
+            return go.Figure().update_layout(
+                title="No data available",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+        try:
+            # Co-moments are accumulated at ingest, so this is a lookup rather than a pass over the rows
+            store = load_covariance_store(COVARIANCE_PATH)
+            if scope == "history":
+                corr_matrix = store.correlation()
+                title = "Feature Correlation Heatmap (All History)"
+            else:
+                corr_matrix = store.correlation(run_id) if run_id else None
+                title = "Feature Correlation Heatmap"
+
+            if corr_matrix is None:
+                # Runs processed before the store existed (or sample data)
+                df = load_frame(version, data, correlation_columns(frame_schema(version, data)))
+                corr_matrix = df.corr()
+            
+            heatmap = px.imshow(
+                corr_matrix,
+                title=title,
+                color_continuous_scale="RdBu_r",
+                zmin=-1, zmax=1
+            )
+            
+            heatmap.update_layout(
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+            return heatmap
+
+        except Exception as e:
+            print(f"Correlation heatmap error: {str(e)}")
+            traceback.print_exc()
+            return go.Figure().update_layout(
+                title="Error in correlation analysis",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
 
     # Pattern Detection Tab Callbacks
     @dash_app.callback(
         [Output("anomaly-feature", "options"),
-         Output("anomaly-plot", "figure"),
-         Output("temporal-pattern", "figure"),
-         Output("transaction-network", "figure"),
          Output("user-behavior", "figure")],
-        [Input("session-data", "data"),
-         Input("anomaly-feature", "value")]
+        [Input("dataset-version", "data")],
+        [State("session-data", "data")]
     )
-    def update_pattern_detection(data, anomaly_feature):
+    @memoize()
+    def update_pattern_detection(version, data):
         if not data:
             empty_fig = go.Figure().update_layout(
                 title="No data available",
@@ -1493,237 +1859,12 @@ def create_dashboard(flask_app):
                 plot_bgcolor='rgba(0,0,0,0)',
                 paper_bgcolor='rgba(0,0,0,0)'
             )
-            return [], empty_fig, empty_fig, empty_fig, empty_fig
+            return [], empty_fig
         
         try:
-            df = pd.read_json(StringIO(data), orient='split')
-            
             # Get numeric features for dropdown
-            numeric_features = [{'label': col, 'value': col} for col in df.columns 
-                               if pd.api.types.is_numeric_dtype(df[col])]
-            
-            # Create anomaly detection plot
-            if anomaly_feature:
-                # Use DBSCAN for anomaly detection
-                try:
-                    # Extract feature and standardize
-                    X = df[[anomaly_feature, 'transaction_amount']].copy()
-                    X = StandardScaler().fit_transform(X)
-                    
-                    # Apply DBSCAN
-                    clustering = DBSCAN(eps=0.5, min_samples=5).fit(X)
-                    
-                    # Add cluster labels to dataframe
-                    df_anomaly = df.copy()
-                    df_anomaly['cluster'] = clustering.labels_
-                    
-                    # Anomalies are labeled as -1
-                    anomaly_fig = px.scatter(
-                        df_anomaly,
-                        x=anomaly_feature,
-                        y='transaction_amount',
-                        color='cluster',
-                        color_continuous_scale='Viridis',
-                        title=f"Anomaly Detection: {anomaly_feature} vs Transaction Amount",
-                        labels={
-                            anomaly_feature: anomaly_feature,
-                            'transaction_amount': 'Transaction Amount ($)',
-                            'cluster': 'Cluster'
-                        },
-                        hover_data=['Meta_Prediction']
-                    )
-                    
-                    # Highlight anomalies
-                    anomalies = df_anomaly[df_anomaly['cluster'] == -1]
-                    if not anomalies.empty:
-                        anomaly_fig.add_trace(
-                            go.Scatter(
-                                x=anomalies[anomaly_feature],
-                                y=anomalies['transaction_amount'],
-                                mode='markers',
-                                marker=dict(
-                                    color='red',
-                                    size=12,
-                                    line=dict(width=2, color='black')
-                                ),
-                                name='Anomalies'
-                            )
-                        )
-                    
-                    anomaly_fig.update_layout(
-                        template="plotly_dark",
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)'
-                    )
-                except Exception as e:
-                    print(f"Anomaly detection error: {str(e)}")
-                    anomaly_fig = go.Figure().update_layout(
-                        title="Error in anomaly detection",
-                        template="plotly_dark",
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)'
-                    )
-            else:
-                anomaly_fig = go.Figure().update_layout(
-                    title="Select a feature for anomaly detection",
-                    template="plotly_dark",
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)'
-                )
-            
-            # Create temporal pattern analysis
-            if 'datetime' in df.columns:
-                try:
-                    # Convert to datetime
-                    df['datetime'] = pd.to_datetime(df['datetime'], errors='coerce')
-                    
-                    # Group by date and fraud status
-                    df['date'] = df['datetime'].dt.date
-                    temporal_data = df.groupby(['date', 'Meta_Prediction']).size().reset_index(name='count')
-                    
-                    # Create temporal pattern plot
-                    temporal_fig = px.line(
-                        temporal_data,
-                        x='date',
-                        y='count',
-                        color='Meta_Prediction',
-                        title="Temporal Pattern Analysis",
-                        labels={
-                            'date': 'Date',
-                            'count': 'Number of Transactions',
-                            'Meta_Prediction': 'Transaction Type'
-                        },
-                        color_discrete_map={'Fraudulent': '#e74c3c', 'Non-Fraudulent': '#2ecc71'}
-                    )
-                    
-                    temporal_fig.update_layout(
-                        template="plotly_dark",
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
-                        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)')
-                    )
-                except Exception as e:
-                    print(f"Temporal pattern error: {str(e)}")
-                    temporal_fig = go.Figure().update_layout(
-                        title="Error in temporal pattern analysis",
-                        template="plotly_dark",
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)'
-                    )
-            else:
-                temporal_fig = go.Figure().update_layout(
-                    title="Datetime data not available for temporal analysis",
-                    template="plotly_dark",
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)'
-                )
-            
-            # Create transaction network visualization
-            if 'user_name' in df.columns and 'merchant_category' in df.columns:
-                try:
-                    # Create a network of users and merchant categories
-                    network_data = df.groupby(['user_name', 'merchant_category']).agg(
-                        count=('transaction_id', 'count'),
-                        fraud_count=('Meta_Prediction', lambda x: (x == 'Fraudulent').sum()),
-                        total_amount=('transaction_amount', 'sum')
-                    ).reset_index()
-                    
-                    network_data['fraud_rate'] = network_data['fraud_count'] / network_data['count'] * 100
-                    
-                    # Create a network visualization
-                    network_fig = go.Figure()
-                    
-                    # Add edges (connections between users and merchants)
-                    for _, row in network_data.iterrows():
-                        # Only show connections with significant activity
-                        if row['count'] > 1:
-                            network_fig.add_trace(
-                                go.Scatter(
-                                    x=[0, 1],
-                                    y=[network_data['user_name'].unique().tolist().index(row['user_name']),
-                                       len(network_data['user_name'].unique()) + 
-                                       network_data['merchant_category'].unique().tolist().index(row['merchant_category'])],
-                                    mode='lines',
-                                    line=dict(
-                                        width=row['count'] / 2,
-                                        color='rgba(255,0,0,{})'.format(row['fraud_rate']/100)
-                                    ),
-                                    hoverinfo='text',
-                                    text=f"User: {row['user_name']}<br>Merchant: {row['merchant_category']}<br>" +
-                                         f"Transactions: {row['count']}<br>Fraud Rate: {row['fraud_rate']:.1f}%",
-                                    showlegend=False
-                                )
-                            )
-                    
-                    # Add user nodes
-                    network_fig.add_trace(
-                        go.Scatter(
-                            x=[0] * len(network_data['user_name'].unique()),
-                            y=list(range(len(network_data['user_name'].unique()))),
-                            mode='markers',
-                            marker=dict(
-                                size=10,
-                                color='#3498db',
-                                line=dict(width=1, color='#2980b9')
-                            ),
-                            text=network_data['user_name'].unique(),
-                            hoverinfo='text',
-                            name='Users'
-                        )
-                    )
-                    
-                    # Add merchant nodes
-                    network_fig.add_trace(
-                        go.Scatter(
-                            x=[1] * len(network_data['merchant_category'].unique()),
-                            y=[len(network_data['user_name'].unique()) + i 
-                               for i in range(len(network_data['merchant_category'].unique()))],
-                            mode='markers',
-                            marker=dict(
-                                size=10,
-                                color='#2ecc71',
-                                line=dict(width=1, color='#27ae60')
-                            ),
-                            text=network_data['merchant_category'].unique(),
-                            hoverinfo='text',
-                            name='Merchants'
-                        )
-                    )
-                    
-                    network_fig.update_layout(
-                        title="Transaction Network: Users and Merchants",
-                        template="plotly_dark",
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        showlegend=True,
-                        xaxis=dict(
-                            showgrid=False,
-                            zeroline=False,
-                            showticklabels=False,
-                            range=[-0.1, 1.1]
-                        ),
-                        yaxis=dict(
-                            showgrid=False,
-                            zeroline=False,
-                            showticklabels=False
-                        )
-                    )
-                except Exception as e:
-                    print(f"Network visualization error: {str(e)}")
-                    network_fig = go.Figure().update_layout(
-                        title="Error in network visualization",
-                        template="plotly_dark",
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)'
-                    )
-            else:
-                network_fig = go.Figure().update_layout(
-                    title="User and merchant data not available for network analysis",
-                    template="plotly_dark",
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)'
-                )
+            numeric_features = [{'label': col, 'value': col} for col in numeric_columns(version, data)]
+            df = load_frame(version, data, ['user_name', 'transaction_id', 'Meta_Prediction', 'transaction_amount'])
             
             # Create user behavior analysis
             if 'user_name' in df.columns:
@@ -1778,7 +1919,7 @@ def create_dashboard(flask_app):
                     paper_bgcolor='rgba(0,0,0,0)'
                 )
             
-            return numeric_features, anomaly_fig, temporal_fig, network_fig, user_fig
+            return numeric_features, user_fig
             
         except Exception as e:
             print(f"Pattern detection error: {str(e)}")
@@ -1789,207 +1930,264 @@ def create_dashboard(flask_app):
                 plot_bgcolor='rgba(0,0,0,0)',
                 paper_bgcolor='rgba(0,0,0,0)'
             )
-            return [], empty_fig, empty_fig, empty_fig, empty_fig
+            return [], empty_fig
 
-    # Advanced Analytics Tab Callbacks
+    # Time rollups for the current run: precomputed at ingest, or built once for older data
+    fallback_rollups = {}
+
+    def get_rollups(version, data, run_id):
+        rollups = load_rollups(run_id, ROLLUP_FOLDER) if run_id else None
+        if rollups is not None:
+            return rollups
+        key = version or dataset_fingerprint(data)
+        if key not in fallback_rollups:
+            if 'datetime' not in frame_schema(version, data).columns:
+                return None
+            df = load_frame(version, data, ['datetime', 'Meta_Prediction', *numeric_columns(version, data)])
+            fallback_rollups.clear()
+            fallback_rollups[key] = build_rollups(df)
+        return fallback_rollups[key]
+
+    # Temporal pattern callback
     @dash_app.callback(
-        [Output("cluster-feature-1", "options"),
-         Output("cluster-feature-2", "options"),
-         Output("timeseries-feature", "options"),
-         Output("cluster-plot", "figure"),
-         Output("timeseries-plot", "figure"),
-         Output("risk-scoring", "figure")],
-        [Input("session-data", "data"),
-         Input("cluster-feature-1", "value"),
-         Input("cluster-feature-2", "value"),
-         Input("cluster-epsilon", "value"),
-         Input("timeseries-feature", "value"),
-         Input("timeseries-agg", "value")]
+        Output("temporal-pattern", "figure"),
+        [Input("dataset-version", "data"),
+         Input("run-id", "data")],
+        [State("session-data", "data")]
     )
-    def update_advanced_analytics(data, cluster_f1, cluster_f2, epsilon, ts_feature, ts_agg):
+    @memoize()
+    def update_temporal_pattern(version, run_id, data):
         if not data:
-            empty_fig = go.Figure().update_layout(
+            return go.Figure().update_layout(
                 title="No data available",
                 template="plotly_dark",
                 plot_bgcolor='rgba(0,0,0,0)',
                 paper_bgcolor='rgba(0,0,0,0)'
             )
-            return [], [], [], empty_fig, empty_fig, empty_fig
-        
+
         try:
-            df = pd.read_json(StringIO(data), orient='split')
-            
-            # Get numeric features for dropdowns
-            numeric_features = [{'label': col, 'value': col} for col in df.columns 
-                               if pd.api.types.is_numeric_dtype(df[col])]
-            
-            # Create cluster analysis plot
-            if cluster_f1 and cluster_f2:
-                try:
-                    # Extract features for clustering
-                    X = df[[cluster_f1, cluster_f2]].copy()
-                    X = StandardScaler().fit_transform(X)
-                    
-                    # Apply DBSCAN
-                    clustering = DBSCAN(eps=epsilon, min_samples=5).fit(X)
-                    
-                    # Add cluster labels to dataframe
-                    df_cluster = df.copy()
-                    df_cluster['cluster'] = clustering.labels_
-                    
-                    # Create cluster plot
-                    cluster_fig = px.scatter(
-                        df_cluster,
-                        x=cluster_f1,
-                        y=cluster_f2,
-                        color='cluster',
-                        color_continuous_scale='Viridis',
-                        title=f"Cluster Analysis: {cluster_f1} vs {cluster_f2}",
-                        labels={
-                            cluster_f1: cluster_f1,
-                            cluster_f2: cluster_f2,
-                            'cluster': 'Cluster'
-                        },
-                        hover_data=['Meta_Prediction']
-                    )
-                    
-                    # Highlight anomalies (cluster = -1)
-                    anomalies = df_cluster[df_cluster['cluster'] == -1]
-                    if not anomalies.empty:
-                        cluster_fig.add_trace(
-                            go.Scatter(
-                                x=anomalies[cluster_f1],
-                                y=anomalies[cluster_f2],
-                                mode='markers',
-                                marker=dict(
-                                    color='red',
-                                    size=12,
-                                    line=dict(width=2, color='black')
-                                ),
-                                name='Anomalies'
-                            )
-                        )
-                    
-                    cluster_fig.update_layout(
-                        template="plotly_dark",
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
-                        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)')
-                    )
-                except Exception as e:
-                    print(f"Cluster analysis error: {str(e)}")
-                    cluster_fig = go.Figure().update_layout(
-                        title="Error in cluster analysis",
-                        template="plotly_dark",
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)'
-                    )
-            else:
-                cluster_fig = go.Figure().update_layout(
-                    title="Select features for cluster analysis",
+            rollups = get_rollups(version, data, run_id)
+            if rollups is None:
+                return go.Figure().update_layout(
+                    title="Datetime data not available for temporal analysis",
                     template="plotly_dark",
                     plot_bgcolor='rgba(0,0,0,0)',
                     paper_bgcolor='rgba(0,0,0,0)'
                 )
+
+            # Transactions per day and fraud status
+            temporal_data = query_rollups(rollups, 'day', None).rename(
+                columns={'bucket': 'date', 'value': 'count'}
+            )
             
-            # Create time series analysis
-            if 'datetime' in df.columns and ts_feature:
-                try:
-                    # Convert to datetime
-                    df['datetime'] = pd.to_datetime(df['datetime'], errors='coerce')
-                    
-                    # Group by date and aggregate
-                    df['date'] = df['datetime'].dt.date
-                    
-                    # Apply the selected aggregation
-                    if ts_agg == 'sum':
-                        ts_data = df.groupby(['date', 'Meta_Prediction'])[ts_feature].sum().reset_index()
-                    elif ts_agg == 'mean':
-                        ts_data = df.groupby(['date', 'Meta_Prediction'])[ts_feature].mean().reset_index()
-                    elif ts_agg == 'count':
-                        ts_data = df.groupby(['date', 'Meta_Prediction'])[ts_feature].count().reset_index()
-                    elif ts_agg == 'max':
-                        ts_data = df.groupby(['date', 'Meta_Prediction'])[ts_feature].max().reset_index()
-                    else:
-                        ts_data = df.groupby(['date', 'Meta_Prediction'])[ts_feature].sum().reset_index()
-                    
-                    # Create time series plot
-                    ts_fig = px.line(
-                        ts_data,
-                        x='date',
-                        y=ts_feature,
-                        color='Meta_Prediction',
-                        title=f"Time Series Analysis: {ts_feature} ({ts_agg})",
-                        labels={
-                            'date': 'Date',
-                            ts_feature: f'{ts_feature} ({ts_agg})',
-                            'Meta_Prediction': 'Transaction Type'
-                        },
-                        color_discrete_map={'Fraudulent': '#e74c3c', 'Non-Fraudulent': '#2ecc71'}
-                    )
-                    
-                    ts_fig.update_layout(
-                        template="plotly_dark",
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
-                        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)')
+            # Create temporal pattern plot
+            temporal_fig = px.line(
+                temporal_data,
+                x='date',
+                y='count',
+                color='Meta_Prediction',
+                title="Temporal Pattern Analysis",
+                labels={
+                    'date': 'Date',
+                    'count': 'Number of Transactions',
+                    'Meta_Prediction': 'Transaction Type'
+                },
+                color_discrete_map={'Fraudulent': '#e74c3c', 'Non-Fraudulent': '#2ecc71'}
+            )
+            
+            temporal_fig.update_layout(
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
+                yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)')
+            )
+            return temporal_fig
+
+        except Exception as e:
+            print(f"Temporal pattern error: {str(e)}")
+            return go.Figure().update_layout(
+                title="Error in temporal pattern analysis",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+    # Anomaly detection callback
+    @dash_app.callback(
+        Output("anomaly-plot", "figure"),
+        [Input("dataset-version", "data"),
+         Input("anomaly-feature", "value")],
+        [State("session-data", "data")]
+    )
+    @memoize()
+    def update_anomaly_detection(version, anomaly_feature, data):
+        if not data:
+            return go.Figure().update_layout(
+                title="No data available",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+        if not anomaly_feature:
+            return go.Figure().update_layout(
+                title="Select a feature for anomaly detection",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+        try:
+            df = load_frame(version, data, [anomaly_feature, 'transaction_amount', 'anomaly_score', 'Meta_Prediction'])
+
+            if 'anomaly_score' in df.columns:
+                # Scores were assigned at ingest by the streaming detector
+                df_anomaly = df
+                anomalies = df_anomaly[df_anomaly['anomaly_score'] > anomaly_threshold(df_anomaly['anomaly_score'])]
+                color_col, color_label = 'anomaly_score', 'Anomaly Score'
+            else:
+                # Older runs have no stored scores, fall back to DBSCAN
+                labels = cluster_labels(
+                    df, [anomaly_feature, 'transaction_amount'], 0.5, version or dataset_fingerprint(data)
+                )
+                df_anomaly = df.copy()
+                df_anomaly['cluster'] = labels
+                # Anomalies are labeled as -1
+                anomalies = df_anomaly[df_anomaly['cluster'] == -1]
+                color_col, color_label = 'cluster', 'Cluster'
+
+            anomaly_fig = px.scatter(
+                df_anomaly,
+                x=anomaly_feature,
+                y='transaction_amount',
+                color=color_col,
+                color_continuous_scale='Viridis',
+                title=f"Anomaly Detection: {anomaly_feature} vs Transaction Amount",
+                labels={
+                    anomaly_feature: anomaly_feature,
+                    'transaction_amount': 'Transaction Amount ($)',
+                    color_col: color_label
+                },
+                hover_data=['Meta_Prediction']
+            )
+            
+            # Highlight anomalies
+            if not anomalies.empty:
+                anomaly_fig.add_trace(
+                    go.Scatter(
+                        x=anomalies[anomaly_feature],
+                        y=anomalies['transaction_amount'],
+                        mode='markers',
+                        marker=dict(
+                            color='red',
+                            size=12,
+                            line=dict(width=2, color='black')
+                        ),
+                        name='Anomalies'
                     )
-                except Exception as e:
-                    print(f"Time series analysis error: {str(e)}")
-                    ts_fig = go.Figure().update_layout(
-                        title="Error in time series analysis",
+                )
+            
+            anomaly_fig.update_layout(
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+            return anomaly_fig
+
+        except Exception as e:
+            print(f"Anomaly detection error: {str(e)}")
+            return go.Figure().update_layout(
+                title="Error in anomaly detection",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+    # Transaction network callback, run as a background job
+    @heavy_jobs.callback(
+        dash_app,
+        Output("transaction-network", "figure"),
+        [Input("dataset-version", "data"),
+         Input("network-rank-by", "value"),
+         Input("network-top-k", "value")],
+        [State("session-data", "data")],
+        progress=[Output("network-progress", "value"), Output("network-progress", "label")],
+        running=[(Output("network-progress", "style"), {"display": "flex"}, {"display": "none"})],
+        cancel=[Input("tabs", "active_tab")],
+        cache_args_to_ignore=[3]
+    )
+    def update_transaction_network(set_progress, version, rank_by, top_k, data):
+        if not data:
+            return go.Figure().update_layout(
+                title="No data available",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+        try:
+            with heavy_jobs.slot(on_wait=lambda: set_progress((0, "Waiting for a free worker"))):
+                set_progress((10, "Loading data"))
+                df = load_frame(version, data, ['user_name', 'merchant_category', 'transaction_amount', 'Meta_Prediction'])
+
+                if 'user_name' not in df.columns or 'merchant_category' not in df.columns:
+                    return go.Figure().update_layout(
+                        title="User and merchant data not available for network analysis",
                         template="plotly_dark",
                         plot_bgcolor='rgba(0,0,0,0)',
                         paper_bgcolor='rgba(0,0,0,0)'
                     )
-            else:
-                ts_fig = go.Figure().update_layout(
-                    title="Select a feature for time series analysis",
-                    template="plotly_dark",
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)'
-                )
+
+                set_progress((40, "Building network"))
+                return build_network_figure(df, top_k=top_k or NETWORK_DEFAULT_TOP_K, rank_by=rank_by or 'count')
+
+        except Exception as e:
+            print(f"Network visualization error: {str(e)}")
+            traceback.print_exc()
+            return go.Figure().update_layout(
+                title="Error in network visualization",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+    # Advanced Analytics Tab Callbacks
+    @dash_app.callback(
+        [Output("cluster-feature-1", "options"),
+         Output("cluster-feature-2", "options"),
+         Output("timeseries-feature", "options"),
+         Output("risk-scoring", "figure")],
+        [Input("dataset-version", "data")],
+        [State("session-data", "data")]
+    )
+    @memoize()
+    def update_advanced_analytics(version, data):
+        if not data:
+            empty_fig = go.Figure().update_layout(
+                title="No data available",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+            return [], [], [], empty_fig
+        
+        try:
+            # Get numeric features for dropdowns
+            numeric_features = [{'label': col, 'value': col} for col in numeric_columns(version, data)]
             
             # Create risk scoring visualization
             try:
-                # Calculate risk scores for each transaction
-                df_risk = df.copy()
-                
-                # Initialize risk score
-                df_risk['risk_score'] = 0
-                
-                # Add risk based on transaction amount (higher amount = higher risk)
-                if 'transaction_amount' in df_risk.columns:
-                    amount_percentile = df_risk['transaction_amount'].rank(pct=True)
-                    df_risk['risk_score'] += amount_percentile * 30  # Max 30 points for amount
-                
-                # Add risk based on transaction frequency (if available)
-                if 'transaction_frequency' in df_risk.columns:
-                    freq_percentile = df_risk['transaction_frequency'].rank(pct=True)
-                    df_risk['risk_score'] += freq_percentile * 20  # Max 20 points for frequency
-                
-                # Add risk based on time since last transaction (if available)
-                if 'time_since_last_txn_hrs' in df_risk.columns:
-                    # Lower time = higher risk (inverse ranking)
-                    time_percentile = (1 - df_risk['time_since_last_txn_hrs'].rank(pct=True))
-                    df_risk['risk_score'] += time_percentile * 15  # Max 15 points for time
-                
-                # Add risk based on foreign transactions (if available)
-                if 'is_foreign' in df_risk.columns:
-                    df_risk['risk_score'] += df_risk['is_foreign'] * 15  # Max 15 points for foreign
-                
-                # Add risk based on merchant category (if available)
-                if 'merchant_category' in df_risk.columns:
-                    # Calculate fraud rate by merchant category
-                    merchant_fraud_rate = df.groupby('merchant_category')['Meta_Prediction'].apply(
-                        lambda x: (x == 'Fraudulent').sum() / len(x) if len(x) > 0 else 0
-                    )
-                    
-                    # Map fraud rates to transactions
-                    df_risk['merchant_risk'] = df_risk['merchant_category'].map(merchant_fraud_rate)
-                    df_risk['risk_score'] += df_risk['merchant_risk'] * 100 * 20  # Max 20 points for merchant
+                if 'risk_score' in frame_schema(version, data).columns:
+                    df = load_frame(version, data, ['risk_score', 'Meta_Prediction'])
+                    # Scored once at ingest against sketches over all batches
+                    df_risk = df
+                else:
+                    # Older runs: score this file against its own distribution
+                    df = load_frame(version, data, [*RISK_WEIGHTS, 'Meta_Prediction'])
+                    scorer = RiskScorer()
+                    scorer.update(df)
+                    df_risk = df.assign(risk_score=scorer.score(df))
                 
                 # Create risk score distribution
                 risk_fig = px.histogram(
@@ -2073,7 +2271,7 @@ def create_dashboard(flask_app):
                     paper_bgcolor='rgba(0,0,0,0)'
                 )
             
-            return numeric_features, numeric_features, numeric_features, cluster_fig, ts_fig, risk_fig
+            return numeric_features, numeric_features, numeric_features, risk_fig
             
         except Exception as e:
             print(f"Advanced analytics error: {str(e)}")
@@ -2084,18 +2282,282 @@ def create_dashboard(flask_app):
                 plot_bgcolor='rgba(0,0,0,0)',
                 paper_bgcolor='rgba(0,0,0,0)'
             )
-            return [], [], [], empty_fig, empty_fig, empty_fig
+            return [], [], [], empty_fig
+
+    # Time series callback, answered from the rollups without touching row-level data
+    @dash_app.callback(
+        Output("timeseries-plot", "figure"),
+        [Input("dataset-version", "data"),
+         Input("run-id", "data"),
+         Input("timeseries-feature", "value"),
+         Input("timeseries-agg", "value"),
+         Input("timeseries-granularity", "value"),
+         Input("timeseries-range", "start_date"),
+         Input("timeseries-range", "end_date")],
+        [State("session-data", "data")]
+    )
+    @memoize()
+    def update_timeseries(version, run_id, ts_feature, ts_agg, granularity, start_date, end_date, data):
+        if not data or not ts_feature:
+            return go.Figure().update_layout(
+                title="Select a feature for time series analysis",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+        try:
+            rollups = get_rollups(version, data, run_id)
+            granularity = granularity if granularity in ROLLUP_GRANULARITIES else 'day'
+            if rollups is None or f"{ts_feature}__sum" not in rollups[granularity].columns:
+                return go.Figure().update_layout(
+                    title=f"No time series available for {ts_feature}",
+                    template="plotly_dark",
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)'
+                )
+
+            ts_agg = ts_agg or 'sum'
+            ts_data = query_rollups(rollups, granularity, ts_feature, ts_agg, start_date, end_date).rename(
+                columns={'bucket': 'date', 'value': ts_feature}
+            )
+            
+            # Create time series plot
+            ts_fig = px.line(
+                ts_data,
+                x='date',
+                y=ts_feature,
+                color='Meta_Prediction',
+                title=f"Time Series Analysis: {ts_feature} ({ts_agg} per {granularity})",
+                labels={
+                    'date': 'Date',
+                    ts_feature: f'{ts_feature} ({ts_agg})',
+                    'Meta_Prediction': 'Transaction Type'
+                },
+                color_discrete_map={'Fraudulent': '#e74c3c', 'Non-Fraudulent': '#2ecc71'}
+            )
+            
+            ts_fig.update_layout(
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
+                yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)')
+            )
+            return ts_fig
+
+        except Exception as e:
+            print(f"Time series analysis error: {str(e)}")
+            return go.Figure().update_layout(
+                title="Error in time series analysis",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+    # Cluster analysis callback, run as a background job
+    @heavy_jobs.callback(
+        dash_app,
+        Output("cluster-plot", "figure"),
+        [Input("dataset-version", "data"),
+         Input("cluster-feature-1", "value"),
+         Input("cluster-feature-2", "value"),
+         Input("cluster-epsilon", "value")],
+        [State("session-data", "data")],
+        progress=[Output("cluster-progress", "value"), Output("cluster-progress", "label")],
+        running=[(Output("cluster-progress", "style"), {"display": "flex"}, {"display": "none"})],
+        cancel=[Input("tabs", "active_tab")],
+        cache_args_to_ignore=[4]
+    )
+    def update_cluster_analysis(set_progress, version, cluster_f1, cluster_f2, epsilon, data):
+        if not data:
+            return go.Figure().update_layout(
+                title="No data available",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+        if not (cluster_f1 and cluster_f2):
+            return go.Figure().update_layout(
+                title="Select features for cluster analysis",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+        try:
+            with heavy_jobs.slot(on_wait=lambda: set_progress((0, "Waiting for a free worker"))):
+                set_progress((10, "Loading data"))
+                df = load_frame(version, data, [cluster_f1, cluster_f2, 'Meta_Prediction'])
+
+                # Labels are memoised per dataset, feature pair and eps
+                set_progress((30, "Clustering"))
+                labels = cluster_labels(df, [cluster_f1, cluster_f2], epsilon, version or dataset_fingerprint(data))
+
+            set_progress((80, "Plotting"))
+            
+            # Add cluster labels to dataframe
+            df_cluster = df.copy()
+            df_cluster['cluster'] = labels
+            
+            # Create cluster plot
+            cluster_fig = px.scatter(
+                df_cluster,
+                x=cluster_f1,
+                y=cluster_f2,
+                color='cluster',
+                color_continuous_scale='Viridis',
+                title=f"Cluster Analysis: {cluster_f1} vs {cluster_f2}",
+                labels={
+                    cluster_f1: cluster_f1,
+                    cluster_f2: cluster_f2,
+                    'cluster': 'Cluster'
+                },
+                hover_data=['Meta_Prediction']
+            )
+            
+            # Highlight anomalies (cluster = -1)
+            anomalies = df_cluster[df_cluster['cluster'] == -1]
+            if not anomalies.empty:
+                cluster_fig.add_trace(
+                    go.Scatter(
+                        x=anomalies[cluster_f1],
+                        y=anomalies[cluster_f2],
+                        mode='markers',
+                        marker=dict(
+                            color='red',
+                            size=12,
+                            line=dict(width=2, color='black')
+                        ),
+                        name='Anomalies'
+                    )
+                )
+            
+            cluster_fig.update_layout(
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
+                yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)')
+            )
+            return cluster_fig
+
+        except Exception as e:
+            print(f"Cluster analysis error: {str(e)}")
+            return go.Figure().update_layout(
+                title="Error in cluster analysis",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+
+    # Run comparison callback: reads three columns of each run
+    @dash_app.callback(
+        [Output("compare-metrics", "children"),
+         Output("compare-merchant", "figure"),
+         Output("compare-amount", "figure")],
+        [Input("compare-run-a", "value"),
+         Input("compare-run-b", "value")]
+    )
+    @memoize()
+    def update_run_comparison(run_a, run_b):
+        runs = [run_id for run_id in dict.fromkeys([run_a, run_b]) if run_id]
+        if len(runs) < 2:
+            empty_fig = go.Figure().update_layout(
+                title="Select two different runs to compare",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+            return "Select two different runs to compare", empty_fig, empty_fig
+
+        try:
+            columns = ['merchant_category', 'transaction_amount', 'Meta_Prediction']
+            frames = {}
+            for run_id in runs:
+                version = run_version(run_id, PROCESSED_FOLDER)
+                frames[run_id] = load_frame(version, {'run_id': run_id}, columns)
+
+            # Key metrics table
+            rows = []
+            metrics = {}
+            for run_id, df in frames.items():
+                total = len(df)
+                fraud = int(df['Meta_Prediction'].eq('Fraudulent').sum())
+                metrics[run_id] = {
+                    "Transactions": f"{total:,}",
+                    "Fraudulent": f"{fraud:,}",
+                    "Fraud Rate": f"{fraud / total * 100:.2f}%" if total else "0.00%",
+                    "Total Amount": f"${df['transaction_amount'].sum():,.2f}",
+                    "Average Amount": f"${df['transaction_amount'].mean():,.2f}" if total else "$0.00",
+                }
+            for name in metrics[runs[0]]:
+                rows.append(html.Tr([html.Td(name)] + [html.Td(metrics[run_id][name]) for run_id in runs]))
+            metrics_table = dbc.Table(
+                [html.Thead(html.Tr([html.Th("Metric")] + [html.Th(run_id) for run_id in runs])),
+                 html.Tbody(rows)],
+                bordered=True, color="dark", hover=True, size="sm"
+            )
+
+            # Fraud rate per merchant category, one bar group per run
+            merchant_fig = go.Figure()
+            for run_id, df in frames.items():
+                if 'merchant_category' not in df.columns:
+                    continue
+                rates = df['Meta_Prediction'].eq('Fraudulent').groupby(df['merchant_category']).mean() * 100
+                merchant_fig.add_trace(go.Bar(x=rates.index.astype(str), y=rates.values, name=run_id))
+            merchant_fig.update_layout(
+                barmode='group',
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                xaxis_title="Merchant Category",
+                yaxis_title="Fraud Rate (%)"
+            )
+
+            # Amount histograms share bins and are binned server-side, so
+            # multi-million-row runs only send the bar heights to the browser
+            amounts = {run_id: df['transaction_amount'].dropna().to_numpy() for run_id, df in frames.items()}
+            combined = np.concatenate(list(amounts.values()))
+            bins = np.histogram_bin_edges(combined, bins=50) if len(combined) else np.linspace(0, 1, 51)
+            amount_fig = go.Figure()
+            for run_id, values in amounts.items():
+                counts, _ = np.histogram(values, bins=bins)
+                share = counts / counts.sum() * 100 if counts.sum() else counts
+                amount_fig.add_trace(go.Bar(x=(bins[:-1] + bins[1:]) / 2, y=share, name=run_id, opacity=0.6))
+            amount_fig.update_layout(
+                barmode='overlay',
+                bargap=0,
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                xaxis_title="Transaction Amount ($)",
+                yaxis_title="Percentage (%)"
+            )
+
+            return metrics_table, merchant_fig, amount_fig
+
+        except Exception as e:
+            print(f"Run comparison error: {str(e)}")
+            traceback.print_exc()
+            empty_fig = go.Figure().update_layout(
+                title="Error comparing runs",
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+            return "Error comparing runs", empty_fig, empty_fig
 
     # Export modal callback
     @dash_app.callback(
         Output("export-modal", "is_open"),
         [Input("export-button", "n_clicks"),
          Input("close-modal", "n_clicks")],
-        [State("export-modal", "is_open"),
-         State("analysis-results", "data")],
+        [State("export-modal", "is_open")],
         prevent_initial_call=True
     )
-    def toggle_export_modal(export_clicks, close_clicks, is_open, analysis_results):
+    def toggle_export_modal(export_clicks, close_clicks, is_open):
         ctx = callback_context
         if not ctx.triggered:
             return is_open
@@ -2103,23 +2565,138 @@ def create_dashboard(flask_app):
         button_id = ctx.triggered[0]["prop_id"].split(".")[0]
         
         if button_id == "export-button" and export_clicks:
-            # Here you would implement the actual export functionality
-            # For example, saving the analysis results to a file
-            if analysis_results:
-                try:
-                    # This is a placeholder for actual export functionality
-                    # In a real app, you might save to a file or database
-                    print("[EXPORT] Analysis results exported successfully")
-                    return True
-                except Exception as e:
-                    print(f"[EXPORT ERROR] {str(e)}")
-                    return False
-        
+            return True
         elif button_id == "close-modal" and close_clicks:
             return False
         
         return is_open
 
+    # Every dashboard figure at its default control values, built by the callbacks themselves
+    def collect_export_figures(version, run_id, data, numeric_features, on_step=None):
+        secondary = next((col for col in ['transaction_frequency', 'time_since_last_txn_hrs'] if col in numeric_features),
+                         numeric_features[0] if numeric_features else 'transaction_amount')
+        steps = [
+            (["transaction_types", "transaction_locations", "amount_distribution"],
+             lambda: update_overview_visuals(version, data)),
+            (["velocity_analysis"], lambda: [update_velocity_analysis(no_progress, version, data)]),
+            ([None, "fraud_distribution", "card_type_analysis", None], lambda: update_detailed_analysis(version, data)),
+            (["feature_analysis"], lambda: [update_feature_analysis(version, 'transaction_amount', data)]),
+            (["technical_analysis"], lambda: [update_technical_visuals(version, secondary, data)]),
+            (["box_plot"], lambda: [update_box_plot(version, 'transaction_amount', data)]),
+            (["correlation_heatmap"], lambda: [update_correlation_heatmap(version, run_id, 'run', data)]),
+            ([None, "user_behavior"], lambda: update_pattern_detection(version, data)),
+            (["temporal_pattern"], lambda: [update_temporal_pattern(version, run_id, data)]),
+            (["anomaly_detection"], lambda: [update_anomaly_detection(version, secondary, data)]),
+            (["transaction_network"],
+             lambda: [update_transaction_network(no_progress, version, 'count', NETWORK_DEFAULT_TOP_K, data)]),
+            ([None, None, None, "risk_scoring"], lambda: update_advanced_analytics(version, data)),
+            (["time_series"],
+             lambda: [update_timeseries(version, run_id, 'transaction_amount', 'sum', 'day', None, None, data)]),
+            (["cluster_analysis"],
+             lambda: [update_cluster_analysis(no_progress, version, 'transaction_amount', secondary, 0.5, data)]),
+        ]
+        figures = {}
+        for step, (names, build) in enumerate(steps, start=1):
+            try:
+                for name, fig in zip(names, build()):
+                    if name and isinstance(fig, go.Figure):
+                        figures[name] = fig
+            except Exception as e:
+                print(f"[EXPORT WARNING] Could not build {names}: {str(e)}")
+            if on_step:
+                on_step(step, len(steps))
+        return figures
+
+    # Aggregated tables written next to the figures, and the columns they read
+    EXPORT_BREAKDOWNS = ['merchant_category', 'location', 'credit_card_type', 'transaction_type', 'bank']
+    EXPORT_TABLE_COLUMNS = ['Meta_Prediction', 'transaction_amount', *EXPORT_BREAKDOWNS]
+
+    def export_tables(df, version, run_id, data, analysis_results):
+        tables = {}
+        is_fraud = df['Meta_Prediction'].eq('Fraudulent')
+        for col in EXPORT_BREAKDOWNS:
+            if col in df.columns:
+                table = df.assign(is_fraud=is_fraud).groupby(col).agg(
+                    transactions=('is_fraud', 'size'),
+                    fraudulent=('is_fraud', 'sum'),
+                    total_amount=('transaction_amount', 'sum')
+                )
+                table['fraud_rate'] = table['fraudulent'] / table['transactions'] * 100
+                tables[f"fraud_by_{col}"] = table.sort_values('fraud_rate', ascending=False)
+        if analysis_results.get('high_risk_users'):
+            tables['high_risk_users'] = pd.DataFrame.from_dict(analysis_results['high_risk_users'], orient='index')
+        rollups = get_rollups(version, data, run_id)
+        if rollups is not None:
+            daily = query_rollups(rollups, 'day', None)
+            tables['daily_transactions'] = daily.pivot_table(
+                index='bucket', columns='Meta_Prediction', values='value', aggfunc='sum', fill_value=0
+            )
+        return tables
+
+    # Export job: collects figures, renders them in worker processes and zips everything
+    @heavy_jobs.callback(
+        dash_app,
+        Output("export-status", "children"),
+        [Input("export-button", "n_clicks")],
+        [State("dataset-version", "data"),
+         State("run-id", "data"),
+         State("analysis-results", "data"),
+         State("session-data", "data")],
+        progress=[Output("export-progress", "value"), Output("export-progress", "label")],
+        running=[(Output("export-button", "disabled"), True, False),
+                 (Output("export-progress", "style"), {"display": "flex"}, {"display": "none"})],
+        cache_args_to_ignore=[3, 4],
+        prevent_initial_call=True
+    )
+    def run_export(set_progress, n_clicks, version, run_id, analysis_results, data):
+        if not n_clicks or not data:
+            return "No data loaded to export"
+
+        try:
+            print(f"[EXPORT] Starting export for run {run_id}")
+            set_progress((0, "Building figures"))
+            numeric_features = numeric_columns(version, data, exclude=['Meta_Prediction'])
+            figures = collect_export_figures(
+                version, run_id, data, numeric_features,
+                on_step=lambda done, total: set_progress((int(done / total * 40), f"Built {done}/{total} figure groups"))
+            )
+            results = json.loads(analysis_results) if analysis_results else {}
+            df = load_frame(version, data, EXPORT_TABLE_COLUMNS)
+            tables = export_tables(df, version, run_id, data, results)
+
+            filename = f"fraud_analysis_{run_id or 'sample'}_{datetime.datetime.now():%Y%m%d_%H%M%S}.zip"
+            build_export(
+                os.path.join(EXPORT_FOLDER, filename),
+                figures,
+                tables,
+                results,
+                manifest=read_manifest(run_id, PROCESSED_FOLDER) if run_id else None,
+                title=f"Fraud Analysis Report: {run_id or 'sample data'}",
+                on_progress=lambda done, total: set_progress(
+                    (40 + int(done / total * 55), f"Rendered {done}/{total} figures")
+                )
+            )
+            set_progress((100, "Done"))
+            print(f"[EXPORT] Wrote {filename}")
+            return html.A([
+                html.I(className="fas fa-file-archive me-2"),
+                f"Download {filename}"
+            ], href=f"/download_export/{filename}", className="btn btn-success")
+
+        except Exception as e:
+            print(f"[EXPORT ERROR] {str(e)}")
+            traceback.print_exc()
+            return f"Export failed: {str(e)}"
+
+    @flask_app.route("/download_export/<filename>")
+    def download_export(filename):
+        """Serve a finished export archive"""
+        safe_filename = secure_filename(filename)
+        if not safe_filename.endswith('.zip') or not os.path.exists(os.path.join(EXPORT_FOLDER, safe_filename)):
+            abort(404)
+        print(f"[DOWNLOAD] Export: {safe_filename}")
+        return send_from_directory(EXPORT_FOLDER, safe_filename, as_attachment=True, mimetype='application/zip')
+
     # Return the Dash app
     return dash_app
 
@@ -0,0 +1,204 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from anomaly_detector import anomaly_threshold
+
+# Categorical columns broken down by fraud rate
+DIMENSIONS = ["merchant_category", "location", "bank", "credit_card_type", "transaction_type", "is_foreign"]
+# Numeric columns summarised by quantiles per prediction class
+QUANTILE_FEATURES = [
+    "transaction_amount", "transaction_frequency", "time_since_last_txn_hrs",
+    "anomaly_score", "risk_score", "velocity_score", "amount_zscore",
+]
+QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+TOP_N = 10
+MAX_DAYS = 60
+
+
+def _round(value, digits=2):
+    return None if value is None or pd.isna(value) else round(float(value), digits)
+
+
+def _dimension_table(df, column, is_fraud, amount):
+    # Grouping on the column as stored keeps categoricals on their integer codes
+    grouped = pd.DataFrame({"key": df[column].array, "fraud": is_fraud, "amount": amount}).groupby(
+        "key", sort=False, observed=True
+    )
+    table = grouped.agg(transactions=("fraud", "size"), fraudulent=("fraud", "sum"), amount=("amount", "sum"))
+    table["fraud_rate"] = table["fraudulent"] / table["transactions"] * 100
+    ranked = table.sort_values(["fraudulent", "fraud_rate"], ascending=False)
+    return {
+        "distinct": int(len(table)),
+        "top": [
+            {column: str(key), "transactions": int(row.transactions), "fraudulent": int(row.fraudulent),
+             "fraud_rate": _round(row.fraud_rate), "amount": _round(row.amount)}
+            for key, row in ranked.head(TOP_N).iterrows()
+        ],
+    }
+
+
+def build_digest(df, run_id=None, rollups=None, class_col="Meta_Prediction"):
+    """Compact statistical summary of a processed run for the assistant.
+
+    Everything the assistant needs to answer questions about a run (fraud
+    tables per dimension, quantiles, the riskiest users and time patterns)
+    in a few kilobytes, computed once when the run is scored. `rollups` are
+    the run's time rollups; daily totals are read from them when given.
+    """
+    is_fraud = (df[class_col].astype(str) == "Fraudulent").to_numpy() if class_col in df.columns \
+        else np.zeros(len(df), dtype=bool)
+    amount = pd.to_numeric(df["transaction_amount"], errors="coerce") if "transaction_amount" in df.columns \
+        else pd.Series(0.0, index=df.index)
+    when = pd.to_datetime(df["datetime"], errors="coerce") if "datetime" in df.columns else None
+
+    digest = {
+        "run_id": run_id,
+        "overview": {
+            "transactions": int(len(df)),
+            "fraudulent": int(is_fraud.sum()),
+            "fraud_rate": _round(is_fraud.mean() * 100 if len(df) else 0),
+            "total_amount": _round(amount.sum()),
+            "fraud_amount": _round(amount[is_fraud].sum()),
+            "mean_amount": _round(amount.mean()),
+            "unique_users": int(df["user_name"].nunique()) if "user_name" in df.columns else None,
+            "first_transaction": str(when.min()) if when is not None and when.notna().any() else None,
+            "last_transaction": str(when.max()) if when is not None and when.notna().any() else None,
+        },
+        "columns": df.columns.tolist(),
+    }
+
+    quantiles = {}
+    for feature in QUANTILE_FEATURES:
+        if feature not in df.columns:
+            continue
+        values = pd.to_numeric(df[feature], errors="coerce").to_numpy(dtype="float64")
+        quantiles[feature] = {}
+        for label, mask in (("Fraudulent", is_fraud), ("Non-Fraudulent", ~is_fraud)):
+            selected = values[mask]
+            selected = selected[~np.isnan(selected)]
+            if len(selected):
+                points = np.quantile(selected, QUANTILES)
+                quantiles[feature][label] = {f"p{int(q * 100)}": _round(v, 3) for q, v in zip(QUANTILES, points)}
+    digest["quantiles"] = quantiles
+
+    digest["dimensions"] = {
+        column: _dimension_table(df, column, is_fraud, amount) for column in DIMENSIONS if column in df.columns
+    }
+
+    if "user_name" in df.columns:
+        users = pd.DataFrame({"user": df["user_name"].array, "fraud": is_fraud, "amount": amount})
+        aggregations = {"transactions": ("fraud", "size"), "fraudulent": ("fraud", "sum"), "amount": ("amount", "sum")}
+        if "risk_score" in df.columns:
+            users["risk"] = pd.to_numeric(df["risk_score"], errors="coerce")
+            aggregations["max_risk_score"] = ("risk", "max")
+        if "rapid_succession" in df.columns:
+            users["rapid"] = df["rapid_succession"].astype(float)
+            aggregations["rapid_transactions"] = ("rapid", "sum")
+        table = users.groupby("user", sort=False, observed=True).agg(**aggregations)
+        order = ["fraudulent", "max_risk_score"] if "max_risk_score" in table.columns else ["fraudulent", "amount"]
+        digest["risky_users"] = [
+            {"user_name": str(user), **{key: _round(value) for key, value in row.items()}}
+            for user, row in table.sort_values(order, ascending=False).head(TOP_N).iterrows()
+        ]
+
+    if when is not None and when.notna().any():
+        hours = pd.DataFrame({"hour": when.dt.hour, "fraud": is_fraud}).groupby("hour").agg(
+            transactions=("fraud", "size"), fraudulent=("fraud", "sum")
+        )
+        digest["by_hour"] = {int(hour): [int(row.transactions), int(row.fraudulent)] for hour, row in hours.iterrows()}
+
+        if rollups is not None and "day" in rollups:
+            days = rollups["day"].assign(fraud=lambda t: np.where(t[class_col] == "Fraudulent", t["rows"], 0)) \
+                if class_col in rollups["day"].columns else rollups["day"].assign(fraud=0)
+            daily = days.groupby("bucket").agg(transactions=("rows", "sum"), fraudulent=("fraud", "sum"))
+        else:
+            daily = pd.DataFrame({"day": when.dt.floor("D"), "fraud": is_fraud}).groupby("day").agg(
+                transactions=("fraud", "size"), fraudulent=("fraud", "sum")
+            )
+        digest["by_day"] = {
+            str(day.date()): [int(row.transactions), int(row.fraudulent)] for day, row in daily.tail(MAX_DAYS).iterrows()
+        }
+
+    signals = {}
+    if "anomaly_score" in df.columns:
+        scores = pd.to_numeric(df["anomaly_score"], errors="coerce")
+        threshold = anomaly_threshold(scores)
+        signals["anomaly_threshold"] = round(threshold, 3)
+        signals["anomalies_above_threshold"] = int((scores > threshold).sum())
+    if "rapid_succession" in df.columns:
+        signals["rapid_succession"] = int(df["rapid_succession"].astype(bool).sum())
+    if "unusual_amount" in df.columns:
+        signals["unusual_amount"] = int(df["unusual_amount"].astype(bool).sum())
+    predictions = [col for col in ("TF_Prediction", "XGB_Prediction", "Meta_Prediction") if col in df.columns]
+    if len(predictions) > 1:
+        first = df[predictions[0]].to_numpy()
+        agree = np.logical_and.reduce([df[col].to_numpy() == first for col in predictions[1:]])
+        signals["model_agreement_rate"] = _round(agree.mean() * 100)
+        signals["fraud_by_model"] = {col: int((df[col] == "Fraudulent").sum()) for col in predictions}
+    digest["signals"] = signals
+    return digest
+
+
+def _table(rows):
+    if not rows:
+        return ""
+    headers = list(rows[0])
+    lines = ["| " + " | ".join(headers) + " |", "|" + "---|" * len(headers)]
+    lines += ["| " + " | ".join("" if row[h] is None else str(row[h]) for h in headers) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def digest_markdown(digest):
+    """Render a digest as compact Markdown for the assistant to read"""
+    overview = digest["overview"]
+    parts = [
+        f"# Fraud data digest{' for run ' + digest['run_id'] if digest.get('run_id') else ''}",
+        "Summary statistics of a scored transaction dataset. Predictions come from the fraud models "
+        "(Meta_Prediction is the final label).",
+        "## Overview",
+        "\n".join(f"- {key.replace('_', ' ')}: {value}" for key, value in overview.items()),
+    ]
+    if digest.get("signals"):
+        parts += ["## Signals", "\n".join(f"- {key.replace('_', ' ')}: {value}" for key, value in digest["signals"].items())]
+    for column, table in digest.get("dimensions", {}).items():
+        parts += [f"## Fraud by {column} ({table['distinct']} distinct, top {len(table['top'])})", _table(table["top"])]
+    for feature, classes in digest.get("quantiles", {}).items():
+        parts += [f"## {feature} quantiles", _table([{"class": label, **values} for label, values in classes.items()])]
+    if digest.get("risky_users"):
+        parts += ["## Riskiest users", _table(digest["risky_users"])]
+    if digest.get("by_hour"):
+        parts += ["## Transactions by hour of day (hour: total/fraudulent)",
+                  ", ".join(f"{hour}: {total}/{fraud}" for hour, (total, fraud) in digest["by_hour"].items())]
+    if digest.get("by_day"):
+        parts += ["## Transactions by day (day: total/fraudulent)",
+                  ", ".join(f"{day}: {total}/{fraud}" for day, (total, fraud) in digest["by_day"].items())]
+    return "\n\n".join(parts) + "\n"
+
+
+def digest_paths(folder, run_id):
+    return {
+        "json": os.path.join(folder, f"{run_id}_digest.json"),
+        "markdown": os.path.join(folder, f"{run_id}_digest.md"),
+    }
+
+
+def save_digest(digest, run_id, folder):
+    """Write a run's digest as JSON and as the Markdown the assistant receives"""
+    paths = digest_paths(folder, run_id)
+    for key, content in (("json", json.dumps(digest, indent=2, default=str)), ("markdown", digest_markdown(digest))):
+        tmp_path = f"{paths[key]}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, paths[key])
+    return paths
+
+
+def load_digest(run_id, folder):
+    path = digest_paths(folder, run_id)["json"]
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
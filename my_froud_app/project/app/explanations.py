@@ -0,0 +1,214 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+from scipy import sparse
+
+EXPLANATIONS_SUFFIX = "_explanations.arrow"
+# Features named in the short reason attached to each flagged row
+TOP_REASONS = 3
+# Rows per gradient batch for the neural network
+GRADIENT_BATCH = 4096
+
+
+def explanation_path(folder, run_id):
+    return os.path.join(folder, f"{run_id}{EXPLANATIONS_SUFFIX}")
+
+
+def _dense(X):
+    return X.toarray() if sparse.issparse(X) else np.asarray(X)
+
+
+def feature_groups(column_transformer, n_features):
+    """Input column behind each transformed column, so one-hot contributions add up per feature"""
+    try:
+        groups = [None] * n_features
+        for name, transformer, columns in column_transformer.transformers_:
+            if name == "remainder" or transformer == "drop" or name not in column_transformer.output_indices_:
+                continue
+            span = column_transformer.output_indices_[name]
+            columns = list(columns) if not isinstance(columns, str) else [columns]
+            if span.stop - span.start == len(columns):
+                outputs = columns
+            else:
+                # Encoded columns are named "<column>_<category>"; longest match wins
+                names = transformer.get_feature_names_out(columns)
+                by_length = sorted(columns, key=len, reverse=True)
+                outputs = [next((c for c in by_length if str(out).startswith(f"{c}_")), str(out)) for out in names]
+            groups[span.start:span.stop] = outputs
+        if None not in groups:
+            return groups
+    except Exception as e:
+        print(f"[EXPLAIN] Could not map transformed features to columns: {str(e)}")
+    try:
+        return [str(name).split("__", 1)[-1] for name in column_transformer.get_feature_names_out()]
+    except Exception:
+        return [f"feature_{i}" for i in range(n_features)]
+
+
+def xgb_contributions(model, X):
+    """Exact TreeSHAP contributions in log-odds, from the booster itself"""
+    import xgboost
+
+    contributions = model.get_booster().predict(xgboost.DMatrix(X), pred_contribs=True)
+    return contributions[:, :-1]  # last column is the bias
+
+
+class ForestContributions:
+    """Per-feature contributions of a tree ensemble to the fraud probability.
+
+    Walking each row's decision path, every split moves the predicted
+    probability from the parent node's value to the child's; that change is
+    credited to the split feature. The moves are precomputed once as a
+    sparse (nodes x features) matrix, so a batch is one decision_path call
+    and one sparse product.
+    """
+
+    def __init__(self, model, n_features):
+        self.model = model
+        classes = list(getattr(model, "classes_", [0, 1]))
+        positive = classes.index(1) if 1 in classes else len(classes) - 1
+        blocks, bias = [], 0.0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            value = tree.value[:, 0, :]
+            value = value / value.sum(axis=1, keepdims=True)
+            probability = value[:, positive]
+            parent = np.full(tree.node_count, -1)
+            internal = np.flatnonzero(tree.children_left >= 0)
+            parent[tree.children_left[internal]] = internal
+            parent[tree.children_right[internal]] = internal
+            child = np.flatnonzero(parent >= 0)
+            blocks.append(sparse.csr_matrix(
+                (probability[child] - probability[parent[child]], (child, tree.feature[parent[child]])),
+                shape=(tree.node_count, n_features),
+            ))
+            bias += probability[0]
+        self.moves = sparse.vstack(blocks).tocsr() / len(model.estimators_)
+        self.bias = bias / len(model.estimators_)
+
+    def __call__(self, X):
+        indicator, _ = self.model.decision_path(X)
+        return np.asarray((indicator @ self.moves).todense())
+
+
+def gradient_contributions(model, X):
+    """Gradient x input of the network's fraud probability, in batches"""
+    import tensorflow as tf
+
+    X = _dense(X).astype("float32")
+    out = np.empty_like(X)
+    for start in range(0, len(X), GRADIENT_BATCH):
+        batch = tf.convert_to_tensor(X[start:start + GRADIENT_BATCH])
+        with tf.GradientTape() as tape:
+            tape.watch(batch)
+            probability = model(batch, training=False)
+        out[start:start + GRADIENT_BATCH] = (tape.gradient(probability, batch) * batch).numpy()
+    return out
+
+
+class FraudExplainer:
+    """Local, batched explanations for flagged transactions.
+
+    Computes per-feature contributions for each model on the transformed
+    matrix the models just scored (tree contributions for XGBoost and the
+    forest, gradient x input for the network), summed back to the input
+    columns. Only flagged rows are explained.
+    """
+
+    def __init__(self, models, column_transformer, reason_model="Meta"):
+        self.models = models
+        self.column_transformer = column_transformer
+        self.reason_model = reason_model
+        self._groups = None
+        self._forests = {}
+
+    def _group_matrix(self, n_features):
+        if self._groups is None:
+            names = feature_groups(self.column_transformer, n_features)
+            self.features = list(dict.fromkeys(names))
+            index = {name: i for i, name in enumerate(self.features)}
+            self._groups = sparse.csr_matrix(
+                (np.ones(n_features), (np.arange(n_features), [index[name] for name in names])),
+                shape=(n_features, len(self.features)),
+            )
+        return self._groups
+
+    def contributions(self, name, model, X):
+        if hasattr(model, "get_booster"):
+            return xgb_contributions(model, X)
+        if hasattr(model, "estimators_") and hasattr(model, "decision_path"):
+            if name not in self._forests:
+                self._forests[name] = ForestContributions(model, X.shape[1])
+            return self._forests[name](X)
+        if hasattr(model, "coef_"):
+            return _dense(X) * np.asarray(model.coef_).reshape(1, -1)
+        if callable(model):
+            return gradient_contributions(model, X)
+        raise TypeError(f"No attribution method for {type(model).__name__}")
+
+    def explain(self, X, flagged, offset=0):
+        """Contributions for the flagged rows of one scored batch.
+
+        Returns a frame of row, model and one column per input feature, and
+        a short reason string per row of the batch, empty for rows nobody
+        flagged.
+        """
+        flagged = np.asarray(flagged, dtype=bool)
+        reasons = np.full(len(flagged), "", dtype=object)
+        rows = np.flatnonzero(flagged)
+        if not len(rows):
+            return None, reasons
+        X = X[rows] if sparse.issparse(X) else np.asarray(X)[rows]
+        groups = self._group_matrix(X.shape[1])
+        frames = {}
+        for name, model in self.models.items():
+            try:
+                grouped = np.asarray(self.contributions(name, model, X) @ groups)
+            except Exception as e:
+                print(f"[EXPLAIN] {name} attributions failed: {str(e)}")
+                continue
+            frame = pd.DataFrame(grouped.astype("float32"), columns=self.features)
+            frame.insert(0, "model", name)
+            frame.insert(0, "row", rows + offset)
+            frames[name] = frame
+
+        if not frames:
+            return None, reasons
+        source = frames[self.reason_model] if self.reason_model in frames else next(iter(frames.values()))
+        values = source[self.features].to_numpy()
+        top = np.argsort(-values, axis=1)[:, :TOP_REASONS]
+        reasons[rows] = [
+            "; ".join(f"{self.features[j]} {values[i, j]:+.3f}" for j in top[i] if values[i, j] > 0)
+            for i in range(len(rows))
+        ]
+        return pd.concat(frames.values(), ignore_index=True), reasons
+
+
+def save_explanations(frames, run_id, folder):
+    """Store a run's explanations next to its predictions as an Arrow file"""
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        return None
+    df = pd.concat(frames, ignore_index=True)
+    df["model"] = df["model"].astype("category")
+    path = explanation_path(folder, run_id)
+    tmp_path = f"{path}.tmp"
+    feather.write_feather(df, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_explanations(run_id, folder, columns=None):
+    path = explanation_path(folder, run_id)
+    if not os.path.exists(path):
+        return None
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def summarize_explanations(df):
+    """Mean positive contribution of each feature per model across the explained rows"""
+    features = [col for col in df.columns if col not in ("row", "model")]
+    summary = df[features].clip(lower=0).groupby(df["model"], observed=True).mean()
+    return summary.reset_index().melt(id_vars="model", var_name="feature", value_name="contribution")
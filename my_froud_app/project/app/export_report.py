@@ -0,0 +1,94 @@
+import html
+import json
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+try:
+    import kaleido  # noqa: F401
+except ImportError:
+    kaleido = None
+
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+def render_figure(name, fig_json, png=False):
+    """Render one figure to an HTML fragment (and a PNG when kaleido is installed).
+
+    Runs in a worker process, so it takes and returns plain data.
+    """
+    fig = pio.from_json(fig_json)
+    fragment = pio.to_html(fig, full_html=False, include_plotlyjs=False, div_id=f"fig-{name}")
+    image = pio.to_image(fig, format="png", width=1200, height=700) if png else None
+    return name, fragment, image
+
+
+def _report_html(title, analysis_results, tables, fragments):
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>",
+        f"<title>{html.escape(title)}</title>",
+        "<style>body{background:#121212;color:#f8f9fa;font-family:'Segoe UI',Tahoma,sans-serif;margin:2rem}"
+        "table{border-collapse:collapse;margin-bottom:1.5rem}td,th{border:1px solid #444;padding:4px 8px}"
+        "h2{margin-top:2rem}</style>",
+        # plotly.js is embedded once so the report opens offline
+        f"<script type='text/javascript'>{get_plotlyjs()}</script>",
+        "</head><body>",
+        f"<h1>{html.escape(title)}</h1>",
+        f"<p>Generated {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>",
+        "<h2>Summary</h2>",
+        "<ul>",
+    ]
+    for key in ("total_transactions", "fraudulent_transactions", "fraud_percentage", "avg_transaction_amount"):
+        if key in analysis_results:
+            parts.append(f"<li>{html.escape(key.replace('_', ' ').title())}: {analysis_results[key]:,.2f}</li>")
+    parts.append("</ul>")
+    for alert in analysis_results.get("alerts", []):
+        parts.append(f"<p>[{html.escape(alert['severity'].upper())}] {html.escape(alert['message'])}</p>")
+    for name, table in tables.items():
+        parts.append(f"<h2>{html.escape(name.replace('_', ' ').title())}</h2>")
+        parts.append(table.to_html(float_format=lambda v: f"{v:,.2f}"))
+    for name, fragment in fragments:
+        parts.append(f"<h2>{html.escape(name.replace('_', ' ').title())}</h2>")
+        parts.append(fragment)
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def build_export(archive_path, figures, tables, analysis_results, manifest=None, title="Fraud Analysis Report",
+                 on_progress=None, workers=EXPORT_WORKERS):
+    """Write results, tables and rendered figures into a zip archive.
+
+    figures maps names to plotly figures, which are rendered in parallel
+    worker processes; on_progress(done, total) is called as each finishes.
+    """
+    png = kaleido is not None
+    rendered = {}
+    total = len(figures)
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, total or 1))) as pool:
+        futures = [pool.submit(render_figure, name, fig.to_json(), png) for name, fig in figures.items()]
+        for done, future in enumerate(as_completed(futures), start=1):
+            name, fragment, image = future.result()
+            rendered[name] = (fragment, image)
+            if on_progress:
+                on_progress(done, total)
+
+    # Keep the dashboard's figure order in the report
+    fragments = [(name, rendered[name][0]) for name in figures]
+
+    tmp_path = f"{archive_path}.tmp"
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("analysis_results.json", json.dumps(analysis_results, indent=2, default=str))
+        if manifest:
+            archive.writestr("manifest.json", json.dumps(manifest, indent=2, default=str))
+        for name, table in tables.items():
+            archive.writestr(f"tables/{name}.csv", table.to_csv())
+        for name, (fragment, image) in rendered.items():
+            if image is not None:
+                archive.writestr(f"figures/{name}.png", image)
+        archive.writestr("report.html", _report_html(title, analysis_results, tables, fragments))
+    os.replace(tmp_path, archive_path)
+    return archive_path
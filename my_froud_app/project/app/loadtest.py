@@ -0,0 +1,432 @@
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from urllib.parse import urlparse
+
+import numpy as np
+import requests
+
+from benchmark import DASHBOARD_VALUES, _callback_body, environment
+from synthetic_data import TransactionGenerator
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OPERATIONS = ["predict", "dashboard", "download"]
+DEFAULT_MIX = "predict=1,dashboard=8,download=1"
+# Seconds a single request may take before it counts as an error
+REQUEST_TIMEOUT_SECONDS = 600
+RSS_SAMPLE_SECONDS = 1.0
+DOWNLOAD_LINK = re.compile(r"/download_results/([^\"'\s?]+\.csv)")
+LOAD_CALLBACK_OUTPUT = "session-data.data"
+RUNS_CALLBACK_OUTPUT = "run-selector.options"
+# Everything app.py writes; --serve points each at the test's work directory
+SCRATCH_FOLDERS = ["UPLOAD_FOLDER", "PROCESSED_FOLDER", "RESULTS_FOLDER", "EXPORT_FOLDER", "STATE_FOLDER",
+                   "SHARED_DATASET_FOLDER"]
+# Loading the models takes a while
+SERVER_START_SECONDS = 300
+
+
+def parse_mix(text):
+    """"predict=1,dashboard=8" -> {"predict": 1.0, "dashboard": 8.0}"""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation {name!r}, expected one of {OPERATIONS}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("The mix needs at least one operation with a positive weight")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def _listening_inodes(port):
+    inodes = set()
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    # State 0A is LISTEN
+                    if fields[3] == "0A" and int(fields[1].rsplit(":", 1)[1], 16) == port:
+                        inodes.add(fields[9])
+        except OSError:
+            continue
+    return inodes
+
+
+def server_pids(port):
+    """Processes listening on `port`, found through /proc (Linux only)"""
+    inodes = _listening_inodes(port)
+    pids = []
+    if not inodes:
+        return pids
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            for fd in os.listdir(f"/proc/{pid}/fd"):
+                target = os.readlink(f"/proc/{pid}/fd/{fd}")
+                if target.startswith("socket:[") and target[8:-1] in inodes:
+                    pids.append(int(pid))
+                    break
+        except OSError:
+            continue  # gone, or not ours to inspect
+    return pids
+
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def start_server(url, workdir, upload_bytes):
+    """Start app.py on the URL's port with scratch folders under `workdir`.
+
+    Uploads made by the test then never reach the real runs or the learned
+    anomaly, user, risk and covariance state, and every test starts from
+    fresh state. The upload limit is raised to fit the test's CSV.
+    """
+    port = urlparse(url).port or 80
+    if server_pids(port):
+        raise RuntimeError(f"Port {port} is already in use; pick a free one with --url")
+    env = dict(os.environ, PORT=str(port), FLASK_DEBUG="false", ASSISTANT_SIDECAR="0",
+               MAX_UPLOAD_MB=str(max(100, upload_bytes // 1024 ** 2 + 1)))
+    for name in SCRATCH_FOLDERS:
+        env[name] = os.path.join(workdir, "app", name.split("_")[0].lower())
+    server = subprocess.Popen([sys.executable, os.path.join(BASE_DIR, "app.py")], cwd=BASE_DIR, env=env)
+    deadline = time.monotonic() + SERVER_START_SECONDS
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"The scratch server exited with status {server.returncode}")
+        try:
+            requests.get(url, timeout=5)
+            print(f"[LOADTEST] Scratch server {server.pid} listening on port {port}")
+            return server
+        except requests.ConnectionError:
+            time.sleep(1)
+    stop_server(server)
+    raise RuntimeError(f"The scratch server did not answer within {SERVER_START_SECONDS}s")
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+class RssSampler:
+    """Samples the summed resident memory of the server processes once a second"""
+
+    def __init__(self, pids, interval=RSS_SAMPLE_SECONDS):
+        self.pids = pids
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._started = None
+
+    def _run(self):
+        while True:
+            values = [v for v in (rss_mb(pid) for pid in self.pids) if v is not None]
+            if values:
+                self.samples.append({"t": round(time.monotonic() - self._started, 2), "rss_mb": round(sum(values), 1)})
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        self._started = time.monotonic()
+        if self.pids:
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def summary(self):
+        if not self.samples:
+            return {"pids": self.pids, "start_mb": None, "peak_mb": None, "end_mb": None, "timeline": []}
+        rss = [s["rss_mb"] for s in self.samples]
+        return {"pids": self.pids, "start_mb": rss[0], "peak_mb": max(rss), "end_mb": rss[-1], "timeline": self.samples}
+
+
+class LoadTest:
+    """Replays a weighted mix of uploads, dashboard callbacks and downloads.
+
+    Each worker thread has its own HTTP session and picks its next
+    operation at random by weight, until the duration or the request budget
+    runs out. Every request is recorded with its operation, latency, status
+    and whether it counted as an error.
+    """
+
+    def __init__(self, url, mix, upload_path, run_id=None, download_file=None):
+        self.url = url.rstrip("/")
+        self.mix = mix
+        self.upload_path = upload_path
+        self.run_id = run_id
+        self.download_file = download_file
+        self.callbacks = []
+        self.values = dict(DASHBOARD_VALUES)
+        self.records = []
+        self._lock = threading.Lock()
+        self._remaining = None
+
+    # Setup
+
+    def _dash_update(self, session, key, spec):
+        return session.post(f"{self.url}/dashboard/_dash-update-component",
+                            json=_callback_body(key, spec, self.values), timeout=REQUEST_TIMEOUT_SECONDS)
+
+    def prepare(self):
+        """Warm the server up and collect what the operations need: a run to chart and a file to download"""
+        session = requests.Session()
+        if "predict" in self.mix or (self.download_file is None and "download" in self.mix):
+            print("[LOADTEST] Warm-up upload")
+            status, error, _ = self.predict(session)
+            if error:
+                raise RuntimeError(f"Warm-up upload failed with status {status}")
+        if "download" in self.mix and self.download_file is None:
+            raise RuntimeError("No processed file to download; pass --download-file")
+
+        if "dashboard" in self.mix:
+            specs = session.get(f"{self.url}/dashboard/_dash-dependencies", timeout=REQUEST_TIMEOUT_SECONDS).json()
+            by_output = {spec["output"]: spec for spec in specs}
+            if self.run_id is None:
+                key = next(k for k in by_output if RUNS_CALLBACK_OUTPUT in k)
+                self.values.update({"load-data-button.n_clicks": 1, "interval-component.n_intervals": 0})
+                response = self._dash_update(session, key, by_output[key]).json()["response"]
+                self.run_id = response.get("run-selector", {}).get("value")
+            self.values["run-selector.value"] = self.run_id
+            key = next(k for k in by_output if LOAD_CALLBACK_OUTPUT in k)
+            response = self._dash_update(session, key, by_output[key])
+            response.raise_for_status()
+            for component, props in response.json()["response"].items():
+                for prop, value in props.items():
+                    self.values[f"{component}.{prop}"] = value
+            # Chart callbacks driven by the loaded dataset; background jobs only
+            # report dispatch time over HTTP, so they are left out
+            self.callbacks = [
+                (spec["output"], spec) for spec in specs
+                if not spec.get("background") and spec["output"] != key
+                and any(f"{i['id']}.{i['property']}" == "dataset-version.data" for i in spec["inputs"])
+            ]
+            if not self.callbacks:
+                raise RuntimeError("The dashboard exposes no dataset callbacks to replay")
+            print(f"[LOADTEST] Dashboard run {self.run_id}, {len(self.callbacks)} callbacks")
+
+    # Operations, each returning (status, error, detail)
+
+    def predict(self, session):
+        with open(self.upload_path, "rb") as f:
+            response = session.post(
+                f"{self.url}/predict",
+                files={"csvfile": (os.path.basename(self.upload_path), f, "text/csv")},
+                headers={"X-Request-ID": f"loadtest-{uuid.uuid4().hex[:12]}"},
+                allow_redirects=False,
+                timeout=REQUEST_TIMEOUT_SECONDS,
+            )
+        # Failures flash a message and redirect back to the upload form
+        if response.status_code != 200:
+            return response.status_code, True, None
+        match = DOWNLOAD_LINK.search(response.text)
+        if match:
+            self.download_file = match.group(1)
+        return response.status_code, False, match.group(1) if match else None
+
+    def dashboard(self, session):
+        key, spec = random.choice(self.callbacks)
+        response = self._dash_update(session, key, spec)
+        # 204 is Dash's "nothing to update"
+        return response.status_code, response.status_code not in (200, 204), key
+
+    def download(self, session):
+        response = session.get(f"{self.url}/download_results/{self.download_file}",
+                               allow_redirects=False, timeout=REQUEST_TIMEOUT_SECONDS)
+        return response.status_code, response.status_code != 200, len(response.content)
+
+    # Running
+
+    def _take(self, deadline):
+        with self._lock:
+            if time.monotonic() >= deadline:
+                return False
+            if self._remaining is not None:
+                if self._remaining <= 0:
+                    return False
+                self._remaining -= 1
+            return True
+
+    def _worker(self, deadline):
+        session = requests.Session()
+        names, weights = zip(*self.mix.items())
+        while self._take(deadline):
+            name = random.choices(names, weights)[0]
+            started = time.monotonic()
+            try:
+                status, error, detail = getattr(self, name)(session)
+            except requests.RequestException as e:
+                status, error, detail = None, True, str(e)
+            record = {"op": name, "start": started, "seconds": time.monotonic() - started,
+                      "status": status, "error": error}
+            if error:
+                record["detail"] = detail
+            with self._lock:
+                self.records.append(record)
+
+    def run(self, concurrency, duration=None, total_requests=None):
+        self._remaining = total_requests
+        deadline = time.monotonic() + duration if duration else float("inf")
+        workers = [threading.Thread(target=self._worker, args=(deadline,), name=f"loadtest-{i}")
+                   for i in range(concurrency)]
+        started = time.monotonic()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return time.monotonic() - started
+
+
+def latency_stats(records, elapsed):
+    if not records:
+        return {"requests": 0}
+    ms = np.array([r["seconds"] for r in records]) * 1000
+    errors = sum(r["error"] for r in records)
+    return {
+        "requests": len(records),
+        "errors": errors,
+        "error_rate": round(errors / len(records), 4),
+        "throughput_rps": round(len(records) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def report_results(test, elapsed):
+    results = {"overall": latency_stats(test.records, elapsed)}
+    for name in test.mix:
+        results[name] = latency_stats([r for r in test.records if r["op"] == name], elapsed)
+    statuses = {}
+    for record in test.records:
+        key = f"{record['op']}:{record['status']}"
+        statuses[key] = statuses.get(key, 0) + 1
+    results["statuses"] = statuses
+    # A few error details are enough to see what went wrong
+    results["sample_errors"] = [
+        {k: r[k] for k in ("op", "status", "detail") if k in r} for r in test.records if r["error"]
+    ][:10]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test against a running fraud detection server")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--serve", action="store_true",
+                        help="Start a scratch app.py on the URL's port, with its own folders and state, and stop it afterwards")
+    parser.add_argument("--live-state", action="store_true",
+                        help="Allow uploads to a server that was not started with --serve; they change its runs and learned state")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run (ignored with --requests)")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests instead")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--rows", type=int, default=1_000, help="Rows in the uploaded CSV")
+    parser.add_argument("--upload", help="CSV to upload instead of a generated one")
+    parser.add_argument("--run-id", help="Stored run for the dashboard (default the newest)")
+    parser.add_argument("--download-file", help="Processed CSV to download (default the warm-up result)")
+    parser.add_argument("--server-pid", type=int, nargs="+",
+                        help="Server processes to sample RSS from (default whatever listens on the port)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Report path (default benchmarks/loadtest_<time>.json)")
+    args = parser.parse_args()
+    # Every upload is scored, stored and learned from like a real one
+    uploads = "predict" in args.mix or ("download" in args.mix and args.download_file is None)
+    if uploads and not (args.serve or args.live_state):
+        parser.error("predict requests (and the warm-up upload) add runs to the server and update its learned state; "
+                     "pass --serve to test a scratch server instead, or --live-state to upload to this one anyway")
+
+    output = args.output or os.path.join(
+        BASE_DIR, "benchmarks", f"loadtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    random.seed(args.seed)
+
+    workdir = tempfile.mkdtemp(prefix="fraud_loadtest_")
+    server = None
+    try:
+        # One upload file, generated once and sent by every predict request
+        upload_path = args.upload or os.path.join(workdir, f"loadtest_{args.rows}.csv")
+        if args.upload is None:
+            TransactionGenerator(seed=args.seed).write_csv(upload_path, args.rows, labels=False)
+        if args.serve:
+            server = start_server(args.url, workdir, os.path.getsize(upload_path))
+
+        parsed = urlparse(args.url)
+        pids = args.server_pid or (server_pids(parsed.port or 80) if parsed.hostname in ("127.0.0.1", "localhost") else [])
+        if not pids:
+            print("[LOADTEST] No server process found; RSS will not be sampled")
+
+        test = LoadTest(args.url, args.mix, upload_path, args.run_id, args.download_file)
+        test.prepare()
+        sampler = RssSampler(pids).start()
+        print(f"[LOADTEST] {args.concurrency} workers, mix {args.mix}, "
+              + (f"{args.requests} requests" if args.requests else f"{args.duration:.0f}s"))
+        try:
+            elapsed = test.run(args.concurrency, None if args.requests else args.duration, args.requests)
+        finally:
+            sampler.stop()
+    finally:
+        if server is not None:
+            stop_server(server)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = report_results(test, elapsed)
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "url": args.url,
+        "scratch_server": args.serve,
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+        "upload_rows": args.rows if args.upload is None else None,
+        "run_id": test.run_id,
+        "elapsed_seconds": round(elapsed, 2),
+        "results": results,
+        "server_rss": sampler.summary(),
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name in ["overall", *args.mix]:
+        stats = results[name]
+        if stats.get("requests"):
+            print(f"  {name}: {stats['requests']} requests, {stats['throughput_rps']} req/s, "
+                  f"p50 {stats['p50_ms']} / p95 {stats['p95_ms']} / p99 {stats['p99_ms']} ms, "
+                  f"{stats['error_rate']:.1%} errors")
+    rss = report["server_rss"]
+    if rss["peak_mb"] is not None:
+        print(f"  server RSS {rss['start_mb']} -> peak {rss['peak_mb']} MB")
+    print(f"[LOADTEST] Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
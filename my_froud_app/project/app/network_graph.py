@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Edge ranking options exposed in the Pattern Detection tab
+RANK_OPTIONS = {
+    'count': 'Transaction Volume',
+    'total_amount': 'Amount Volume',
+    'fraud_rate': 'Fraud Rate',
+}
+
+DEFAULT_TOP_K = 500
+
+# Line widths / fraud-rate colour bands used to group edges into a handful of traces
+WIDTH_BINS = [0, 2, 5, 10, 25, np.inf]
+WIDTH_LEVELS = [1, 2, 4, 6, 8]
+FRAUD_BINS = [-np.inf, 20, 40, 60, 80, np.inf]
+FRAUD_ALPHAS = [0.15, 0.35, 0.55, 0.75, 0.95]
+
+
+def aggregate_edges(df):
+    """Aggregate transactions into user -> merchant category edges"""
+    edges = (
+        df.assign(is_fraud=df['Meta_Prediction'].eq('Fraudulent'))
+        .groupby(['user_name', 'merchant_category'], sort=False, observed=True)
+        .agg(
+            count=('is_fraud', 'size'),
+            fraud_count=('is_fraud', 'sum'),
+            total_amount=('transaction_amount', 'sum')
+        )
+        .reset_index()
+    )
+    edges['fraud_rate'] = edges['fraud_count'] / edges['count'] * 100
+    return edges
+
+
+def prune_edges(edges, top_k=DEFAULT_TOP_K, rank_by='count', min_count=2):
+    """Keep the top-k edges ranked by volume, amount or fraud rate"""
+    if rank_by not in RANK_OPTIONS:
+        rank_by = 'count'
+
+    # Only show connections with significant activity
+    edges = edges[edges['count'] >= min_count]
+
+    if top_k and len(edges) > top_k:
+        # Break fraud-rate ties by volume so busy edges win
+        edges = edges.sort_values([rank_by, 'count'], ascending=False, kind='stable').head(top_k)
+
+    return edges.reset_index(drop=True)
+
+
+def build_network_figure(df, top_k=DEFAULT_TOP_K, rank_by='count', min_count=2):
+    """Build the user/merchant network figure with a constant number of traces"""
+    edges = prune_edges(aggregate_edges(df), top_k=top_k, rank_by=rank_by, min_count=min_count)
+
+    # Node index maps: users on the left, merchant categories on the right
+    users = pd.Index(edges['user_name'].unique())
+    merchants = pd.Index(edges['merchant_category'].unique())
+    user_y = users.get_indexer(edges['user_name']).astype(float)
+    merchant_y = (len(users) + merchants.get_indexer(edges['merchant_category'])).astype(float)
+
+    width_level = np.digitize(edges['count'].to_numpy() / 2, WIDTH_BINS[1:-1])
+    fraud_level = np.digitize(edges['fraud_rate'].to_numpy(), FRAUD_BINS[1:-1])
+
+    network_fig = go.Figure()
+
+    # One segment trace per (width, colour) band; segments are separated by None gaps
+    group_key = width_level * len(FRAUD_ALPHAS) + fraud_level
+    for key in np.unique(group_key):
+        mask = group_key == key
+        n = int(mask.sum())
+        xs = np.tile([0.0, 1.0, np.nan], n)
+        ys = np.column_stack([user_y[mask], merchant_y[mask], np.full(n, np.nan)]).ravel()
+        network_fig.add_trace(
+            go.Scattergl(
+                x=xs,
+                y=ys,
+                mode='lines',
+                line=dict(
+                    width=WIDTH_LEVELS[key // len(FRAUD_ALPHAS)],
+                    color='rgba(255,0,0,{})'.format(FRAUD_ALPHAS[key % len(FRAUD_ALPHAS)])
+                ),
+                hoverinfo='skip',
+                showlegend=False
+            )
+        )
+
+    # Invisible midpoint markers carry the per-edge hover text
+    hover_text = (
+        "User: " + edges['user_name'].astype(str)
+        + "<br>Merchant: " + edges['merchant_category'].astype(str)
+        + "<br>Transactions: " + edges['count'].astype(str)
+        + "<br>Fraud Rate: " + edges['fraud_rate'].round(1).astype(str) + "%"
+    )
+    network_fig.add_trace(
+        go.Scattergl(
+            x=np.full(len(edges), 0.5),
+            y=(user_y + merchant_y) / 2,
+            mode='markers',
+            marker=dict(size=6, opacity=0),
+            text=hover_text,
+            hoverinfo='text',
+            showlegend=False
+        )
+    )
+
+    # Add user nodes
+    network_fig.add_trace(
+        go.Scattergl(
+            x=np.zeros(len(users)),
+            y=np.arange(len(users)),
+            mode='markers',
+            marker=dict(
+                size=10,
+                color='#3498db',
+                line=dict(width=1, color='#2980b9')
+            ),
+            text=users.astype(str),
+            hoverinfo='text',
+            name='Users'
+        )
+    )
+
+    # Add merchant nodes
+    network_fig.add_trace(
+        go.Scattergl(
+            x=np.ones(len(merchants)),
+            y=len(users) + np.arange(len(merchants)),
+            mode='markers',
+            marker=dict(
+                size=10,
+                color='#2ecc71',
+                line=dict(width=1, color='#27ae60')
+            ),
+            text=merchants.astype(str),
+            hoverinfo='text',
+            name='Merchants'
+        )
+    )
+
+    network_fig.update_layout(
+        title=f"Transaction Network: Top {len(edges):,} Links by {RANK_OPTIONS.get(rank_by, RANK_OPTIONS['count'])}",
+        template="plotly_dark",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        showlegend=True,
+        xaxis=dict(
+            showgrid=False,
+            zeroline=False,
+            showticklabels=False,
+            range=[-0.1, 1.1]
+        ),
+        yaxis=dict(
+            showgrid=False,
+            zeroline=False,
+            showticklabels=False
+        )
+    )
+
+    return network_fig
@@ -0,0 +1,132 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Bucket widths kept for every run, finest first
+GRANULARITIES = OrderedDict([
+    ("minute", "min"),
+    ("hour", "h"),
+    ("day", "D"),
+])
+
+STATS = ["count", "sum", "min", "max", "sumsq"]
+AGGREGATIONS = ["sum", "mean", "count", "max", "min", "std"]
+
+CACHE_SIZE = 16
+
+
+def build_rollups(df, class_col="Meta_Prediction"):
+    """Bucket a processed run by time and prediction class.
+
+    Returns {granularity: DataFrame} where each frame has one row per
+    (bucket, class) with a 'rows' count and count/sum/min/max/sumsq columns
+    for every numeric feature, named '<feature>__<stat>'.
+    """
+    when = pd.to_datetime(df["datetime"], errors="coerce")
+    valid = when.notna()
+    features = df.select_dtypes(include=np.number).columns.tolist()
+    values = df.loc[valid, features].astype(np.float64)
+    classes = df.loc[valid, class_col].astype(str) if class_col in df.columns else pd.Series("All", index=values.index)
+    when = when[valid]
+
+    rollups = {}
+    for name, freq in GRANULARITIES.items():
+        keys = [when.dt.floor(freq).rename("bucket"), classes.rename(class_col)]
+        grouped = values.groupby(keys, sort=True)
+        stats = grouped.agg(["count", "sum", "min", "max"])
+        sumsq = (values ** 2).groupby(keys, sort=True).sum()
+        sumsq.columns = pd.MultiIndex.from_product([sumsq.columns, ["sumsq"]])
+        table = pd.concat([stats, sumsq], axis=1)
+        table.columns = [f"{feature}__{stat}" for feature, stat in table.columns]
+        table.insert(0, "rows", grouped.size())
+        rollups[name] = table.reset_index()
+    return rollups
+
+
+def query(rollups, granularity, feature, agg="sum", start=None, end=None, class_col="Meta_Prediction"):
+    """Aggregate one feature per bucket and class straight from the rollups"""
+    table = rollups[granularity]
+    if start is not None:
+        table = table[table["bucket"] >= pd.Timestamp(start)]
+    if end is not None:
+        # End dates are inclusive of the whole day
+        end = pd.Timestamp(end)
+        if end == end.normalize():
+            end = end + pd.Timedelta(days=1)
+            table = table[table["bucket"] < end]
+        else:
+            table = table[table["bucket"] <= end]
+
+    result = table[["bucket", class_col]].copy()
+    if feature is None:
+        result["value"] = table["rows"]
+        return result
+
+    count = table[f"{feature}__count"]
+    total = table[f"{feature}__sum"]
+    if agg == "mean":
+        result["value"] = total / count
+    elif agg == "count":
+        result["value"] = count
+    elif agg == "max":
+        result["value"] = table[f"{feature}__max"]
+    elif agg == "min":
+        result["value"] = table[f"{feature}__min"]
+    elif agg == "std":
+        var = (table[f"{feature}__sumsq"] - total ** 2 / count) / (count - 1)
+        result["value"] = np.sqrt(var.clip(lower=0)).where(count > 1)
+    else:
+        result["value"] = total
+    return result
+
+
+def date_bounds(rollups):
+    """First and last day covered by a run's rollups"""
+    days = rollups["day"]["bucket"]
+    if days.empty:
+        return None, None
+    return days.min().date(), days.max().date()
+
+
+def rollup_path(folder, run_id):
+    return os.path.join(folder, f"{run_id}_rollups.pkl")
+
+
+def save_rollups(rollups, run_id, folder):
+    os.makedirs(folder, exist_ok=True)
+    path = rollup_path(folder, run_id)
+    tmp_path = f"{path}.tmp"
+    pd.to_pickle(rollups, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def load_rollups(run_id, folder):
+    """Load a run's rollups, keeping recently used runs in memory"""
+    path = rollup_path(folder, run_id)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == mtime:
+            _cache.move_to_end(path)
+            return cached[1]
+    try:
+        rollups = pd.read_pickle(path)
+    except Exception as e:
+        print(f"[ROLLUPS] Could not load {path}: {str(e)}")
+        return None
+    with _lock:
+        _cache[path] = (mtime, rollups)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return rollups
@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from callback_cache import summarize
+
+CSV_SUFFIX = "_processed_data.csv"
+ARROW_SUFFIX = "_processed_data.arrow"
+MANIFEST_SUFFIX = "_manifest.json"
+
+CACHE_SIZE = 8
+
+
+def run_paths(folder, run_id):
+    return {
+        "csv": os.path.join(folder, f"{run_id}{CSV_SUFFIX}"),
+        "arrow": os.path.join(folder, f"{run_id}{ARROW_SUFFIX}"),
+        "manifest": os.path.join(folder, f"{run_id}{MANIFEST_SUFFIX}"),
+    }
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def save_run(df, run_id, folder, **extra):
+    """Store a processed run as an uncompressed Arrow file plus a JSON manifest.
+
+    Uncompressed Feather v2 is the Arrow IPC format, so readers can memory-map
+    it and pull individual columns without parsing the rest of the file.
+    """
+    paths = run_paths(folder, run_id)
+    df = df.reset_index(drop=True)
+    if "datetime" in df.columns and df["datetime"].dtype == object:
+        df = df.assign(datetime=pd.to_datetime(df["datetime"], errors="coerce"))
+
+    tmp_path = f"{paths['arrow']}.tmp"
+    feather.write_feather(df, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, paths["arrow"])
+
+    manifest = read_manifest(run_id, folder) or {}
+    manifest.update({
+        "run_id": run_id,
+        "created": manifest.get("created") or datetime.now().isoformat(timespec="seconds"),
+        "rows": int(len(df)),
+        "columns": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        "summary": summarize(df),
+        "arrow_bytes": os.path.getsize(paths["arrow"]),
+    })
+    manifest.update(extra)
+    _write_json(paths["manifest"], manifest)
+    return manifest
+
+
+def read_manifest(run_id, folder):
+    path = run_paths(folder, run_id)["manifest"]
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[RUNS] Could not read manifest {path}: {str(e)}")
+        return None
+
+
+_manifest_lock = threading.Lock()
+
+
+def update_manifest(run_id, folder, **fields):
+    """Merge extra fields into a run's manifest"""
+    with _manifest_lock:
+        manifest = read_manifest(run_id, folder) or {"run_id": run_id}
+        manifest.update(fields)
+        _write_json(run_paths(folder, run_id)["manifest"], manifest)
+    return manifest
+
+
+def list_runs(folder):
+    """Every stored run, newest first.
+
+    Runs written before the Arrow store existed only have a CSV; they are
+    listed from the file's mtime and converted the first time they are opened.
+    """
+    if not os.path.isdir(folder):
+        return []
+    runs = {}
+    for name in os.listdir(folder):
+        for suffix in (CSV_SUFFIX, ARROW_SUFFIX):
+            if name.endswith(suffix):
+                run_id = name[:-len(suffix)]
+                if run_id not in runs:
+                    mtime = os.path.getmtime(os.path.join(folder, name))
+                    runs[run_id] = {
+                        "run_id": run_id,
+                        "created": datetime.fromtimestamp(mtime).isoformat(timespec="seconds"),
+                        "rows": None,
+                    }
+    for run_id in runs:
+        manifest = read_manifest(run_id, folder)
+        if manifest:
+            runs[run_id] = manifest
+    return sorted(runs.values(), key=lambda run: (run["created"], run["run_id"]), reverse=True)
+
+
+def ensure_arrow(run_id, folder, prepare=None):
+    """Path to a run's Arrow file, converting a CSV-only run on first use"""
+    paths = run_paths(folder, run_id)
+    if os.path.exists(paths["arrow"]):
+        return paths["arrow"]
+    if not os.path.exists(paths["csv"]):
+        return None
+    print(f"[RUNS] Converting {paths['csv']} to Arrow")
+    df = pd.read_csv(paths["csv"])
+    if prepare is not None:
+        df = prepare(df)
+    created = datetime.fromtimestamp(os.path.getmtime(paths["csv"])).isoformat(timespec="seconds")
+    save_run(df, run_id, folder, created=created)
+    return paths["arrow"]
+
+
+_tables = OrderedDict()
+_lock = threading.Lock()
+_shared = None
+
+
+def set_shared_store(store):
+    """Map runs from a SharedDatasets store instead of straight from disk"""
+    global _shared
+    _shared = store
+
+
+def open_run(run_id, folder, prepare=None):
+    """Memory-mapped Arrow table for a run; no column data is read until used"""
+    path = ensure_arrow(run_id, folder, prepare)
+    if path is None:
+        return None
+    mtime_ns = os.stat(path).st_mtime_ns
+    with _lock:
+        cached = _tables.get(path)
+        if cached and cached[0] == mtime_ns:
+            _tables.move_to_end(path)
+            return cached[1]
+
+    mapped = _shared.acquire(run_id, mtime_ns, path) if _shared else path
+    table = feather.read_table(mapped, memory_map=True)
+    released = []
+    with _lock:
+        if path in _tables:
+            released.append(_tables.pop(path))
+        _tables[path] = (mtime_ns, table, mapped)
+        while len(_tables) > CACHE_SIZE:
+            released.append(_tables.popitem(last=False)[1])
+    if _shared:
+        # Open mappings stay valid even if the segment is deleted
+        for _, _, old_mapped in released:
+            if old_mapped != mapped:
+                _shared.release(old_mapped)
+    return table
+
+
+def run_version(run_id, folder):
+    """Cache key for a run that changes whenever its Arrow file is rewritten"""
+    path = run_paths(folder, run_id)["arrow"]
+    try:
+        return f"{run_id}:{os.stat(path).st_mtime_ns}"
+    except OSError:
+        return None
+
+
+def load_columns(run_id, folder, columns=None, prepare=None):
+    """Read only the requested columns of a run into a DataFrame"""
+    table = open_run(run_id, folder, prepare)
+    if table is None:
+        return pd.DataFrame()
+    if columns is not None:
+        # Keep requested order, skipping duplicates and columns older runs lack
+        table = table.select([col for col in dict.fromkeys(columns) if col in table.column_names])
+    # split_blocks keeps numeric columns as zero-copy views of the mapped buffers
+    return table.to_pandas(split_blocks=True)
@@ -0,0 +1,168 @@
+import atexit
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+DEFAULT_FOLDER = "/dev/shm/fraud_datasets"
+# Unreferenced, still-current datasets are kept for the next worker until this is exceeded
+DEFAULT_BUDGET_BYTES = int(os.getenv("SHARED_DATASET_BUDGET_BYTES", 2 * 1024 ** 3))
+
+SEGMENT_SUFFIX = ".arrow"
+REFS_SUFFIX = ".refs"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedDatasets:
+    """Arrow IPC copies of datasets published once into shared memory.
+
+    Every worker process maps the same segment, so memory grows with the
+    number of datasets rather than datasets x workers. Each segment has a
+    directory of PID files counting the processes holding it. A segment is
+    deleted once nobody holds it and a newer version of the same dataset
+    has been published, or when unreferenced segments exceed the budget.
+    All bookkeeping happens under an flock on the folder's lock file.
+    """
+
+    def __init__(self, folder=DEFAULT_FOLDER, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.folder = folder
+        self.budget_bytes = budget_bytes
+        self._held = set()
+        self._thread_lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        self._lock_path = os.path.join(folder, ".lock")
+        atexit.register(self.release_all)
+
+    @classmethod
+    def create(cls, folder=DEFAULT_FOLDER, budget_bytes=DEFAULT_BUDGET_BYTES):
+        """Shared store, or None where shared memory or file locks are unavailable"""
+        if fcntl is None or not os.path.isdir(os.path.dirname(folder) or "/"):
+            print(f"[SHARED MEMORY] {folder} not available, workers will map datasets from disk")
+            return None
+        try:
+            return cls(folder, budget_bytes)
+        except OSError as e:
+            print(f"[SHARED MEMORY] Could not use {folder}: {str(e)}")
+            return None
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock, open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _segment(self, key, version):
+        return os.path.join(self.folder, f"{key}@{version}{SEGMENT_SUFFIX}")
+
+    def _live_refs(self, segment):
+        refs_dir = segment + REFS_SUFFIX
+        if not os.path.isdir(refs_dir):
+            return 0
+        live = 0
+        for name in os.listdir(refs_dir):
+            if _pid_alive(int(name)):
+                live += 1
+            else:
+                # Worker died without releasing
+                os.remove(os.path.join(refs_dir, name))
+        return live
+
+    def _remove(self, segment):
+        print(f"[SHARED MEMORY] Removing {os.path.basename(segment)}")
+        shutil.rmtree(segment + REFS_SUFFIX, ignore_errors=True)
+        try:
+            os.remove(segment)
+        except FileNotFoundError:
+            pass
+
+    def acquire(self, key, version, source_path):
+        """Path of the shared copy of source_path, publishing it if this is the first worker.
+
+        The caller holds a reference until release(); unlinking a segment
+        never invalidates mappings that are already open.
+        """
+        segment = self._segment(key, version)
+        with self._locked():
+            if not os.path.exists(segment):
+                tmp_path = f"{segment}.{os.getpid()}.tmp"
+                shutil.copyfile(source_path, tmp_path)
+                os.replace(tmp_path, segment)
+                print(f"[SHARED MEMORY] Published {os.path.basename(segment)}")
+            refs_dir = segment + REFS_SUFFIX
+            os.makedirs(refs_dir, exist_ok=True)
+            open(os.path.join(refs_dir, str(os.getpid())), "w").close()
+            self._held.add((os.getpid(), segment))
+            self._sweep(current=segment)
+        return segment
+
+    def release(self, segment):
+        """Drop this process's reference to a segment"""
+        with self._locked():
+            self._held.discard((os.getpid(), segment))
+            try:
+                os.remove(os.path.join(segment + REFS_SUFFIX, str(os.getpid())))
+            except FileNotFoundError:
+                pass
+            self._sweep()
+
+    def release_all(self):
+        # Forked children (background callback jobs) only release their own references;
+        # any they leave behind are cleared once their PID is gone
+        pid = os.getpid()
+        for holder, segment in list(self._held):
+            if holder != pid:
+                continue
+            try:
+                self.release(segment)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _parse(segment):
+        key, version = os.path.basename(segment)[:-len(SEGMENT_SUFFIX)].rsplit("@", 1)
+        return key, version
+
+    def _sweep(self, current=None):
+        segments = [
+            os.path.join(self.folder, name) for name in os.listdir(self.folder) if name.endswith(SEGMENT_SUFFIX)
+        ]
+        # Versions are source mtimes, so the highest one per key is current
+        segments.sort(key=lambda s: int(self._parse(s)[1]) if self._parse(s)[1].isdigit() else os.path.getmtime(s))
+        newest = {}
+        for segment in segments:
+            newest[self._parse(segment)[0]] = segment
+
+        unreferenced = []
+        for segment in segments:
+            if segment == current or self._live_refs(segment):
+                continue
+            if newest[self._parse(segment)[0]] != segment:
+                # Superseded by a newer version and nobody holds it
+                self._remove(segment)
+            else:
+                unreferenced.append(segment)
+
+        # Oldest unreferenced datasets go first once over budget
+        total = sum(os.path.getsize(s) for s in segments if os.path.exists(s))
+        for segment in unreferenced:
+            if total <= self.budget_bytes:
+                break
+            total -= os.path.getsize(segment)
+            self._remove(segment)
@@ -0,0 +1,171 @@
+import atexit
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process supervises its own sidecar
+    fcntl = None
+
+# Seconds between supervisor checks, how long a health probe may take,
+# and the restart backoff after a crash
+CHECK_INTERVAL_SECONDS = 2.0
+HEALTH_TIMEOUT_SECONDS = 1.0
+RESTART_BACKOFF_SECONDS = 1.0
+RESTART_BACKOFF_MAX_SECONDS = 60.0
+# A running sidecar that fails its health check this long is killed and restarted
+UNHEALTHY_RESTART_SECONDS = 30.0
+
+
+class StreamlitSidecar:
+    """Keeps one Streamlit app running next to the Flask app.
+
+    A supervisor thread starts `streamlit run` once, marks it ready when
+    Streamlit's own /_stcore/health endpoint answers, and restarts it with
+    exponential backoff if it exits. Output goes to a log file, never to
+    an undrained pipe. With several Flask worker processes, a lock file
+    makes one of them the owner; the others only watch the shared sidecar
+    and take over if the owner goes away.
+    """
+
+    def __init__(self, script, port=8502, log_path=None, lock_path=None):
+        self.script = script
+        self.port = port
+        self.log_path = log_path or os.devnull
+        self.lock_path = lock_path
+        self.health_url = f"http://127.0.0.1:{port}/_stcore/health"
+        self.process = None
+        self.ready = False
+        self.restarts = 0
+        self.started_at = None
+        self.last_exit_code = None
+        self._owner = False
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def command(self):
+        return [
+            sys.executable, "-m", "streamlit", "run", self.script,
+            "--server.port", str(self.port),
+            "--server.headless", "true",
+            "--browser.gatherUsageStats", "false",
+        ]
+
+    def healthy(self):
+        try:
+            with urllib.request.urlopen(self.health_url, timeout=HEALTH_TIMEOUT_SECONDS) as response:
+                return response.status == 200
+        except OSError:
+            return False
+
+    def _acquire_ownership(self):
+        if self._owner:
+            return True
+        if fcntl is None or self.lock_path is None:
+            self._owner = True
+            return True
+        if self._lock_file is None:
+            os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+            self._lock_file = open(self.lock_path, "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        self._owner = True
+        print(f"[SIDECAR] Process {os.getpid()} supervises the assistant on port {self.port}")
+        return True
+
+    def _spawn(self):
+        if self.log_path != os.devnull:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        log = open(self.log_path, "ab")
+        try:
+            self.process = subprocess.Popen(
+                self.command(),
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL,
+                cwd=os.path.dirname(os.path.abspath(self.script)),
+                env={**os.environ, "PYTHONPATH": os.pathsep.join(
+                    filter(None, [os.path.dirname(os.path.abspath(__file__)), os.environ.get("PYTHONPATH")])
+                )},
+            )
+        finally:
+            # The child has its own copy of the descriptor
+            log.close()
+        self.started_at = time.time()
+        print(f"[SIDECAR] Started Streamlit (pid {self.process.pid}) on port {self.port}")
+
+    def _supervise(self):
+        backoff = RESTART_BACKOFF_SECONDS
+        next_start = 0.0
+        unhealthy_since = None
+        while not self._stop.is_set():
+            try:
+                self.ready = self.healthy()
+                running = self.process is not None and self.process.poll() is None
+                if self.ready:
+                    backoff = RESTART_BACKOFF_SECONDS
+                    unhealthy_since = None
+                elif running:
+                    # Alive but not answering: give it time to boot, then replace it
+                    unhealthy_since = unhealthy_since or time.monotonic()
+                    if time.monotonic() - unhealthy_since > UNHEALTHY_RESTART_SECONDS:
+                        print(f"[SIDECAR] Streamlit (pid {self.process.pid}) unhealthy for "
+                              f"{UNHEALTHY_RESTART_SECONDS:.0f}s, killing it")
+                        self.process.kill()
+                        self.process.wait()
+                        unhealthy_since = None
+                elif not running and self._acquire_ownership() and time.monotonic() >= next_start:
+                    if self.process is not None:
+                        self.last_exit_code = self.process.returncode
+                        self.restarts += 1
+                        print(f"[SIDECAR] Streamlit exited with code {self.last_exit_code}, "
+                              f"restart {self.restarts} in {backoff:.0f}s")
+                        self.process = None
+                        next_start = time.monotonic() + backoff
+                        backoff = min(backoff * 2, RESTART_BACKOFF_MAX_SECONDS)
+                    else:
+                        self._spawn()
+            except Exception as e:
+                print(f"[SIDECAR ERROR] {str(e)}")
+                next_start = time.monotonic() + backoff
+                backoff = min(backoff * 2, RESTART_BACKOFF_MAX_SECONDS)
+            # Check quickly while starting so the page is usable as soon as Streamlit is
+            self._stop.wait(CHECK_INTERVAL_SECONDS if self.ready else 0.5)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._supervise, name="streamlit-sidecar", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.ready = False
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "owner": self._owner,
+            "pid": self.process.pid if self.process is not None and self.process.poll() is None else None,
+            "port": self.port,
+            "restarts": self.restarts,
+            "last_exit_code": self.last_exit_code,
+            "started_at": self.started_at,
+        }
@@ -0,0 +1,87 @@
+import copy
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the threads of one process are serialised
+    fcntl = None
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(path):
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+@contextmanager
+def locked(path):
+    """Exclusive access to a state file across threads and worker processes"""
+    with _thread_lock(path):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(f"{path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def file_version(path):
+    """Changes whenever the file is replaced; None when it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    # Every commit replaces the file, so the inode changes even within one mtime tick
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class SharedState:
+    """Learned state kept in one file and shared by every worker process.
+
+    Scoring works on `snapshot()`, a private copy of the latest committed
+    state, re-read only when the file has changed. Learning goes through
+    `commit(update)`, which re-reads the file under an inter-process lock,
+    applies the update and writes the result back atomically, so concurrent
+    workers never overwrite each other's updates.
+
+    `load(path)` must return a fresh state when the file does not exist;
+    `dump(state, path)` writes it.
+    """
+
+    def __init__(self, path, load, dump):
+        self.path = path
+        self._load = load
+        self._dump = dump
+        self._version = None
+        self._state = None
+        self._lock = threading.Lock()
+
+    def _current(self):
+        version = file_version(self.path)
+        with self._lock:
+            if self._state is None or version != self._version:
+                self._state, self._version = self._load(self.path), version
+            return self._state
+
+    def snapshot(self):
+        return copy.deepcopy(self._current())
+
+    def commit(self, update):
+        """Apply update(state) to the latest state on disk and persist it; returns update's result"""
+        with locked(self.path):
+            state = self._load(self.path)
+            result = update(state)
+            tmp_path = f"{self.path}.tmp"
+            self._dump(state, tmp_path)
+            os.replace(tmp_path, self.path)
+            with self._lock:
+                self._state, self._version = state, file_version(self.path)
+        return result
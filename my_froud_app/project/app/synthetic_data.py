@@ -0,0 +1,253 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# The 12 columns predict() validates, in upload order
+SCHEMA = [
+    "transaction_id", "user_name", "credit_card_type",
+    "transaction_amount", "merchant_category", "datetime",
+    "bank", "location", "is_foreign", "transaction_type",
+    "transaction_frequency", "time_since_last_txn_hrs"
+]
+
+# Category values the fitted preprocessor was trained on
+BANKS = [
+    "Equity Bank", "KCB Bank", "Co-operative Bank", "NCBA Bank", "Absa Kenya", "Standard Chartered Kenya",
+    "Stanbic Bank", "Diamond Trust Bank", "I&M Bank", "Family Bank", "National Bank of Kenya", "Prime Bank",
+    "Sidian Bank", "Ecobank Kenya", "Bank of Africa Kenya", "Gulf African Bank", "Housing Finance Company of Kenya",
+    "Victoria Commercial Bank", "Spire Bank", "Transnational Bank Kenya", "Chase Bank Kenya", "Imperial Bank Kenya",
+    "Jamii Bora Bank", "NIC Bank", "Commercial Bank of Africa",
+]
+BANK_WEIGHTS = np.array([18, 16, 12, 9, 7, 6, 5, 4, 4, 4, 3, 2, 2, 2, 1, 1, 1, 1, 1, 1, 0.5, 0.5, 0.5, 0.5, 0.5])
+
+CARD_TYPES = [
+    "Visa Classic", "Visa Gold", "Visa Platinum", "Visa Signature", "Visa Infinite",
+    "MasterCard Standard", "MasterCard Gold", "MasterCard Platinum", "MasterCard World Elite", "Equity card",
+]
+CARD_WEIGHTS = np.array([25, 10, 5, 2, 1, 22, 8, 4, 1, 22])
+
+LOCAL_LOCATIONS = [
+    "Nairobi", "Mombasa", "Kisumu", "Nakuru", "Eldoret", "Thika", "Machakos", "Nyeri", "Meru", "Kakamega",
+    "Kitale", "Malindi", "Naivasha", "Nanyuki", "Kericho", "Kilifi", "Garissa", "Embu", "Bungoma", "Homa Bay",
+    "Migori", "Narok", "Lamu", "Ruiru", "Kikuyu",
+]
+LOCAL_WEIGHTS = np.array([30, 10, 6, 6, 5, 4, 3, 3, 3, 3, 2, 2, 2, 2, 2, 2, 1, 2, 2, 1, 1, 1, 1, 3, 2])
+FOREIGN_LOCATIONS = [
+    "Dubai", "London", "Kampala", "Kigali", "Dar es Salaam", "Juba", "USA", "United Kingdom", "UAE", "Uganda",
+    "Rwanda", "South Sudan", "France", "Spain", "Netherlands", "Ireland", "Sweden", "Denmark", "Malta", "Luxembourg",
+]
+LOCATIONS = LOCAL_LOCATIONS + FOREIGN_LOCATIONS
+
+TRANSACTION_TYPES = ["Retail", "Online", "ATM"]
+
+# Merchant category -> (share of normal traffic, median amount in KES)
+MERCHANTS = {
+    "Nakumatt Supermarket": (14, 2500),
+    "Quickmart": (14, 2200),
+    "Tuskys": (10, 2000),
+    "Safaricom Shop": (12, 1500),
+    "Phone World": (5, 18000),
+    "Tech Africa": (4, 35000),
+    "Kenya Airways": (3, 45000),
+    "Jambojet": (3, 9000),
+    "Mombasa Safari Tours": (2, 30000),
+    "Online Forex": (1, 20000),
+    "Crypto Exchange": (1, 25000),
+    "Gambling Site": (2, 1000),
+}
+MERCHANT_NAMES = list(MERCHANTS)
+HIGH_RISK_MERCHANTS = ["Online Forex", "Crypto Exchange", "Gambling Site"]
+
+FIRST_NAMES = [
+    "Wanjiru", "Kamau", "Otieno", "Achieng", "Mwangi", "Njeri", "Kiprop", "Chebet", "Mutua", "Mwende",
+    "Omondi", "Akinyi", "Kipchoge", "Jepkosgei", "Wafula", "Nafula", "Barasa", "Auma", "Karanja", "Wambui",
+    "Ochieng", "Adhiambo", "Kibet", "Jeptoo", "Musyoka", "Ndinda", "Onyango", "Awino", "Kariuki", "Nyambura",
+    "Hassan", "Amina", "Juma", "Fatuma", "Baraka", "Zawadi", "Brian", "Faith", "Kevin", "Mercy",
+]
+LAST_NAMES = [
+    "Kamau", "Otieno", "Mwangi", "Odhiambo", "Kiprotich", "Mutua", "Wanjala", "Njoroge", "Ochieng", "Kariuki",
+    "Kimani", "Onyango", "Cheruiyot", "Muthoni", "Wekesa", "Maina", "Owino", "Rotich", "Kilonzo", "Macharia",
+    "Okoth", "Ndungu", "Langat", "Nyaga", "Simiyu", "Gitau", "Were", "Korir", "Mugo", "Abdi",
+]
+
+# Share of traffic per hour of day, busiest around lunch and early evening
+HOUR_WEIGHTS = np.array([
+    0.3, 0.2, 0.15, 0.15, 0.2, 0.5, 1.2, 2.5, 4, 5, 5.5, 6, 7, 6.5, 5.5, 5.5, 6, 7, 7.5, 6.5, 5, 3.5, 2, 1
+])
+# Account takeovers and ATM cash-outs happen between midnight and 5am
+NIGHT_WEIGHTS = np.where(np.arange(24) < 5, 1.0, 0.0)
+
+# Injected fraud patterns and their share of fraudulent rows
+FRAUD_PATTERNS = {
+    "card_testing": 0.3,        # bursts of small online payments
+    "account_takeover": 0.3,    # large foreign spend at night
+    "high_risk_merchant": 0.25, # forex, crypto and gambling sites
+    "atm_cashout": 0.15,        # rapid large ATM withdrawals
+}
+
+
+def _choice(rng, n, weights):
+    """Vectorised weighted choice returning integer codes"""
+    cdf = np.cumsum(weights, dtype="float64")
+    return np.searchsorted(cdf / cdf[-1], rng.random(n), side="right").astype("int32")
+
+
+def _sample_seconds(rng, n, start, end, hour_weights):
+    """Seconds after start, drawn from the hourly profile clipped to [start, end)"""
+    hours = pd.date_range(start.floor("h"), end, freq="h", inclusive="left")
+    lo = np.maximum((hours - start).total_seconds().to_numpy(), 0.0)
+    hi = np.minimum((hours + pd.Timedelta(hours=1) - start).total_seconds().to_numpy(), (end - start).total_seconds())
+    weights = hour_weights[hours.hour] * (hi - lo)
+    if weights.sum() <= 0:
+        # The window has none of the requested hours
+        weights = HOUR_WEIGHTS[hours.hour] * (hi - lo)
+    slot = _choice(rng, n, weights)
+    return (lo[slot] + rng.random(n) * (hi[slot] - lo[slot])).astype("int64")
+
+
+def _categorical(codes, categories):
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+class TransactionGenerator:
+    """Vectorised generator of synthetic Kenyan card transactions.
+
+    Users get a fixed home town, bank, card and activity level, so velocity
+    and per-user statistics behave like real traffic. A `fraud_rate` share of
+    rows is rewritten into one of FRAUD_PATTERNS. Every column is built from
+    integer codes with NumPy and wrapped as a Categorical, which keeps
+    generation in the millions of rows per second.
+    """
+
+    def __init__(self, seed=0, n_users=50_000, fraud_rate=0.02, start="2025-01-01", days=30):
+        self.seed = seed
+        self.fraud_rate = fraud_rate
+        self.start = pd.Timestamp(start)
+        self.days = days
+
+        rng = np.random.default_rng(seed)
+        self.n_users = n_users
+        ids = np.arange(n_users)
+        block = len(FIRST_NAMES) * len(LAST_NAMES)
+        self.user_names = [
+            f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]}"
+            + (f" {i // block}" if i >= block else "")
+            for i in ids
+        ]
+        # Zipf-like activity: a few users account for much of the traffic
+        activity = 1.0 / (ids + 10) ** 0.8
+        self.user_activity = rng.permutation(activity)
+        self.user_home = _choice(rng, n_users, LOCAL_WEIGHTS)
+        self.user_bank = _choice(rng, n_users, BANK_WEIGHTS)
+        self.user_card = _choice(rng, n_users, CARD_WEIGHTS)
+        self.user_frequency = rng.gamma(2.0, 3.0, n_users) + 1
+
+    def generate(self, n, offset=0, start=None, end=None, labels=False):
+        """DataFrame of n transactions, ids starting at offset, times within [start, end)"""
+        rng = np.random.default_rng([self.seed, offset])
+        start = pd.Timestamp(start) if start is not None else self.start
+        end = pd.Timestamp(end) if end is not None else self.start + pd.Timedelta(days=self.days)
+
+        user = _choice(rng, n, self.user_activity)
+        merchant = _choice(rng, n, np.array([share for share, _ in MERCHANTS.values()]))
+        medians = np.array([median for _, median in MERCHANTS.values()], dtype="float64")
+        amount = medians[merchant] * rng.lognormal(0.0, 0.6, n)
+
+        # 3% of normal traffic is travel spend abroad
+        location = self.user_home[user].copy()
+        abroad = rng.random(n) < 0.03
+        location[abroad] = len(LOCAL_LOCATIONS) + rng.integers(0, len(FOREIGN_LOCATIONS), abroad.sum())
+
+        tx_type = _choice(rng, n, np.array([70, 20, 10]))
+        frequency = rng.poisson(self.user_frequency[user]).astype("int64") + 1
+        since_last = rng.exponential(24.0 / frequency)
+
+        offset_seconds = _sample_seconds(rng, n, start, end, HOUR_WEIGHTS)
+
+        is_fraud = rng.random(n) < self.fraud_rate
+        pattern = np.full(n, -1, dtype="int8")
+        fraud_idx = np.flatnonzero(is_fraud)
+        if len(fraud_idx):
+            pattern[fraud_idx] = _choice(rng, len(fraud_idx), np.array(list(FRAUD_PATTERNS.values())))
+
+            testing = fraud_idx[pattern[fraud_idx] == 0]
+            tx_type[testing] = 1
+            amount[testing] = rng.uniform(10, 150, len(testing))
+            since_last[testing] = rng.uniform(0.001, 0.05, len(testing))
+            frequency[testing] += rng.integers(20, 60, len(testing))
+
+            takeover = fraud_idx[pattern[fraud_idx] == 1]
+            location[takeover] = len(LOCAL_LOCATIONS) + rng.integers(0, len(FOREIGN_LOCATIONS), len(takeover))
+            amount[takeover] = amount[takeover] * rng.uniform(5, 20, len(takeover)) + 20000
+            offset_seconds[takeover] = _sample_seconds(rng, len(takeover), start, end, NIGHT_WEIGHTS)
+
+            risky = fraud_idx[pattern[fraud_idx] == 2]
+            merchant[risky] = rng.choice([MERCHANT_NAMES.index(m) for m in HIGH_RISK_MERCHANTS], len(risky))
+            tx_type[risky] = 1
+            amount[risky] = rng.lognormal(np.log(40000), 0.5, len(risky))
+
+            cashout = fraud_idx[pattern[fraud_idx] == 3]
+            tx_type[cashout] = 2
+            amount[cashout] = rng.choice([20000, 40000, 60000, 100000], len(cashout)).astype("float64")
+            offset_seconds[cashout] = _sample_seconds(rng, len(cashout), start, end, NIGHT_WEIGHTS)
+            since_last[cashout] = rng.uniform(0.01, 0.3, len(cashout))
+
+        order = np.argsort(offset_seconds, kind="stable")
+        when = start.to_datetime64().astype("datetime64[s]") + offset_seconds.astype("timedelta64[s]")
+
+        df = pd.DataFrame({
+            "transaction_id": np.arange(offset, offset + n, dtype="int64"),
+            "user_name": _categorical(user, self.user_names)[order],
+            "credit_card_type": _categorical(self.user_card[user], CARD_TYPES)[order],
+            "transaction_amount": np.round(amount, 2)[order],
+            "merchant_category": _categorical(merchant, MERCHANT_NAMES)[order],
+            "datetime": when[order],
+            "bank": _categorical(self.user_bank[user], BANKS)[order],
+            "location": _categorical(location, LOCATIONS)[order],
+            "is_foreign": (location >= len(LOCAL_LOCATIONS)).astype("int8")[order],
+            "transaction_type": _categorical(tx_type, TRANSACTION_TYPES)[order],
+            "transaction_frequency": frequency[order],
+            "time_since_last_txn_hrs": np.round(since_last, 3)[order],
+        })
+        if labels:
+            df["is_fraud"] = is_fraud.astype("int8")[order]
+            df["fraud_pattern"] = pd.Categorical.from_codes(pattern, categories=list(FRAUD_PATTERNS))[order]
+        return df
+
+    def chunks(self, n, chunk_rows=1_000_000, labels=False):
+        """Yield n rows in time-ordered chunks with consecutive ids"""
+        total = self.start + pd.Timedelta(days=self.days) - self.start
+        for offset in range(0, n, chunk_rows):
+            size = min(chunk_rows, n - offset)
+            yield self.generate(
+                size,
+                offset=offset,
+                start=self.start + total * (offset / n),
+                end=self.start + total * ((offset + size) / n),
+                labels=labels,
+            )
+
+    def write_csv(self, path, n, chunk_rows=1_000_000, labels=False):
+        """Stream n rows to a CSV upload without holding them all in memory"""
+        tmp_path = f"{path}.tmp"
+        for i, chunk in enumerate(self.chunks(n, chunk_rows, labels)):
+            chunk.to_csv(tmp_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        os.replace(tmp_path, path)
+        return path
+
+
+def generate_transactions(n, seed=0, labels=False, **kwargs):
+    return TransactionGenerator(seed=seed, **kwargs).generate(n, labels=labels)
+
+
+if __name__ == "__main__":
+    # python synthetic_data.py ROWS OUTPUT.csv [SEED]
+    if len(sys.argv) < 3:
+        print("Usage: python synthetic_data.py ROWS OUTPUT.csv [SEED]")
+        sys.exit(1)
+    rows, output = int(sys.argv[1]), sys.argv[2]
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    TransactionGenerator(seed=seed).write_csv(output, rows)
+    print(f"[SYNTHETIC] Wrote {rows:,} transactions to {output}")
@@ -0,0 +1,298 @@
+import bisect
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import Response, g, has_request_context, request
+
+# Requests slower than this are written to the slow-callback log
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", 1.0))
+
+DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+BYTES_BUCKETS = [1e3, 1e4, 1e5, 1e6, 1e7, 1e8]
+ROWS_BUCKETS = [10, 100, 1e3, 1e4, 1e5, 1e6, 1e7]
+
+DASH_UPDATE_SUFFIX = "_dash-update-component"
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by label values"""
+
+    def __init__(self, name, help_text, buckets, labels=("route",)):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = list(buckets)
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series["count"]}')
+                lines.append(f"{self.name}_sum{{{labels}}} {series['sum']}")
+                lines.append(f"{self.name}_count{{{labels}}} {series['count']}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+                lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_SECONDS = Histogram("fraud_request_duration_seconds", "Wall time per route or Dash callback", DURATION_BUCKETS)
+REQUEST_BYTES = Histogram("fraud_request_payload_bytes", "Request body size", BYTES_BUCKETS)
+RESPONSE_BYTES = Histogram("fraud_response_payload_bytes", "Response body size", BYTES_BUCKETS)
+JSON_DECODE_SECONDS = Histogram("fraud_json_decode_seconds", "Time parsing the JSON request body", DURATION_BUCKETS)
+JSON_ENCODE_SECONDS = Histogram("fraud_json_encode_seconds",
+                                "Time a Dash update spends outside its callback, serialising the output and "
+                                "building the response", DURATION_BUCKETS)
+ROWS = Histogram("fraud_callback_rows", "Rows loaded while serving a request", ROWS_BUCKETS)
+CACHE_EVENTS = Counter("fraud_cache_events_total", "Callback cache lookups", ("route", "result"))
+
+METRICS = [REQUEST_SECONDS, REQUEST_BYTES, RESPONSE_BYTES, JSON_DECODE_SECONDS, JSON_ENCODE_SECONDS, ROWS, CACHE_EVENTS]
+
+
+def note_rows(count):
+    """Record rows loaded by the current request, if there is one"""
+    if has_request_context() and "telemetry" in g:
+        g.telemetry["rows"] += int(count)
+
+
+def note_cache(hit):
+    if has_request_context() and "telemetry" in g:
+        g.telemetry["hits" if hit else "misses"] += 1
+
+
+def time_callbacks(dash_app):
+    """Charge the time spent inside the app's Dash callbacks to the current request.
+
+    The rest of a Dash update, measured in `record_request`, is then the
+    dispatch serialising the callback output and building the response.
+    Background callbacks only dispatch a job over HTTP and are left as they are.
+    """
+    register = dash_app.callback
+
+    @functools.wraps(register)
+    def callback(*args, **kwargs):
+        decorate = register(*args, **kwargs)
+        if kwargs.get("background"):
+            return decorate
+
+        def wrap(fn):
+            @functools.wraps(fn)
+            def timed(*fn_args, **fn_kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*fn_args, **fn_kwargs)
+                finally:
+                    if has_request_context() and "telemetry" in g:
+                        g.telemetry["callback"] += time.perf_counter() - start
+                        g.telemetry["callbacks"] += 1
+            return decorate(timed)
+
+        return wrap
+
+    dash_app.callback = callback
+
+
+def _fingerprint(value):
+    return hashlib.md5(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+def _route(payload):
+    if request.path.endswith(DASH_UPDATE_SUFFIX) and isinstance(payload, dict):
+        return f"callback:{payload.get('output', 'unknown')}"
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def init_telemetry(flask_app, slow_log_path):
+    """Instrument every Flask route and Dash callback and serve /metrics"""
+    slow_log_lock = threading.Lock()
+
+    @flask_app.before_request
+    def start_request_timer():
+        g.telemetry = {"start": time.perf_counter(), "decode": 0.0, "callback": 0.0, "callbacks": 0,
+                       "rows": 0, "hits": 0, "misses": 0}
+        if request.is_json:
+            # Flask caches the parsed body, so Dash reuses this parse
+            start = time.perf_counter()
+            request.get_json(silent=True)
+            g.telemetry["decode"] = time.perf_counter() - start
+
+    @flask_app.after_request
+    def record_request(response):
+        stats = g.pop("telemetry", None)
+        if stats is None or request.path == "/metrics":
+            return response
+        duration = time.perf_counter() - stats["start"]
+        # The response body is built by now; whatever a Dash update spent outside its callback went there
+        stats["encode"] = max(0.0, duration - stats["decode"] - stats["callback"]) if stats["callbacks"] else 0.0
+        payload = request.get_json(silent=True) if request.is_json else None
+        route = _route(payload)
+        request_bytes = request.content_length or 0
+        response_bytes = response.content_length or 0
+
+        REQUEST_SECONDS.observe(duration, route)
+        REQUEST_BYTES.observe(request_bytes, route)
+        RESPONSE_BYTES.observe(response_bytes, route)
+        if request.is_json:
+            JSON_DECODE_SECONDS.observe(stats["decode"], route)
+        if stats["encode"]:
+            JSON_ENCODE_SECONDS.observe(stats["encode"], route)
+        if stats["rows"]:
+            ROWS.observe(stats["rows"], route)
+        if stats["hits"]:
+            CACHE_EVENTS.inc(route, "hit", amount=stats["hits"])
+        if stats["misses"]:
+            CACHE_EVENTS.inc(route, "miss", amount=stats["misses"])
+
+        if duration >= SLOW_REQUEST_SECONDS:
+            inputs = {}
+            if isinstance(payload, dict):
+                for item in payload.get("inputs", []) + payload.get("state", []):
+                    if isinstance(item, dict):
+                        inputs[f"{item.get('id')}.{item.get('property')}"] = _fingerprint(item.get("value"))
+            entry = {
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "route": route,
+                "seconds": round(duration, 4),
+                "request_bytes": request_bytes,
+                "response_bytes": response_bytes,
+                "json_decode_seconds": round(stats["decode"], 4),
+                "json_encode_seconds": round(stats["encode"], 4),
+                "rows": stats["rows"],
+                "cache_hits": stats["hits"],
+                "cache_misses": stats["misses"],
+                "inputs": inputs,
+            }
+            print(f"[SLOW REQUEST] {route} took {duration:.2f}s")
+            try:
+                with slow_log_lock, open(slow_log_path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"[TELEMETRY] Could not write slow log: {str(e)}")
+        return response
+
+    @flask_app.route("/metrics")
+    def metrics():
+        """Prometheus text exposition of the request metrics"""
+        lines = []
+        for metric in METRICS:
+            lines.extend(metric.render())
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+class StageTimer:
+    """Per-stage timings for one run of a pipeline, tagged with a request id.
+
+    Stages entered several times (once per chunk) accumulate; finish() writes
+    one JSON log line per stage plus a summary with rows/sec and bytes/sec.
+    """
+
+    def __init__(self, pipeline, request_id=None, log_path=None):
+        self.pipeline = pipeline
+        self.request_id = request_id or uuid.uuid4().hex[:12]
+        self.log_path = log_path
+        self.stages = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += time.perf_counter() - start
+            entry["calls"] += 1
+
+    def iterate(self, name, iterable):
+        """Yield from iterable, charging the time spent producing each item to a stage"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                item = next(iterator, _DONE)
+            if item is _DONE:
+                return
+            yield item
+
+    def log(self, **fields):
+        line = json.dumps({
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "pipeline": self.pipeline,
+            "request_id": self.request_id,
+            **fields,
+        }, default=str)
+        print(line)
+        if self.log_path:
+            try:
+                with open(self.log_path, "a") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                print(f"[TELEMETRY] Could not write timing log: {str(e)}")
+
+    def finish(self, rows=0, bytes_in=0, error=None):
+        """Log every stage and return the run summary"""
+        total = time.perf_counter() - self._start
+        for name, entry in self.stages.items():
+            self.log(event="stage", stage=name, seconds=round(entry["seconds"], 6), calls=entry["calls"])
+        summary = {
+            "request_id": self.request_id,
+            "total_seconds": round(total, 4),
+            "rows": int(rows),
+            "bytes": int(bytes_in),
+            "rows_per_second": round(rows / total, 1) if total else None,
+            "bytes_per_second": round(bytes_in / total, 1) if total else None,
+            "stages": {name: round(entry["seconds"], 4) for name, entry in self.stages.items()},
+        }
+        if error is not None:
+            summary["error"] = error
+        self.log(event="summary", **summary)
+        return summary
+
+
+_DONE = object()
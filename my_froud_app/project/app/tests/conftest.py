@@ -0,0 +1,34 @@
+import os
+import sys
+import threading
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The app's modules are imported flat, as app.py itself does; the assistant's
+# modules likewise from their own folder, after the app's
+sys.path.insert(0, APP_DIR)
+sys.path.insert(1, os.path.join(APP_DIR, "assistance_API"))
+
+
+@pytest.fixture
+def mock_api():
+    """The mock assistants API served on a free local port; yields the Flask app and its /v1 URL"""
+    from werkzeug.serving import make_server
+
+    from mock_assistants import create_mock_app
+
+    app = create_mock_app()
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield app, f"http://127.0.0.1:{server.server_port}/v1"
+    finally:
+        server.shutdown()
+        thread.join()
+
+
+def mock_calls(app):
+    """Requests the mock has answered so far, per endpoint"""
+    return app.test_client().get("/mock/stats").get_json()["calls"]
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_detector import ANOMALY_MIN_SCORE, ANOMALY_QUANTILE, HalfSpaceTrees, anomaly_threshold
+
+
+def transactions(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "transaction_amount": rng.lognormal(4, 1, n),
+        "transaction_frequency": rng.poisson(5, n),
+        "time_since_last_txn_hrs": rng.exponential(24, n),
+        "is_foreign": rng.integers(0, 2, n),
+    })
+
+
+def assert_mass_conserved(mass, rows):
+    """Every row sits in the root, and each internal node's mass is split between its children"""
+    assert (mass[:, 0] == rows).all()
+    n_internal = mass.shape[1] // 2
+    parents = np.arange(n_internal)
+    np.testing.assert_array_equal(mass[:, parents], mass[:, 2 * parents + 1] + mass[:, 2 * parents + 2])
+
+
+def test_mass_is_conserved_within_and_across_windows():
+    detector = HalfSpaceTrees(n_trees=5, height=6, window_size=500)
+    detector.score_and_update(transactions(1_300))
+    assert detector.rows_seen == 1_300
+    assert detector.windows_seen == 2
+    assert detector.window_fill == 300
+    assert_mass_conserved(detector.ref_mass, 500)
+    assert_mass_conserved(detector.latest_mass, 300)
+
+
+def test_batch_boundaries_do_not_change_scores_or_state():
+    df = transactions(3_000, seed=1)
+    whole = HalfSpaceTrees(n_trees=5, height=6, window_size=700)
+    chunked = HalfSpaceTrees(n_trees=5, height=6, window_size=700)
+    whole.score_and_update(df.iloc[:700])
+    chunked.score_and_update(df.iloc[:700])
+
+    expected = whole.score_and_update(df.iloc[700:])
+    bounds = [700, 701, 1_000, 1_399, 1_400, 2_222, 3_000]
+    got = np.concatenate([chunked.score_and_update(df.iloc[a:b]) for a, b in zip(bounds, bounds[1:])])
+    np.testing.assert_array_equal(got, expected)
+    np.testing.assert_array_equal(chunked.ref_mass, whole.ref_mass)
+    np.testing.assert_array_equal(chunked.latest_mass, whole.latest_mass)
+
+
+def test_threshold_is_the_run_quantile():
+    scores = np.random.default_rng(2).uniform(0.4, 0.7, 10_000)
+    threshold = anomaly_threshold(scores)
+    assert threshold == pytest.approx(np.quantile(scores, ANOMALY_QUANTILE))
+    assert (scores > threshold).mean() == pytest.approx(1 - ANOMALY_QUANTILE, abs=1e-3)
+
+
+def test_threshold_never_drops_below_the_floor():
+    assert anomaly_threshold(np.full(100, 0.2)) == ANOMALY_MIN_SCORE
+    assert anomaly_threshold([]) == ANOMALY_MIN_SCORE
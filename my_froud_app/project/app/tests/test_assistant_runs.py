@@ -0,0 +1,72 @@
+import openai
+import pytest
+
+import mock_assistants
+from assistant_runs import stream_run, wait_for_run
+from conftest import mock_calls
+
+RUNS = "POST /v1/threads/<thread_id>/runs"
+RETRIEVE = "GET /v1/threads/<thread_id>/runs/<run_id>"
+CANCEL = "POST /v1/threads/<thread_id>/runs/<run_id>/cancel"
+
+
+@pytest.fixture
+def client(mock_api, monkeypatch):
+    monkeypatch.setattr(mock_assistants, "MOCK_RUN_SECONDS", 0.3)
+    monkeypatch.setattr(mock_assistants, "MOCK_TOKEN_SECONDS", 0.0)
+    _, url = mock_api
+    return openai.OpenAI(base_url=url, api_key="test", max_retries=0)
+
+
+def ask(client, question):
+    return client.beta.threads.create(messages=[{"role": "user", "content": question}]).id
+
+
+def test_streamed_question_completes_in_one_call(client, mock_api):
+    app, _ = mock_api
+    thread_id = ask(client, "Which users look suspicious?")
+    seen = []
+    outcome = stream_run(client, thread_id, "asst_test", on_text=seen.append)
+
+    assert outcome.completed and outcome.streamed
+    assert outcome.text.startswith("Mock analysis for: Which users look suspicious?")
+    assert seen[-1] == outcome.text
+    assert outcome.api_calls == 1
+    assert mock_calls(app)[RUNS] == 1
+    assert RETRIEVE not in mock_calls(app)
+
+
+def test_failed_run_reports_its_error(client):
+    outcome = stream_run(client, ask(client, "Break please [fail]"), "asst_test")
+    assert outcome.status == "failed"
+    assert "server_error" in outcome.error
+    assert outcome.api_calls == 1
+
+
+def test_hanging_run_times_out_and_is_cancelled(client, mock_api):
+    app, _ = mock_api
+    thread_id = ask(client, "Take forever [hang]")
+    outcome = stream_run(client, thread_id, "asst_test", timeout=1)
+
+    assert outcome.status == "timed_out"
+    assert outcome.api_calls == 2  # the run, then its cancellation
+    assert mock_calls(app)[CANCEL] == 1
+    assert client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=outcome.run_id).status == "cancelled"
+
+
+def test_polled_run_counts_every_retrieve(client, mock_api):
+    app, _ = mock_api
+    thread_id = ask(client, "How many fraudulent rows?")
+    run = client.beta.threads.runs.create(thread_id=thread_id, assistant_id="asst_test")
+    outcome = wait_for_run(client, thread_id, run.id, timeout=10)
+
+    assert outcome.completed
+    assert outcome.api_calls == mock_calls(app)[RETRIEVE] >= 1
+
+
+def test_unknown_run_fails_without_retrying(client, mock_api):
+    app, _ = mock_api
+    thread_id = ask(client, "Anything")
+    outcome = wait_for_run(client, thread_id, "run_missing", timeout=10)
+    assert outcome.status == "failed"
+    assert mock_calls(app)[RETRIEVE] == 1
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import openai
+import pytest
+
+import batch_explanations
+import mock_assistants
+from batch_explanations import RateLimiter, compact, explain_rows, read_records
+from conftest import mock_calls
+
+COMPLETIONS = "POST /v1/chat/completions"
+RATE_LIMITED = "429 /v1/chat/completions"
+
+
+@pytest.fixture
+def explain(mock_api, monkeypatch):
+    # Three completions a second: a batch of eight has to wait out several 429s
+    monkeypatch.setattr(mock_assistants, "MOCK_RPM", 3)
+    monkeypatch.setattr(mock_assistants, "MOCK_RPM_WINDOW_SECONDS", 1.0)
+    monkeypatch.setattr(mock_assistants, "MOCK_COMPLETION_SECONDS", 0.0)
+    monkeypatch.setattr(batch_explanations, "RETRY_BASE_SECONDS", 0.05)
+    monkeypatch.setattr(batch_explanations, "RETRY_MAX_SECONDS", 0.5)
+    _, url = mock_api
+
+    def run(rows, path):
+        async def main():
+            async with openai.AsyncOpenAI(base_url=url, api_key="test", max_retries=0) as client:
+                return await explain_rows(client, rows, path, concurrency=4,
+                                          limiter=RateLimiter(6000, 10_000_000))
+        return asyncio.run(main())
+
+    return run
+
+
+def flagged(n):
+    return [{"row": i, "transaction_id": str(1000 + i), "transaction_amount": str(50.0 * i)} for i in range(n)]
+
+
+def test_rate_limited_batch_explains_every_row_once(explain, mock_api, tmp_path):
+    app, _ = mock_api
+    path = str(tmp_path / "run_llm_explanations.jsonl")
+    summary = explain(flagged(8), path)
+
+    assert summary["done"] == 8 and summary["failed"] == 0
+    assert summary["retries"] > 0
+    assert mock_calls(app)[RATE_LIMITED] == summary["retries"]
+    records = list(read_records(path))
+    assert sorted(record["row"] for record in records) == list(range(8))
+    assert all(record["explanation"] for record in records)
+
+    # Re-running the same job finds nothing left to do
+    completions = mock_calls(app)[COMPLETIONS]
+    assert explain(flagged(8), path)["total"] == 0
+    assert mock_calls(app)[COMPLETIONS] == completions
+
+
+def test_rerun_explains_only_rows_left_unexplained(explain, mock_api, tmp_path):
+    app, _ = mock_api
+    path = tmp_path / "run_llm_explanations.jsonl"
+    # An interrupted job: row 0 explained, row 1 failed, row 2 cut short mid-write
+    path.write_text(
+        json.dumps({"row": 0, "explanation": "earlier", "attempts": 1}) + "\n"
+        + json.dumps({"row": 1, "explanation": None, "error": "Rate limit reached", "attempts": 6}) + "\n"
+        + '{"row": 2, "expl'
+    )
+    summary = explain(flagged(4), str(path))
+
+    assert summary["total"] == 3
+    assert mock_calls(app)[COMPLETIONS] - mock_calls(app).get(RATE_LIMITED, 0) == 3
+    records = {record["row"]: record for record in read_records(str(path))}
+    assert len(path.read_text().splitlines()) == len(records) == 4
+    assert records[0]["explanation"] == "earlier"
+    assert all(records[row]["explanation"] for row in (1, 2, 3))
+
+
+def test_compact_keeps_the_explanation_over_later_failures(tmp_path):
+    path = tmp_path / "run_llm_explanations.jsonl"
+    lines = [
+        {"row": 0, "explanation": None, "error": "timeout"},
+        {"row": 0, "explanation": "found"},
+        {"row": 0, "explanation": None, "error": "timeout again"},
+        {"row": 1, "explanation": None, "error": "first"},
+        {"row": 1, "explanation": None, "error": "latest"},
+    ]
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    compact(str(path))
+
+    records = list(read_records(str(path)))
+    assert len(records) == 2
+    assert {record["row"]: record.get("explanation") or record["error"] for record in records} == {0: "found", 1: "latest"}
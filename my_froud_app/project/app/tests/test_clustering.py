@@ -0,0 +1,29 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+import clustering
+from clustering import cluster_labels
+
+
+def test_rows_missing_every_feature_are_all_noise():
+    df = pd.DataFrame({"a": [np.nan] * 3, "b": [1.0, 2.0, 3.0]})
+    np.testing.assert_array_equal(cluster_labels(df, ["a", "b"], 0.5, "all-missing"), [-1, -1, -1])
+
+
+def test_identical_concurrent_requests_run_dbscan_once(monkeypatch):
+    runs = []
+    run_dbscan = clustering._run_dbscan
+    monkeypatch.setattr(clustering, "_run_dbscan", lambda *args: (runs.append(args), run_dbscan(*args))[1])
+    df = pd.DataFrame(np.random.default_rng(0).normal(size=(3_000, 2)), columns=["a", "b"])
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cluster_labels(df, ["a", "b"], 0.3, "concurrent")))
+               for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(runs) == 1
+    assert all(labels is results[0] for labels in results)
@@ -0,0 +1,67 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+from covariance_store import MomentSketch, correlation_columns, load_covariance_store, record_run
+
+
+def frame(n, seed, missing=0.1):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=n)
+    df = pd.DataFrame({
+        "transaction_id": np.arange(n) + seed * n,
+        "transaction_amount": 1e6 + 50 * base + rng.normal(size=n),  # large offset, small spread
+        "transaction_frequency": rng.poisson(4, n).astype(float),
+        "risk_score": 30 - 5 * base + rng.normal(size=n),
+        "merchant_category": rng.choice(["food", "travel"], n),
+    })
+    for col in ["transaction_amount", "transaction_frequency", "risk_score"]:
+        df.loc[rng.random(n) < missing, col] = np.nan
+    return df
+
+
+def reference(df):
+    return df[correlation_columns(df)].corr()
+
+
+def test_identifiers_are_not_correlated():
+    assert correlation_columns(frame(10, 0)) == ["transaction_amount", "transaction_frequency", "risk_score"]
+
+
+def test_single_frame_matches_pandas_with_missing_values():
+    df = frame(2_000, 0)
+    pdt.assert_frame_equal(MomentSketch.from_frame(df).correlation(), reference(df), atol=1e-10)
+
+
+def test_merged_batches_match_pandas_on_the_concatenation():
+    batches = [frame(n, seed) for seed, n in enumerate([1, 7, 500, 2_000, 30])]
+    sketch = MomentSketch.from_frame(batches[0])
+    for batch in batches[1:]:
+        sketch = sketch.merge(MomentSketch.from_frame(batch))
+    everything = pd.concat(batches)[correlation_columns(batches[0])]
+    pdt.assert_frame_equal(sketch.correlation(), everything.corr(), atol=1e-10)
+    np.testing.assert_array_equal(np.diag(sketch.n), everything.notna().sum())
+    assert sketch.rows == everything.notna().sum().max()
+
+
+def test_pairs_without_two_rows_are_nan_like_pandas():
+    df = pd.DataFrame({"a": [1.0, 2.0, 3.0], "b": [np.nan, np.nan, 5.0], "c": [4.0, 1.0, 0.0]})
+    pdt.assert_frame_equal(MomentSketch.from_frame(df).correlation(), df.corr())
+
+
+def test_round_trip():
+    sketch = MomentSketch.from_frame(frame(300, 3))
+    pdt.assert_frame_equal(MomentSketch.from_dict(json.loads(json.dumps(sketch.to_dict()))).correlation(),
+                           sketch.correlation())
+
+
+def test_recorded_runs_keep_per_run_and_history_correlations(tmp_path):
+    path = str(tmp_path / "covariance.json")
+    first, second = frame(400, 5), frame(600, 6)
+    record_run(first, "run_a", path)
+    record_run(second, "run_b", path)
+    store = load_covariance_store(path)
+    pdt.assert_frame_equal(store.correlation("run_a"), reference(first), atol=1e-10)
+    pdt.assert_frame_equal(store.correlation(), reference(pd.concat([first, second])), atol=1e-10)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+from explanations import ForestContributions
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2_000, 6))
+    y = ((X[:, 0] + 0.5 * X[:, 1] ** 2 - X[:, 2] + rng.normal(scale=0.5, size=2_000)) > 0.8).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize("model", [
+    RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0),
+    RandomForestClassifier(n_estimators=10, min_samples_leaf=5, class_weight="balanced", random_state=1),
+    ExtraTreesClassifier(n_estimators=15, max_depth=6, random_state=2),
+])
+def test_contributions_add_up_to_the_predicted_probability(data, model):
+    X, y = data
+    model.fit(X, y)
+    explain = ForestContributions(model, X.shape[1])
+    contributions = explain(X[:500])
+    assert contributions.shape == (500, X.shape[1])
+    np.testing.assert_allclose(explain.bias + contributions.sum(axis=1), model.predict_proba(X[:500])[:, 1], atol=1e-9)
+    # Sparse input walks the same paths
+    np.testing.assert_allclose(explain(sparse.csr_matrix(X[:500])), contributions, atol=1e-12)
+
+
+def test_unused_features_get_nothing(data):
+    X, y = data
+    X = np.column_stack([X, np.zeros(len(X))])  # a constant column is never split on
+    model = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(X, y)
+    assert np.abs(ForestContributions(model, X.shape[1])(X[:200])[:, -1]).max() == 0
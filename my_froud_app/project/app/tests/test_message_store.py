@@ -0,0 +1,36 @@
+import openai
+from flask import request
+
+import message_store
+from message_store import ThreadMessages
+
+
+def test_sync_fetches_only_messages_after_the_cursor(mock_api, monkeypatch):
+    app, url = mock_api
+    queries = []
+
+    @app.before_request
+    def record_list_query():
+        if request.method == "GET" and request.path.endswith("/messages"):
+            queries.append(request.args.to_dict())
+
+    # Small pages, so the first sync has to follow the cursor across pages too
+    monkeypatch.setattr(message_store, "PAGE_SIZE", 2)
+    client = openai.OpenAI(base_url=url, api_key="test", max_retries=0)
+    thread_id = client.beta.threads.create(messages=[{"role": "user", "content": f"m{i}"} for i in range(5)]).id
+    messages = ThreadMessages(client, thread_id)
+
+    assert [m["content"] for m in messages.sync()] == ["m0", "m1", "m2", "m3", "m4"]
+    assert messages.api_calls == 3
+    cursor = messages.cursor
+
+    for text in ("m5", "m6"):
+        client.beta.threads.messages.create(thread_id=thread_id, role="user", content=text)
+    queries.clear()
+    assert [m["content"] for m in messages.sync()] == ["m5", "m6"]
+    assert queries[0]["after"] == cursor
+    assert len(queries) == 1 and messages.api_calls == 4
+
+    # Nothing new: one call, nothing added
+    assert messages.sync() == []
+    assert [m["content"] for m in messages.messages] == [f"m{i}" for i in range(7)]
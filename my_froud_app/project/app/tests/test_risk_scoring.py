@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from risk_scoring import RISK_WEIGHTS, QuantileSketch, RiskScorer
+
+
+def empirical_cdf_bounds(values, probes):
+    """Fraction of values strictly below and at-or-below each probe"""
+    values = np.sort(values)
+    return np.searchsorted(values, probes, "left") / len(values), np.searchsorted(values, probes, "right") / len(values)
+
+
+def test_small_samples_are_kept_exactly():
+    values = np.random.default_rng(0).permutation(100).astype(float)
+    sketch = QuantileSketch(size=1024)
+    sketch.update(values[:60])
+    sketch.update(np.append(values[60:], np.nan))
+    assert sketch.count == 100
+    # Mid-rank of each distinct value
+    np.testing.assert_allclose(sketch.cdf(np.arange(100.0)), (np.arange(100) + 0.5) / 100)
+
+
+@pytest.mark.parametrize("draw", [
+    lambda rng: rng.lognormal(3, 1.5, 5_000),
+    lambda rng: rng.uniform(0, 1, rng.integers(1, 5_000)),
+    lambda rng: rng.poisson(4, 3_000).astype(float),  # heavy ties
+])
+def test_rank_error_stays_small_after_many_merges(draw):
+    rng = np.random.default_rng(1)
+    sketch = QuantileSketch(size=1024)
+    batches = []
+    for _ in range(40):
+        batches.append(draw(rng))
+        sketch.update(batches[-1])
+    values = np.concatenate(batches)
+    assert sketch.count == len(values)
+
+    probes = np.quantile(values, np.linspace(0.001, 0.999, 999))
+    below, at_or_below = empirical_cdf_bounds(values, probes)
+    cdf = sketch.cdf(probes)
+    error = np.maximum(below - cdf, cdf - at_or_below).clip(0)
+    assert error.max() < 4 / sketch.size
+
+
+def test_merchant_signal_is_the_fraud_rate_over_all_batches():
+    rng = np.random.default_rng(2)
+    batches = [pd.DataFrame({
+        "merchant_category": rng.choice(["food", "travel", "online"], 1_000),
+        "Meta_Prediction": rng.choice(["Fraudulent", "Legitimate"], 1_000, p=[p, 1 - p]),
+    }) for p in (0.05, 0.2, 0.5)]
+    scorer = RiskScorer()
+    for batch in batches:
+        scorer.update(batch)
+
+    everything = pd.concat(batches)
+    rates = everything["Meta_Prediction"].eq("Fraudulent").groupby(everything["merchant_category"]).mean()
+    probe = pd.DataFrame({"merchant_category": ["food", "travel", "online", "unseen"]})
+    expected = probe["merchant_category"].map(rates).fillna(0) * RISK_WEIGHTS["merchant_category"]
+    np.testing.assert_allclose(scorer.score(probe), expected, rtol=1e-6)
+
+
+def test_scores_stay_within_bounds():
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({
+        "transaction_amount": rng.lognormal(4, 1, 2_000),
+        "transaction_frequency": rng.poisson(5, 2_000),
+        "time_since_last_txn_hrs": rng.exponential(24, 2_000),
+        "is_foreign": rng.integers(0, 2, 2_000),
+        "merchant_category": rng.choice(["food", "travel"], 2_000),
+        "Meta_Prediction": rng.choice(["Fraudulent", "Legitimate"], 2_000),
+    })
+    scorer = RiskScorer()
+    scorer.update(df)
+    risk = scorer.score(df)
+    assert risk.dtype == np.float32
+    assert risk.min() >= 0 and risk.max() <= sum(RISK_WEIGHTS.values())
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rollup_store import AGGREGATIONS, GRANULARITIES, build_rollups, date_bounds, query
+
+
+@pytest.fixture(scope="module")
+def run():
+    rng = np.random.default_rng(0)
+    n = 5_000
+    df = pd.DataFrame({
+        "datetime": (pd.Timestamp("2024-03-01") + pd.to_timedelta(rng.uniform(0, 5 * 86_400, n), unit="s")).astype(str),
+        "transaction_amount": rng.lognormal(4, 1, n),
+        "risk_score": rng.uniform(0, 100, n),
+        "Meta_Prediction": rng.choice(["Fraudulent", "Legitimate"], n, p=[0.1, 0.9]),
+    })
+    df.loc[rng.random(n) < 0.01, "datetime"] = "not a date"
+    df.loc[rng.random(n) < 0.05, "transaction_amount"] = np.nan
+    return df
+
+
+def reference(df, freq, feature, agg, start=None, end=None):
+    df = df.assign(datetime=pd.to_datetime(df["datetime"], errors="coerce")).dropna(subset=["datetime"])
+    if start is not None:
+        df = df[df["datetime"].dt.floor(freq) >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["datetime"].dt.floor(freq) < pd.Timestamp(end) + pd.Timedelta(days=1)]
+    grouped = df.groupby([df["datetime"].dt.floor(freq).rename("bucket"), "Meta_Prediction"])
+    values = grouped.size() if feature is None else grouped[feature].agg(agg)
+    return values.rename("value").reset_index()
+
+
+@pytest.mark.parametrize("granularity", list(GRANULARITIES))
+@pytest.mark.parametrize("agg", AGGREGATIONS)
+def test_queries_match_a_groupby_on_the_raw_rows(run, granularity, agg):
+    rollups = build_rollups(run)
+    got = query(rollups, granularity, "transaction_amount", agg).reset_index(drop=True)
+    expected = reference(run, GRANULARITIES[granularity], "transaction_amount", agg)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False, check_exact=False, rtol=1e-7)
+
+
+def test_row_counts_and_inclusive_date_range(run):
+    rollups = build_rollups(run)
+    got = query(rollups, "hour", None, start="2024-03-02", end="2024-03-03").reset_index(drop=True)
+    expected = reference(run, "h", None, "count", start="2024-03-02", end="2024-03-03")
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+    assert date_bounds(rollups) == (pd.Timestamp("2024-03-01").date(), pd.Timestamp("2024-03-05").date())
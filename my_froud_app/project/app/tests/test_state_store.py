@@ -0,0 +1,54 @@
+import json
+import multiprocessing
+
+import pytest
+
+from state_store import SharedState
+
+
+def load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"count": 0}
+
+
+def dump(state, path):
+    with open(path, "w") as f:
+        json.dump(state, f)
+
+
+def increment(state):
+    state["count"] += 1
+
+
+def commit_many(path, times):
+    shared = SharedState(path, load, dump)
+    for _ in range(times):
+        shared.commit(increment)
+
+
+def test_snapshot_is_private_and_follows_commits(tmp_path):
+    path = str(tmp_path / "state.json")
+    shared = SharedState(path, load, dump)
+    snapshot = shared.snapshot()
+    snapshot["count"] = 99
+    assert shared.snapshot() == {"count": 0}
+
+    # A commit from another worker is picked up on the next snapshot
+    SharedState(path, load, dump).commit(increment)
+    assert shared.snapshot() == {"count": 1}
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_concurrent_commits_from_processes_are_never_lost(tmp_path):
+    path = str(tmp_path / "state.json")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=commit_many, args=(path, 50)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert load(path) == {"count": 200}
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from user_state import UserStateStore
+
+
+def transactions(n, start, seed):
+    rng = np.random.default_rng(seed)
+    amount = rng.lognormal(3, 1, n)
+    amount[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({
+        "user_name": rng.choice([f"user_{i}" for i in range(40)], n),
+        "datetime": pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.uniform(0, 86_400, n)), unit="s"),
+        "transaction_amount": amount,
+    })
+
+
+def test_merged_moments_match_groupby_over_all_batches():
+    batches = [transactions(500, f"2024-01-0{i + 1}", seed=i) for i in range(4)]
+    store = UserStateStore()
+    for batch in batches:
+        store.update(batch)
+
+    everything = pd.concat(batches)
+    grouped = everything.groupby("user_name")["transaction_amount"]
+    state = store.state.sort_index()
+    np.testing.assert_array_equal(state["count"], grouped.count().sort_index())
+    np.testing.assert_allclose(state["mean"], grouped.mean().sort_index(), rtol=1e-12)
+    np.testing.assert_allclose(state["m2"] / (state["count"] - 1), grouped.var(ddof=1).sort_index(), rtol=1e-10)
+    assert (state["last_datetime"] == everything.groupby("user_name")["datetime"].max().sort_index()).all()
+
+
+def test_zscores_use_the_whole_history():
+    first, second = transactions(800, "2024-01-01", seed=10), transactions(300, "2024-01-02", seed=11)
+    store = UserStateStore()
+    store.update(first)
+    scores = store.update(second)
+
+    history = pd.concat([first, second]).groupby("user_name")["transaction_amount"]
+    mean = second["user_name"].map(history.mean())
+    std = second["user_name"].map(history.std(ddof=1))
+    expected = ((second["transaction_amount"] - mean) / std).fillna(0)
+    np.testing.assert_allclose(scores["amount_zscore"], expected, rtol=1e-5, atol=1e-6)
+
+
+def test_time_since_the_previous_transaction_spans_batches():
+    first = pd.DataFrame({"user_name": ["a", "b"], "datetime": ["2024-01-01 10:00", "2024-01-01 11:00"],
+                          "transaction_amount": [10.0, 20.0]})
+    second = pd.DataFrame({"user_name": ["a", "a", "b"],
+                           "datetime": ["2024-01-01 10:03", "2024-01-01 10:30", "2024-01-01 09:00"],
+                           "transaction_amount": [11.0, 12.0, 21.0]})
+    store = UserStateStore()
+    store.update(first)
+    scores = store.update(second)
+    np.testing.assert_array_equal(scores["time_diff_minutes"].to_numpy()[:2], [3.0, 27.0])
+    # A row older than the user's last transaction is not a velocity event
+    assert np.isnan(scores["time_diff_minutes"].iloc[2])
+    assert scores["rapid_succession"].tolist() == [True, False, False]
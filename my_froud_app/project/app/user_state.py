@@ -0,0 +1,142 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from state_store import SharedState
+
+# Velocity rules, matching the original per-file analysis
+RAPID_SUCCESSION_MINUTES = 5
+UNUSUAL_AMOUNT_ZSCORE = 2
+
+VELOCITY_COLUMNS = [
+    "time_diff_minutes",
+    "amount_zscore",
+    "rapid_succession",
+    "unusual_amount",
+    "velocity_score",
+]
+
+
+class UserStateStore:
+    """Per-user behaviour state keyed by user_name.
+
+    Holds the last transaction time and running amount count, mean and M2
+    (sum of squared deviations), so every batch is scored against the user's
+    whole history without re-reading earlier runs.
+    """
+
+    def __init__(self, state=None):
+        if state is None:
+            state = pd.DataFrame(
+                {
+                    "last_datetime": pd.Series(dtype="datetime64[ns]"),
+                    "count": pd.Series(dtype="int64"),
+                    "mean": pd.Series(dtype="float64"),
+                    "m2": pd.Series(dtype="float64"),
+                }
+            )
+            state.index.name = "user_name"
+        self.state = state
+
+    def __len__(self):
+        return len(self.state)
+
+    def update(self, df):
+        """Score a batch against each user's history, then fold the batch into the state"""
+        users = df["user_name"].astype(str)
+        when = pd.to_datetime(df["datetime"], errors="coerce")
+        amount = pd.to_numeric(df["transaction_amount"], errors="coerce")
+        batch = pd.DataFrame({"user_name": users, "datetime": when, "amount": amount}, index=df.index)
+
+        # Sort this batch only; history is summarised in the state
+        batch = batch.sort_values(["user_name", "datetime"], kind="stable")
+        prev = batch.groupby("user_name", sort=False)["datetime"].shift(1)
+        first_in_batch = prev.isna() & ~batch["user_name"].duplicated()
+        stored_last = pd.Series(
+            self.state["last_datetime"].reindex(batch["user_name"]).to_numpy(), index=batch.index
+        )
+        prev = prev.where(~first_in_batch, stored_last)
+        time_diff = (batch["datetime"] - prev).dt.total_seconds() / 60
+        # Late-arriving rows older than the stored last transaction are not velocity events
+        time_diff = time_diff.where(time_diff >= 0)
+
+        # Merge per-user batch moments with the stored ones (Chan et al. parallel update)
+        grouped = batch.groupby("user_name", sort=False)["amount"]
+        batch_stats = pd.DataFrame({
+            "count": grouped.count(),
+            "mean": grouped.mean(),
+            "m2": grouped.var(ddof=0) * grouped.count(),
+        })
+        prior = self.state.reindex(batch_stats.index)
+        n_a = prior["count"].fillna(0).to_numpy(dtype=np.float64)
+        n_b = batch_stats["count"].to_numpy(dtype=np.float64)
+        mean_a = prior["mean"].fillna(0).to_numpy()
+        mean_b = batch_stats["mean"].fillna(0).to_numpy()
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, mean_a + delta * n_b / n, 0.0)
+            m2 = prior["m2"].fillna(0).to_numpy() + batch_stats["m2"].fillna(0).to_numpy() + delta ** 2 * n_a * n_b / n
+            std = np.sqrt(np.where(n > 1, m2 / (n - 1), np.nan))
+        merged = pd.DataFrame({"count": n, "mean": mean, "m2": np.nan_to_num(m2), "std": std},
+                              index=batch_stats.index)
+
+        # Z-score every row against the user's full history including this batch
+        user_mean = merged["mean"].reindex(batch["user_name"]).to_numpy()
+        user_std = merged["std"].reindex(batch["user_name"]).to_numpy()
+        zscore = ((batch["amount"] - user_mean) / user_std).replace([np.inf, -np.inf], np.nan).fillna(0)
+
+        scores = pd.DataFrame(index=batch.index)
+        scores["time_diff_minutes"] = time_diff
+        scores["amount_zscore"] = zscore.astype(np.float32)
+        scores["rapid_succession"] = time_diff < RAPID_SUCCESSION_MINUTES
+        scores["unusual_amount"] = zscore.abs() > UNUSUAL_AMOUNT_ZSCORE
+        scores["velocity_score"] = (
+            scores["rapid_succession"].astype(np.int8) * 5 + scores["unusual_amount"].astype(np.int8) * 3
+        ).astype(np.int8)
+
+        # Fold the batch into the stored state
+        last_seen = batch.groupby("user_name", sort=False)["datetime"].max().reindex(merged.index)
+        prior_last = prior["last_datetime"]
+        merged["last_datetime"] = last_seen.where(prior_last.isna() | (last_seen > prior_last), prior_last)
+        merged["count"] = merged["count"].astype(np.int64)
+        self.state = pd.concat([
+            self.state.drop(merged.index, errors="ignore"),
+            merged[["last_datetime", "count", "mean", "m2"]],
+        ])
+        self.state.index.name = "user_name"
+
+        return scores.reindex(df.index)
+
+
+def load_user_state(path):
+    """Load the persisted user state store, or start an empty one"""
+    if os.path.exists(path):
+        try:
+            return UserStateStore(pd.read_pickle(path))
+        except Exception as e:
+            print(f"[USER STATE] Could not load state from {path}: {str(e)}")
+    return UserStateStore()
+
+
+def shared_user_state(path):
+    """The user state persisted at `path`, shared by every worker process"""
+    return SharedState(path, load_user_state, lambda store, tmp_path: store.state.to_pickle(tmp_path))
+
+
+def _has_velocity_inputs(df):
+    return "user_name" in df.columns and "datetime" in df.columns
+
+
+def update_velocity(shared, df):
+    """Velocity columns for a scored batch against the latest committed user state"""
+    if not _has_velocity_inputs(df):
+        return pd.DataFrame(index=df.index)
+    return shared.snapshot().update(df)
+
+
+def learn_velocity(shared, df):
+    """Fold a saved batch into the user state on disk"""
+    if _has_velocity_inputs(df):
+        shared.commit(lambda store: store.update(df))